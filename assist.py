@@ -0,0 +1,146 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# GPS WARM START ASSISTANCE AND TIME TO FIRST FIX LOG
+#
+# THE LAST GOOD POSITION AND ITS UTC TIME ARE KEPT IN MICROCONTROLLER.NVM, AFTER THE SETTINGS STORE
+# AT BOOT THE POSITION IS SENT BACK TO THE RECEIVER AS UBX-MGA-INI-POS_LLH, AND THE RTC AS UBX-MGA-INI-TIME_UTC IF IT
+# STILL HOLDS A VALID TIME (IT SURVIVES A RELOAD BUT NOT A POWER CYCLE), SO THE RECEIVER CAN SKIP A FULL SKY SEARCH
+#
+# EACH BOOT'S TIME TO FIRST FIX IS LOGGED IN A SMALL RING WITH WHAT ASSISTANCE WAS GIVEN, SO COLD AND WARM STARTS
+# CAN BE COMPARED. THE RECORD HAS A CRC32, A DAMAGED RECORD IS IGNORED AND THE NEXT BOOT IS A COLD START
+#
+# THE RECORD SHARES THE ONE 4KB NVM FLASH SECTOR WITH THE SETTINGS STORE (SEE SETTINGS.PY), AND EVERY SAVE ERASES AND
+# REWRITES THE WHOLE SECTOR, SETTINGS INCLUDED, SO EACH SAVE WEARS THE SETTINGS TOO AND A POWER LOSS DURING IT CAN
+# LOSE THEM. NVM IS THE ONLY STORE CODE.PY CAN ALWAYS WRITE (THE FILESYSTEM IS USUALLY THE COMPUTER'S), SO INSTEAD
+# SAVES ARE KEPT RARE: ONCE PER BOOT WITH THE NEW TTFF, THEN ONLY WHEN THE UNIT HAS MOVED FAR ENOUGH THAT THE SAVED
+# POSITION WOULD NO LONGER HELP (MOVED_M()), AND AT THE LOW BATTERY SHUTDOWN. A UNIT THAT STAYS PUT NEVER SAVES AGAIN
+
+import math
+import struct
+import time
+
+from binascii import crc32
+
+from settings import settings_end
+from ubx import ubx_mga_ini_pos, ubx_mga_ini_time
+
+assist_magic = b'GA'
+assist_version = 1
+assist_base = settings_end
+
+# TTFF LOG ENTRIES
+assist_log_len = 16
+
+# MAGIC, VERSION, FIX VALID, LAT / LON IN 1E-7 DEGREES, ALTITUDE IN CM, UTC SECONDS OF THE FIX,
+# NEXT LOG INDEX, LOG ENTRIES USED, TTFF IN SECONDS, ASSISTANCE GIVEN
+assist_format = '<2sBBiiiIBB{0}H{0}B'.format(assist_log_len)
+assist_len = struct.calcsize(assist_format)
+
+# ASSISTANCE GIVEN FLAGS
+assist_pos = 0x01
+assist_time = 0x02
+
+# METERS PER DEGREE OF LATITUDE
+assist_meters_deg = 111320
+
+# OLDEST YEAR THE RTC IS TRUSTED FROM, IT STARTS AT 2000 AFTER A POWER CYCLE
+assist_min_year = 2022
+
+class gps_assist:
+    def __init__(self, nvm):
+        self.nvm = nvm
+
+        self.fix_valid = False
+        self.lat_e7 = 0
+        self.lon_e7 = 0
+        self.alt_cm = 0
+        self.fix_secs = 0
+
+        self.log_index = 0
+        self.log_count = 0
+        self.log_ttff = [0] * assist_log_len
+        self.log_flags = [0] * assist_log_len
+
+        # ASSISTANCE SENT THIS BOOT
+        self.flags = 0
+
+    # READ THE STORED RECORD, RETURNS FALSE IF THERE IS NONE
+    def load(self):
+        record = self.nvm[assist_base:assist_base + assist_len + 4]
+
+        if struct.unpack_from('<I', record, assist_len)[0] != crc32(record[:assist_len]):
+            return False
+
+        values = struct.unpack_from(assist_format, record)
+
+        if values[0] != assist_magic or values[1] != assist_version:
+            return False
+
+        self.fix_valid = values[2] != 0
+        self.lat_e7, self.lon_e7, self.alt_cm, self.fix_secs = values[3:7]
+        self.log_index = values[7] % assist_log_len
+        self.log_count = min(values[8], assist_log_len)
+        self.log_ttff = list(values[9:9 + assist_log_len])
+        self.log_flags = list(values[9 + assist_log_len:])
+
+        return True
+
+    def save(self):
+        record = struct.pack(assist_format, assist_magic, assist_version, 1 if self.fix_valid else 0, self.lat_e7, self.lon_e7, self.alt_cm, self.fix_secs, self.log_index, self.log_count, *(self.log_ttff + self.log_flags))
+        record += struct.pack('<I', crc32(record))
+        self.nvm[assist_base:assist_base + len(record)] = record
+
+    # SEND THE STORED POSITION AND THE RTC TIME TO THE RECEIVER, RETURNS THE ASSISTANCE FLAGS
+    def send(self, uart, pos_accuracy_m, time_accuracy_s):
+        self.flags = 0
+        utc = time.localtime()
+
+        if utc.tm_year >= assist_min_year:
+            uart.write(ubx_mga_ini_time(utc, time_accuracy_s))
+            self.flags |= assist_time
+
+        if self.fix_valid:
+            uart.write(ubx_mga_ini_pos(self.lat_e7 / 10000000, self.lon_e7 / 10000000, self.alt_cm / 100, pos_accuracy_m))
+            self.flags |= assist_pos
+
+        return self.flags
+
+    # REMEMBER A GOOD FIX, NOT WRITTEN UNTIL SAVE()
+    def set_fix(self, latitude, longitude, altitude_m, utc_secs):
+        self.fix_valid = True
+        self.lat_e7 = int(latitude * 10000000)
+        self.lon_e7 = int(longitude * 10000000)
+        self.alt_cm = int(altitude_m * 100)
+        self.fix_secs = int(utc_secs)
+
+    # ROUGH DISTANCE IN METERS FROM THE SAVED POSITION, NONE IF THERE IS NONE
+    def moved_m(self, latitude, longitude):
+        if not self.fix_valid:
+            return None
+
+        d_lat = latitude - self.lat_e7 / 10000000
+        d_lon = (longitude - self.lon_e7 / 10000000) * math.cos(math.radians(latitude))
+
+        return math.sqrt(d_lat * d_lat + d_lon * d_lon) * assist_meters_deg
+
+    # ADD THIS BOOT'S TIME TO FIRST FIX TO THE LOG, NOT WRITTEN UNTIL SAVE()
+    def log(self, ttff_secs):
+        self.log_ttff[self.log_index] = min(int(ttff_secs), 0xFFFF)
+        self.log_flags[self.log_index] = self.flags
+        self.log_index = (self.log_index + 1) % assist_log_len
+
+        if self.log_count < assist_log_len:
+            self.log_count += 1
+
+    # LOG ENTRIES, OLDEST FIRST, AS TEXT LINES
+    def report(self):
+        lines = []
+
+        for i in range(self.log_count):
+            index = (self.log_index - self.log_count + i) % assist_log_len
+            flags = self.log_flags[index]
+            start = ('POS ' if flags & assist_pos else '') + ('TIME' if flags & assist_time else '')
+            lines.append('TTFF {:5d}S {}'.format(self.log_ttff[index], start or 'COLD'))
+
+        return lines
@@ -0,0 +1,103 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# BATTERY MONITOR
+#
+# EACH CHECK READS THE ADC SAMPLES TIMES IN A ROW AND AVERAGES THEM, THEN SMOOTHS THE RESULT WITH AN EXPONENTIAL MOVING
+# AVERAGE SO OLED AND GPS LOAD SPIKES DO NOT MOVE THE GAUGE
+#
+# THE CURVE HOLDS THE ADC VALUE AT 0, 10, 20 ... 100 PERCENT CHARGE. THE SEGMENT A READING FALLS IN IS FOUND BY
+# BISECTION AND THE CHARGE IS INTERPOLATED LINEARLY WITHIN IT, READINGS OUTSIDE THE CURVE ARE CLAMPED TO 0 OR 100
+#
+# THE DISCHARGE RATE IN PERCENT PER HOUR IS THE CHANGE BETWEEN CHECKS, SMOOTHED WITH A TIME CONSTANT OF RATE_SECS SO IT
+# FOLLOWS CHANGES IN LOAD (SUCH AS POWER SAVE) WITHIN A FEW MINUTES. HOURS REMAINING ARE ONLY GIVEN ONCE THE RATE HAS
+# HAD SETTLE_SECS TO SETTLE AND WHILE THE BATTERY IS DISCHARGING
+
+# SLOWEST DISCHARGE RATE, IN PERCENT PER HOUR, TREATED AS DISCHARGING
+bat_min_rate = 0.05
+
+# BATTERY PERCENTAGE FROM AN ADC VALUE, 0.0 - 100.0
+def bat_level(adc_value, curve):
+    top = len(curve) - 1
+
+    if adc_value <= curve[0]:
+        return 0.0
+
+    if adc_value >= curve[top]:
+        return 100.0
+
+    low = 0
+    high = top
+
+    while high - low > 1:
+        mid = (low + high) >> 1
+
+        if adc_value < curve[mid]:
+            high = mid
+        else:
+            low = mid
+
+    return (low + (adc_value - curve[low]) / (curve[high] - curve[low])) * 100 / top
+
+class bat_monitor:
+    def __init__(self, adc, curve, samples=16, smooth=0.25, rate_secs=1800, settle_secs=600):
+        self.adc = adc
+        self.curve = curve
+        self.samples = samples
+        self.smooth = smooth
+        self.rate_ns = int(rate_secs * 1000000000)
+        self.settle_ns = int(settle_secs * 1000000000)
+
+        # SMOOTHED ADC VALUE, NONE UNTIL THE FIRST CHECK
+        self.value = None
+        self.percent = 0.0
+
+        # DISCHARGE RATE IN PERCENT PER HOUR, HOURS REMAINING IS NONE WHILE UNKNOWN
+        self.rate = 0.0
+        self.hours_left = None
+        self.start_ns = 0
+        self.last_ns = 0
+        self.last_percent = 0.0
+
+    # AVERAGE OF SAMPLES BACK TO BACK ADC READS
+    def read(self):
+        adc = self.adc
+        total = 0
+
+        for _ in range(self.samples):
+            total += adc.value
+
+        return total // self.samples
+
+    def update(self, now):
+        raw = self.read()
+
+        if self.value is None:
+            self.value = raw
+            self.percent = bat_level(raw, self.curve)
+            self.start_ns = now
+            self.last_ns = now
+            self.last_percent = self.percent
+            return
+
+        self.value += (raw - self.value) * self.smooth
+        self.percent = bat_level(self.value, self.curve)
+
+        elapsed = now - self.last_ns
+
+        if elapsed <= 0:
+            return
+
+        # WEIGHT FOR AN EXPONENTIAL AVERAGE OVER IRREGULAR INTERVALS, CLOSE TO 1 - EXP(-ELAPSED / RATE_NS)
+        rate = (self.last_percent - self.percent) * 3600000000000 / elapsed
+        self.rate += (rate - self.rate) * elapsed / (elapsed + self.rate_ns)
+        self.last_ns = now
+        self.last_percent = self.percent
+
+        if now - self.start_ns >= self.settle_ns and self.rate >= bat_min_rate:
+            self.hours_left = self.percent / self.rate
+        else:
+            self.hours_left = None
+
+    def report(self):
+        return 'BATTERY {:6.0f} ADC {:5.1f}% {:5.2f}%/H {}'.format(self.value or 0, self.percent, self.rate, '{:5.1f}H LEFT'.format(self.hours_left) if self.hours_left is not None else 'UNKNOWN')
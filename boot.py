@@ -0,0 +1,29 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# RUNS ONCE AT POWER UP BEFORE CODE.PY
+#
+# THE FLASH FILESYSTEM CAN ONLY BE WRITTEN BY ONE SIDE AT A TIME. BY DEFAULT THE COMPUTER HAS IT (THE CIRCUITPY DRIVE
+# IS WRITABLE OVER USB FOR EDITING) AND THE TRACK LOGGER IS DISABLED. USB IS NOT CONNECTED YET WHEN THIS RUNS, SO
+# WHETHER A COMPUTER IS THERE CAN NOT BE TOLD HERE, THE SWITCH IS A MARKER FILE INSTEAD:
+# - TO LOG: COPY ANY FILE NAMED LOG_ON.TXT TO THE CIRCUITPY DRIVE AND RESET. THE FILESYSTEM IS THEN REMOUNTED WRITABLE
+#   FOR CODE.PY AND THE DRIVE IS READ ONLY TO THE COMPUTER, WHICH CAN STILL COPY OFF THE TRACK LOG
+# - TO EDIT AGAIN: TYPE L ON THE USB SERIAL CONSOLE, CODE.PY REMOVES THE MARKER, THEN RESET. OR START IN SAFE MODE
+#   (PRESS RESET AGAIN WHILE THE LED BLINKS AT START UP), WHICH SKIPS THIS FILE, AND DELETE LOG_ON.TXT FROM THE COMPUTER
+#
+# A SECOND USB SERIAL PORT (USB_CDC.DATA) IS ENABLED NEXT TO THE CONSOLE FOR THE TELEMETRY STREAM
+
+import os
+import storage
+import usb_cdc
+
+log_marker = '/log_on.txt'
+
+usb_cdc.enable(console=True, data=True)
+
+try:
+    os.stat(log_marker)
+except OSError:
+    pass
+else:
+    storage.remount('/', readonly=False)
@@ -1,6 +1,7 @@
 import board
 import displayio
 import math
+import microcontroller
 import terminalio
 import time
 
@@ -9,10 +10,28 @@ import adafruit_lsm303dlh_mag
 from adafruit_display_text import label
 from adafruit_ssd1351 import SSD1351
 
+from compass import comp_direction, comp_sector
+from mag_cal import mag_cal
+from settings import settings
+
 flip_x_axis = True
 flip_y_axis = True
 swap_axis = True
 
+# ORIENTATION SAVED IN NVM OVERRIDES THE DEFAULTS ABOVE, RESULTS ARE SAVED BACK FOR CODE.PY
+config = settings()
+config.load(microcontroller.nvm)
+
+flip_x_axis = config.get('flip_x_axis', flip_x_axis)
+flip_y_axis = config.get('flip_y_axis', flip_y_axis)
+swap_axis = config.get('swap_axis', swap_axis)
+
+# FIT QUALITY NEEDED BEFORE SAVING, RMS RADIUS ERROR IN PERCENT
+save_rms = 2.0
+
+# SAMPLES BETWEEN FITS
+fit_interval = 50
+
 def comp_degree(x_axis, y_axis):
     if flip_x_axis:
         x_axis *= -1
@@ -23,38 +42,13 @@ def comp_degree(x_axis, y_axis):
     if swap_axis:
         x_axis, y_axis = y_axis, x_axis
 
-    if (x_axis > 0) and (y_axis == 0):
-        angle = 0
-    elif (x_axis < 0) and (y_axis == 0):
-        angle = 180
-    elif y_axis > 0:
-        angle = 90 - math.atan(x_axis/y_axis) * 180 / math.pi
-    elif y_axis < 0:
-        angle = 270 - math.atan(x_axis/y_axis) * 180 / math.pi
+    angle = math.atan2(y_axis, x_axis) * 180 / math.pi
 
     if angle < 0:
         angle += 360
 
-    if angle >= 360:
-        angle -= 360
-
     return angle
 
-def comp_direction(degrees):
-    if degrees == -1:
-        direction = '---'
-    elif (degrees < 11.25) or (degrees >= 348.75):
-        direction = 'N'
-    else:
-        for i in range(15):
-            c_angle = comp_angle[i]
-
-            if (degrees >= c_angle) and (degrees < (c_angle + 22.5)):
-                direction = comp_point[i]
-                break
-
-    return direction
-
 displayio.release_displays()
 spi = board.SPI()
 disp_bus = displayio.FourWire(spi, command=board.D24, chip_select=board.D25, reset=board.D4, baudrate=18000000)
@@ -70,9 +64,6 @@ disp_group = displayio.Group()
 disp_group.append(tile_grid)
 disp.show(disp_group)
 
-comp_angle = (11.25, 33.75, 56.25, 78.75, 101.25, 123.75, 146.25, 168.75, 191.25, 213.75, 236.25, 258.75, 281.25, 303.75, 326.25, 348.75)
-comp_point = ('NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
-
 font = terminalio.FONT
 
 # REMOVE SPLASH LOGO
@@ -91,11 +82,11 @@ disp_group.append(corrected_angle_text)
 corrected_direction_text = label.Label(font, text='   ', color=0xFFFFFF, x=111, y=14)
 disp_group.append(corrected_direction_text)
 
-x_raw_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=30)
-disp_group.append(x_raw_text)
+coverage_text = label.Label(font, text='         ', color=0xFFFF00, x=0, y=30)
+disp_group.append(coverage_text)
 
-y_raw_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=41)
-disp_group.append(y_raw_text)
+quality_text = label.Label(font, text='         ', color=0xFFFF00, x=0, y=41)
+disp_group.append(quality_text)
 
 x_cal_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=57)
 disp_group.append(x_cal_text)
@@ -103,45 +94,68 @@ disp_group.append(x_cal_text)
 y_cal_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=68)
 disp_group.append(y_cal_text)
 
-def main():
-    x_min = 0
-    x_max = 0
-    y_min = 0
-    y_max = 0
-
-    while True:
-        x, y, _ = comp.magnetic
-
-        if x < x_min:
-            x_min = x
+soft_row_1_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=84)
+disp_group.append(soft_row_1_text)
 
-        if x > x_max:
-            x_max = x
+soft_row_2_text = label.Label(font, text='         ', color=0xFFFFFF, x=0, y=95)
+disp_group.append(soft_row_2_text)
 
-        if y < y_min:
-            y_min = y
+status_text = label.Label(font, text='Rotate slowly', color=0x00FFFF, x=0, y=116)
+disp_group.append(status_text)
 
-        if y > y_max:
-            y_max = y
-
-        x_cal = (x_min + x_max) / 2
-        y_cal = (y_min + y_max) / 2
+def main():
+    cal = mag_cal()
+    count = 0
+    saved_rms = 0
 
-        corrected_x = x - x_cal
-        corrected_y = y - y_cal
+    while True:
+        x, y, _ = comp.magnetic
+        cal.add(x, y)
+        count += 1
+
+        if count >= fit_interval:
+            count = 0
+
+            # PRINT VALUES FOR CODE.PY EACH TIME A FIT SUCCEEDS
+            if cal.solve():
+                w = cal.soft_iron
+                print('offset_x_axis = {:.4f}'.format(cal.offset_x))
+                print('offset_y_axis = {:.4f}'.format(cal.offset_y))
+                print('soft_iron = ({:.4f}, {:.4f}, {:.4f}, {:.4f})'.format(w[0], w[1], w[2], w[3]))
+                print('coverage {}% rms {:.2f}%'.format(cal.coverage, cal.rms))
+
+                x_cal_text.text = 'X off {:.3f}'.format(cal.offset_x)
+                y_cal_text.text = 'Y off {:.3f}'.format(cal.offset_y)
+                soft_row_1_text.text = 'W {:6.3f} {:6.3f}'.format(w[0], w[1])
+                soft_row_2_text.text = '  {:6.3f} {:6.3f}'.format(w[2], w[3])
+                quality_text.text = 'RMS {:.2f}%'.format(cal.rms)
+
+            coverage_text.text = 'Cover {}%'.format(cal.coverage)
+
+            # SAVE A FULL COVERAGE FIT, AND AGAIN ONLY IF A LATER FIT IS CLEARLY BETTER, TO LIMIT FLASH WRITES
+            if cal.coverage < 100:
+                status_text.text = 'Rotate slowly'
+            elif cal.valid and cal.rms < save_rms and (not saved_rms or cal.rms < saved_rms * 0.8):
+                saved_rms = cal.rms
+                config.set('offset_x_axis', cal.offset_x)
+                config.set('offset_y_axis', cal.offset_y)
+                config.set('soft_iron', cal.soft_iron)
+                config.save(microcontroller.nvm)
+                print('calibration saved')
+                status_text.text = 'Saved'
+            elif saved_rms:
+                status_text.text = 'Saved'
+            else:
+                status_text.text = 'Keep rotating'
+
+        corrected_x, corrected_y = cal.correct(x, y)
 
         uncorrected_angle = comp_degree(x, y)
-        uncorrected_direction = comp_direction(uncorrected_angle)
         corrected_angle = comp_degree(corrected_x, corrected_y)
-        corrected_direction = comp_direction(corrected_angle)
-
-        angle_text.text = str(uncorrected_angle)
-        direction_text.text = uncorrected_direction
-        corrected_angle_text.text = str(corrected_angle)
-        corrected_direction_text.text = corrected_direction
-        x_raw_text.text = str(x)
-        y_raw_text.text = str(y)
-        x_cal_text.text = str(x_cal)
-        y_cal_text.text = str(y_cal)
+
+        angle_text.text = '{:.1f}'.format(uncorrected_angle)
+        direction_text.text = comp_direction(comp_sector(uncorrected_angle))
+        corrected_angle_text.text = '{:.1f}'.format(corrected_angle)
+        corrected_direction_text.text = comp_direction(comp_sector(corrected_angle))
 
 main()
@@ -30,22 +30,41 @@
 # D4    DIGITAL OUTPUT - DISPLAY RESET
 
 import analogio
+import asyncio
 import board
 import busio
 import displayio
-import math
+import microcontroller
+import os
 import rtc
+import supervisor
+import sys
 import terminalio
 import time
-
-import adafruit_fancyled.adafruit_fancyled as fancy
-import adafruit_gps
-import adafruit_lsm303dlh_mag
+import usb_cdc
 
 from adafruit_display_text import bitmap_label
-from adafruit_progressbar.horizontalprogressbar import (HorizontalProgressBar, HorizontalFillDirection)
 from adafruit_ssd1351 import SSD1351
 
+from assist import gps_assist
+from battery import bat_monitor
+from compass import compass
+from date_time import comp_date_time
+from fix_state import fix_alt, fix_lock, fix_pos, fix_sats, fix_speed, fix_state, fix_track
+from gps_rate import cfg_rate_type, gps_link_check, gps_rate_snap, rate_guard, ubx_cfg_prt, ubx_cfg_rate
+from gps_stream import gps_demux
+from grid import grid_locator
+from power import cfg_pm2_type, disp_on, power_save, ubx_cfg_pm2
+from profiler import loop_profile
+from render import num_field, render_stage
+from scheduler import sched_task, sched_run
+from settings import settings
+from sky import cls_nav_sat, nav_sat_max_len, sky_page, sky_sats
+from telemetry import telemetry
+from time_sync import time_sync
+from track_log import track_log
+from ubx import cmd_ack, cmd_nak, ubx_config, ubx_frame
+
 # VERSION
 version = '1.3'
 
@@ -63,8 +82,10 @@ timezone_desc = ('EST', 'EDT')
 timezone_offset = -5
 
 # MAGNETOMETER DATA
+# HARD IRON OFFSETS AND 2X2 SOFT IRON MATRIX (ROW ORDER) AS PRINTED BY CALIBRATION.PY
 offset_x_axis = 10.6818
 offset_y_axis = 1.90909
+soft_iron = (1.0, 0.0, 0.0, 1.0)
 declination = -6
 
 # MAGNETOMETER ORIENTATION
@@ -74,6 +95,74 @@ flip_x_axis = True
 flip_y_axis = True
 swap_axis = True
 
+# COMPASS FILTER, NUMBER OF SAMPLES AVERAGED AND DEGREES PAST A SECTOR EDGE BEFORE THE DIRECTION CHANGES
+comp_samples = 8
+comp_hysteresis = 4.0
+
+# GPS PROTOCOL
+# FALSE = NMEA RMC + GGA SENTENCES
+# TRUE = SINGLE UBX-NAV-PVT BINARY MESSAGE PER EPOCH, FEWER UART BYTES AND CHEAPER TO DECODE
+# FALLS BACK TO NMEA IF THE RECEIVER REJECTS THE CONFIGURATION
+gps_ubx_mode = False
+
+# GPS CONFIGURATION REPLY TIMEOUT IN SECONDS AND NUMBER OF RETRIES, THE TIMEOUT DOUBLES ON EACH RETRY
+gps_config_timeout = 0.25
+gps_config_retries = 3
+
+# GPS HIGH RATE MODE, LOWER POSITION LATENCY WHILE MOBILE
+# THE GPS UART IS RAISED TO GPS_BAUD AND REOPENED WITH A GPS_UART_BUFFER BYTE BUFFER, THEN THE RECEIVER IS SET TO
+# GPS_RATE_HZ FIXES PER SECOND (2, 5 OR 10, OTHERS ARE SNAPPED TO THE NEAREST). THE RATE STEPS DOWN ON ITS OWN IF THE PARSER CANNOT KEEP UP
+# RECEIVER POWER SAVE (CYCLIC TRACKING) IS SET UP FOR 1 HZ AND IS NOT USED IN HIGH RATE MODE
+gps_high_rate = False
+gps_baud = 115200
+gps_rate_hz = 5
+gps_uart_buffer = 1024
+
+# SUB SECOND CLOCK, THE SECOND IS TICKED ON THE TRUE UTC SECOND WORKED OUT FROM WHEN EACH WHOLE SECOND MESSAGE STARTS
+# ARRIVING. TIME_OFFSET_MS IS THE RECEIVER'S DELAY FROM THE SECOND TO THE FIRST MESSAGE, MEASURE IT AGAINST A REFERENCE
+# (PPS LED, WWV TICKS) AND SET IT HERE. TIME_WINDOW WHOLE SECOND MESSAGES ARE FITTED, ONES MORE THAN TIME_REJECT_MS OFF
+# THE FIT ARE LEFT OUT
+time_offset_ms = 0
+time_window = 32
+time_reject_ms = 5
+
+# GPS WARM START, ACCURACY GIVEN TO THE RECEIVER FOR THE LAST SAVED POSITION (METERS) AND THE RTC TIME (SECONDS)
+# THE POSITION IS SAVED ONCE A FIX IS FOUND, THEN CHECKED EVERY ASSIST_SAVE_RATE SECONDS AND ONLY SAVED AGAIN ONCE IT
+# HAS MOVED ASSIST_MOVE_M METERS, AND AT THE LOW BATTERY SHUTDOWN. EACH SAVE ERASES THE NVM SECTOR THE SETTINGS ARE IN
+assist_pos_accuracy = 50000
+assist_time_accuracy = 2
+assist_save_rate = 1800
+assist_move_m = 10000
+
+# TRACK LOG, ONLY WRITTEN WHEN BOOT.PY HAS MADE THE FILESYSTEM WRITABLE (LOG_MARKER ON THE DRIVE, SEE BOOT.PY)
+# TYPE L ON THE USB SERIAL CONSOLE TO REMOVE THE MARKER, THE DRIVE IS WRITABLE BY THE COMPUTER AGAIN AFTER A RESET
+log_marker = '/log_on.txt'
+# THE FILE IS A RING OF TRACK_LOG_BLOCKS 512 BYTE BLOCKS, ABOUT 60 FIXES EACH, OLDEST BLOCKS ARE OVERWRITTEN
+# ONE FIX IS LOGGED EVERY TRACK_LOG_RATE SECONDS AND THE PARTLY FILLED BLOCK IS SAVED EVERY TRACK_FLUSH_RATE SECONDS
+track_log_enabled = True
+track_log_path = '/track.bin'
+track_log_blocks = 256
+track_log_rate = 1
+track_flush_rate = 60
+
+# POWER SAVE, ONCE THE SPEED HAS STAYED UNDER PWR_STILL_KNOTS FOR PWR_STILL_SECS THE RECEIVER IS SWITCHED TO CYCLIC
+# TRACKING AND THE GPS, COMPASS AND DISPLAY TASKS WAKE LESS OFTEN (COMPASS AND DISPLAY EVERY PWR_IDLE_RATE SECONDS)
+# THE DISPLAY IS DIMMED TO DISP_DIM_CONTRAST (0 - 15) AND THEN BLANKED AFTER THAT MANY SECONDS WITHOUT MOVEMENT OR A
+# COMPASS DIRECTION CHANGE, 0 = NEVER. BATTERY CAPACITY IS USED FOR THE RUNTIME ESTIMATE IN THE POWER REPORT
+pwr_save_enabled = True
+pwr_still_knots = 1.0
+pwr_still_secs = 60
+pwr_idle_rate = 0.5
+disp_dim_secs = 300
+disp_blank_secs = 0
+disp_dim_contrast = 4
+bat_capacity_mah = 3000
+
+# GRID SQUARE LOCATOR LENGTH (6, 8 OR 10 CHARACTERS) AND HOW FAR IN METERS THE FIX MUST BE PAST A CELL EDGE BEFORE THE
+# LOCATOR CHANGES, SO IT DOES NOT FLAP WHEN PARKED ON A BOUNDARY. CHARACTERS PAST 6 ARE SHOWN ON THE LINE BELOW
+grid_chars = 6
+grid_hysteresis_m = 25
+
 # STARTUP LOGO
 startup_logo = '/images/ab9xa.bmp'
 
@@ -85,6 +174,7 @@ gps_color = 0xFF0000
 grid_color = 0xFFFF00
 location_color = 0x00FF00
 sat_color = 0xFF00FF
+debug_color = 0x00FFFF
 
 # PIN LAYOUT
 pin_battery = board.A0
@@ -104,6 +194,12 @@ bat_curve = (43300, 44000, 45000, 45700, 46000, 46600, 47500, 48800, 50000, 5140
 # BATTERY CUTOFF
 bat_cutoff = 43100
 
+# BATTERY ADC READS AVERAGED PER CHECK, SMOOTHING APPLIED BETWEEN CHECKS (0 - 1, LOWER IS SMOOTHER) AND THE TIME
+# CONSTANT IN SECONDS OF THE DISCHARGE RATE USED FOR THE HOURS REMAINING SHOWN NEXT TO THE GAUGE
+bat_samples = 16
+bat_smooth = 0.1
+bat_rate_secs = 1800
+
 # BATTERY BARGRAPH SIZE
 bat_x = 16
 bat_y = 8
@@ -111,6 +207,40 @@ bat_y = 8
 # GPS HEARTBEAT CHARACTER
 gps_char = '#'
 
+# TASK RATES IN SECONDS
+gps_rate = 0.02
+comp_rate = 0.1
+bat_rate = 10
+disp_rate = 0.05
+report_rate = 300
+
+# USB TELEMETRY ON THE SECOND USB SERIAL PORT, FOR LOGGING AND DIGITAL MODE SOFTWARE (TIME AND GRID SETTING)
+# TELEM_MODE: None = OFF, 'NMEA' = RMC + GGA + $PGRID WITH THE LOCATOR, 'BINARY' = FIXED SIZE FRAMES (SEE TELEMETRY.PY)
+# ONE RECORD EVERY TELEM_RATE SECONDS, QUEUED IN A TELEM_BUFFER BYTE RING AND SENT EVERY TELEM_OUT_RATE SECONDS
+# RECORDS ARE DROPPED, NEVER WAITED ON, WHILE THE COMPUTER IS NOT READING
+telem_mode = 'NMEA'
+telem_rate = 1
+telem_out_rate = 0.05
+telem_buffer = 1024
+
+# DEBUG PAGE AND PROFILER, ON THE USB SERIAL CONSOLE TYPE D TO SHOW / HIDE THE DEBUG PAGE AND P TO PRINT THE PROFILE
+debug_tasks = ('GPS', 'CLOCK', 'COMPASS', 'BATTERY', 'DISPLAY')
+
+# GARBAGE COLLECTION, RUN EVERY GC_SECS SECONDS (0 = ONLY WHEN THE HEAP FILLS) RIGHT AFTER A DISPLAY FLUSH WHILE NO GPS
+# MESSAGE IS ARRIVING, AND ONCE THE TIME SYNC IS LOCKED NOT WITHIN GC_GUARD_MS OF THE NEXT EPOCH
+gc_secs = 10
+gc_guard_ms = 50
+
+# SATELLITE PAGE, ON THE USB SERIAL CONSOLE TYPE S TO SHOW / HIDE IT. WHILE IT IS SHOWN THE RECEIVER SENDS GSV (OR
+# NAV-SAT IN UBX MODE) EVERY SKY_RATE SECONDS, THE DASHBOARD ALONE NEVER ASKS FOR THEM
+sky_rate = 5
+
+# MAXIMUM NUMBER OF UART READS PROCESSED PER GPS TASK RUN
+gps_max_reads = 4
+
+# MAXIMUM DISPLAY FRAMES PER SECOND, ALL LABEL CHANGES BETWEEN FRAMES ARE SENT IN ONE REFRESH
+disp_fps = 10
+
 # DISPLAY SIZE
 disp_x = 128
 disp_y = 128
@@ -127,276 +257,276 @@ line_gap = 8
 # END OF USER ADJUSTABLE VARIABLES                             #
 ################################################################
 
-# ARRAYS FOR DAY AND MONTH TEXT
-day_text = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
-month_text = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
-
-# COMPASS DATA
-comp_angle = (11.25, 33.75, 56.25, 78.75, 101.25, 123.75, 146.25, 168.75, 191.25, 213.75, 236.25, 258.75, 281.25, 303.75, 326.25, 348.75)
-comp_point = ('NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
-
-# ARRAYS FOR GRID SQUARE TEXT
-grid_upper = 'ABCDEFGHIJKLMNOPQRSTUVWX'
-grid_lower = 'abcdefghijklmnopqrstuvwx'
-
-# CALCULATE AND FORMAT UTC TIME, UTC DATE, TIMEZONE TIME AND TIMEZONE DATE. CALCULATE DST
-class comp_date_time:
-    def __init__(self, base_time_secs):
-        time_utc_tuple = time.localtime(base_time_secs)
-
-        # CHECK FOR DEC 31 / JAN 1 OVERLAP AND CORRECT YEAR FOR TIMEZONE DATE
-        base_year = time_utc_tuple[0]
-        err_check_tuple = (base_year, 1, 1, 0, 0, 0, 0, 0, 0)
-        err_check_secs = time.mktime(err_check_tuple) - timezone_offset * 3600
-
-        if base_time_secs < err_check_secs:
-            base_year -= 1
-
-        # CALCULATE IN SECONDS THE DST START TIME AND DATE
-        dst_start_tuple = (base_year, dst_start[0], dst_start[1] * 7 - 6, dst_start[3], 0, 0, 0, 0, 0)
-        dst_start_secs = time.mktime(dst_start_tuple)
-        dst_start_tuple = time.localtime(dst_start_secs)
+# BOOT PHASE TIMESTAMPS, PRINTED ONCE THE DASHBOARD IS UP SO CHANGES IN TIME TO DASHBOARD ARE VISIBLE
+boot_phases = [('START', time.monotonic_ns())]
+
+def boot_phase(name):
+    boot_phases.append((name, time.monotonic_ns()))
+
+# SETTINGS SAVED IN NVM (BY CALIBRATION.PY) OVERRIDE THE DEFAULTS ABOVE
+config = settings()
+config.load(microcontroller.nvm)
+
+dst_start = config.get('dst_start', dst_start)
+dst_end = config.get('dst_end', dst_end)
+dst_offset = config.get('dst_offset', dst_offset)
+timezone_offset = config.get('timezone_offset', timezone_offset)
+timezone_desc = config.get('timezone_desc', timezone_desc)
+declination = config.get('declination', declination)
+offset_x_axis = config.get('offset_x_axis', offset_x_axis)
+offset_y_axis = config.get('offset_y_axis', offset_y_axis)
+soft_iron = config.get('soft_iron', soft_iron)
+flip_x_axis = config.get('flip_x_axis', flip_x_axis)
+flip_y_axis = config.get('flip_y_axis', flip_y_axis)
+swap_axis = config.get('swap_axis', swap_axis)
+clock_color = config.get('clock_color', clock_color)
+compass_color = config.get('compass_color', compass_color)
+date_color = config.get('date_color', date_color)
+gps_color = config.get('gps_color', gps_color)
+grid_color = config.get('grid_color', grid_color)
+location_color = config.get('location_color', location_color)
+sat_color = config.get('sat_color', sat_color)
+bat_curve = config.get('bat_curve', bat_curve)
+bat_cutoff = config.get('bat_cutoff', bat_cutoff)
+
+# THE HIGH RATE IS SNAPPED TO ONE THE RECEIVER AND THE RATE GUARD BOTH SUPPORT, A VALUE THAT IS NOT A RATE TURNS HIGH
+# RATE MODE OFF
+if gps_high_rate:
+    rate_hz = gps_rate_snap(gps_rate_hz)
+
+    if rate_hz is None:
+        print('GPS RATE {!r} IS NOT VALID, HIGH RATE MODE OFF'.format(gps_rate_hz))
+        gps_high_rate = False
+    elif rate_hz != gps_rate_hz:
+        print('GPS RATE {} HZ NOT SUPPORTED, USING {} HZ'.format(gps_rate_hz, rate_hz))
+        gps_rate_hz = rate_hz
+
+boot_phase('SETTINGS')
+
+# CLOCK TASK TIMING, WAKE 20MS BEFORE THE EXPECTED SECOND EDGE AND POLL EVERY 5MS UNTIL IT ARRIVES
+clock_guard_ns = 20000000
+clock_poll_ns = 5000000
+
+# TIME THE GPS HEARTBEAT CHARACTER STAYS ON SCREEN
+gps_char_ns = 100000000
+
+# GARBAGE COLLECTION GUARD BEFORE THE NEXT EPOCH
+gc_guard_ns = int(gc_guard_ms * 1000000)
+
+# BATTERY GAUGE COLOR FOR EACH PERCENTAGE, RED - ORANGE - YELLOW - GREEN GRADIENT
+# GENERATED BY TOOLS/GEN_BAT_COLORS.PY, WHICH REPRODUCES THE FANCYLED GRADIENT THIS WAS ONCE BUILT WITH AT BOOT
+bat_colors = (
+    0xFF0000, 0xFF0500, 0xFF0A00, 0xFF0F00, 0xFF1400, 0xFF1900, 0xFF1E00, 0xFF2400, 0xFF2900, 0xFF2E00,
+    0xFF3300, 0xFF3800, 0xFF3D00, 0xFF4200, 0xFF4800, 0xFF4D00, 0xFF5200, 0xFF5700, 0xFF5C00, 0xFF6100,
+    0xFF6700, 0xFF6C00, 0xFF7100, 0xFF7600, 0xFF7B00, 0xFF8000, 0xFF8500, 0xFF8B00, 0xFF9000, 0xFF9500,
+    0xFF9A00, 0xFF9F00, 0xFFA500, 0xFFAA00, 0xFFAF00, 0xFFB400, 0xFFB900, 0xFFBF00, 0xFFC400, 0xFFC900,
+    0xFFCE00, 0xFFD300, 0xFFD900, 0xFFDE00, 0xFFE300, 0xFFE800, 0xFFED00, 0xFFF300, 0xFFF800, 0xFFFD00,
+    0xFAFF00, 0xF0FF00, 0xE6FF00, 0xDBFF00, 0xD1FF00, 0xC7FF00, 0xBCFF00, 0xB2FF00, 0xA8FF00, 0x9DFF00,
+    0x93FF00, 0x89FF00, 0x7EFF00, 0x74FF00, 0x6AFF00, 0x5FFF00, 0x55FF00, 0x4AFF00, 0x40FF00, 0x36FF00,
+    0x2BFF00, 0x21FF00, 0x17FF00, 0x0CFF00, 0x02FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00,
+    0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00,
+    0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00, 0x00FF00,
+)
 
-        dst_start_diff = dst_start[2] - dst_start_tuple[6]
-
-        if dst_start_diff < 0:
-            dst_start_diff += 7
-
-        dst_start_secs += dst_start_diff * 86400 - timezone_offset * 3600
-
-        # CALCULATE IN SECONDS THE DST END TIME AND DATE
-        dst_end_tuple = (base_year, dst_end[0], dst_end[1] * 7 - 6, dst_end[3], 0, 0, 0, 0, 0)
-        dst_end_secs = time.mktime(dst_end_tuple) - dst_offset
-        dst_end_tuple = time.localtime(dst_end_secs)
-
-        dst_end_diff = dst_end[2] - dst_end_tuple[6]
-
-        if dst_end_diff < 0:
-            dst_end_diff += 7
-
-        dst_end_secs += dst_end_diff * 86400 - timezone_offset * 3600 - dst_offset
-
-        # IF THE CURRENT TIME AND DATE FALL BETWEEN THE DST START AND END TIMES, SET DST_ACTIVE
-        if base_time_secs >= dst_start_secs and base_time_secs < dst_end_secs:
-            dst_active = True
-        else:
-            dst_active = False
+# SETUP CLOCK
+clock = rtc.RTC()
 
-        # FORMAT UTC DATA
-        self.utc_date = '{} {} {:02d}, {}'.format(day_text[time_utc_tuple[6]], month_text[time_utc_tuple[1] - 1], time_utc_tuple[2], time_utc_tuple[0])
-        self.utc_time = '{:02d}:{:02d}:{:02d}'.format(time_utc_tuple[3], time_utc_tuple[4], time_utc_tuple[5])
+# SETUP OLED DISPLAY
+displayio.release_displays()
+spi = busio.SPI(pin_sck, MOSI=pin_mosi)
+disp_bus = displayio.FourWire(spi, command=pin_dc, chip_select=pin_cs, reset=pin_rst, baudrate=60000000)
+disp = SSD1351(disp_bus, width=disp_x, height=disp_y)
 
-        # CALCULATE TIMEZONE TIME AND DATE
-        time_tz_secs = base_time_secs + timezone_offset * 3600 + dst_active * dst_offset
-        time_tz_tuple = time.localtime(time_tz_secs)
+# DISPLAY SPLASH LOGO, IT STAYS UP WHILE THE GPS AND OTHER HARDWARE ARE SET UP
+bitmap = displayio.OnDiskBitmap(startup_logo)
+tile_grid = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+disp_group = displayio.Group()
+disp_group.append(tile_grid)
+disp.show(disp_group)
 
-        # FORMAT TIMEZONE DATA
-        self.tz_date = '{} {} {:02d}, {}'.format(day_text[time_tz_tuple[6]], month_text[time_tz_tuple[1] - 1], time_tz_tuple[2], time_tz_tuple[0])
-        self.tz_time = '{:02d}:{:02d}:{:02d}'.format(time_tz_tuple[3], time_tz_tuple[4], time_tz_tuple[5])
+boot_phase('SPLASH')
 
-        self.tz_desc = timezone_desc[dst_active]
+# UBX MESSAGE TYPES
+cfg_prt = bytes([0x06, 0x00])
+cfg_msg = bytes([0x06, 0x01])
 
-# SEND UBX MESSAGES TO GPS
-# WAITS FOR ACK/NAK, RETRANSMITS ON FAILED RESPONSE
-# RETURNS TRUE FOR ACK, FALSE FOR NAK
-def ubx_send(msg_type, msg_class, msg_payload):
-    msg_len = len(msg_class) + len(msg_payload)
-    msg_base = msg_type + msg_len.to_bytes(2, 'little') + msg_class + msg_payload
-    msg_out = ubx_header + msg_base + ubx_checksum(msg_base)
+# UBX CLASS IDS
+cls_gll = bytes([0xF0, 0x01])
+cls_gsa = bytes([0xF0, 0x02])
+cls_gsv = bytes([0xF0, 0x03])
+cls_vtg = bytes([0xF0, 0x05])
+cls_gga = bytes([0xF0, 0x00])
+cls_rmc = bytes([0xF0, 0x04])
+cls_nav_pvt = bytes([0x01, 0x07])
 
-    msg_ackx = ubx_ack + len(msg_type).to_bytes(2, 'little') + msg_type
-    msg_ack = ubx_header + msg_ackx + ubx_checksum(msg_ackx)
+# CONFIGURE UART AND GPS BAUD RATE
+serial = busio.UART(pin_tx, pin_rx, baudrate=38400, timeout=1, receiver_buffer_size=256)
 
-    msg_nakx = ubx_nak + len(msg_type).to_bytes(2, 'little') + msg_type
-    msg_nak = ubx_header + msg_nakx + ubx_checksum(msg_nakx)
+# SPLITS THE UART STREAM INTO NMEA SENTENCES AND UBX FRAMES AND PASSES THEM TO THE DECODERS
+# THE UBX PAYLOAD BUFFER HOLDS A NAV-SAT FRAME FOR THE SATELLITE PAGE
+gps_rx = gps_demux(serial, ubx_max_payload=nav_sat_max_len)
+
+# HIGH RATE MODE - RAISE THE RECEIVER'S UART SPEED, REOPEN THE UART TO MATCH AND CHECK THAT CLEAN DATA ARRIVES
+# IF IT DOES NOT, THE RECEIVER IS ASKED TO GO BACK TO 38400 BAUD AND THE NORMAL 1 HZ MODE IS USED
+if gps_high_rate:
+    serial.write(ubx_frame(cfg_prt, ubx_cfg_prt(gps_baud)))
+    time.sleep(0.05)
+    serial.deinit()
+    serial = busio.UART(pin_tx, pin_rx, baudrate=gps_baud, timeout=1, receiver_buffer_size=gps_uart_buffer)
+    gps_rx.set_uart(serial, gps_uart_buffer)
+
+    if not gps_link_check(gps_rx, 2):
+        print('GPS {} BAUD LINK FAILED, HIGH RATE MODE OFF'.format(gps_baud))
+        serial.write(ubx_frame(cfg_prt, ubx_cfg_prt(38400)))
+        time.sleep(0.05)
+        serial.deinit()
+        serial = busio.UART(pin_tx, pin_rx, baudrate=38400, timeout=1, receiver_buffer_size=256)
+        gps_rx.set_uart(serial, 256)
+        gps_high_rate = False
+else:
+    # THE RECEIVER KEEPS ITS UART SPEED UNTIL IT IS POWER CYCLED, SO AFTER A RELOAD FROM A HIGH RATE BOOT IT IS STILL AT
+    # GPS_BAUD. ASK IT TO GO BACK TO 38400 AT THAT SPEED, IF IT IS ALREADY AT 38400 IT SEES A FRAMING ERROR AND IGNORES IT
+    serial.deinit()
+    serial = busio.UART(pin_tx, pin_rx, baudrate=gps_baud, timeout=1, receiver_buffer_size=256)
+    serial.write(ubx_frame(cfg_prt, ubx_cfg_prt(38400)))
+    time.sleep(0.05)
+    serial.deinit()
+    serial = busio.UART(pin_tx, pin_rx, baudrate=38400, timeout=1, receiver_buffer_size=256)
+    gps_rx.set_uart(serial, 256)
 
-    while True:
-        serial.reset_input_buffer()
-        serial.write(msg_out)
-        msg_res = serial.read(10)
+# DISABLE NMEA GLL, GSA, GSV AND VTG MESSAGES, ONLY RMC AND GGA ARE NEEDED
+# ENABLING MORE MESSAGES THAN NEEDED CAN CAUSE SERIAL BUFFER OVERRUNS AND DEVICE LOCKUPS
+# ALL COMMANDS ARE SENT IN ONE BATCH AND THE ACK/NAK REPLIES ARE PICKED OUT OF THE INCOMING NMEA TRAFFIC
+payload = bytes([0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
+payload_uart1 = bytes([0x00, 0x01, 0x00, 0x00, 0x00, 0x00])
+
+gps_config = ubx_config(gps_rx, timeout=gps_config_timeout, retries=gps_config_retries)
+gps_config.add('GLL OFF', cfg_msg, cls_gll + payload)
+gps_config.add('GSA OFF', cfg_msg, cls_gsa + payload)
+gps_config.add('GSV OFF', cfg_msg, cls_gsv + payload)
+gps_config.add('VTG OFF', cfg_msg, cls_vtg + payload)
+
+# POWER SAVE - CYCLIC TRACKING AT ONE FIX PER SECOND, ONLY USED ONCE CFG-RXM SWITCHES TO POWER SAVE WHILE STATIONARY
+gps_save = pwr_save_enabled and not gps_high_rate
+
+if gps_save:
+    pm2_cmd = gps_config.add('PM2 CYCLIC', cfg_pm2_type, ubx_cfg_pm2(1000, 10000))
+
+# UBX MODE - ENABLE NAV-PVT ONCE PER EPOCH ON UART1, THEN DISABLE NMEA RMC AND GGA
+# IF THE RECEIVER NAKS NAV-PVT, RMC AND GGA ARE LEFT ON AND NMEA IS USED
+# NMEA MODE PUTS RMC AND GGA BACK AND NAV-PVT OFF IN CASE A UBX MODE BOOT BEFORE A RELOAD CHANGED THEM
+if gps_ubx_mode:
+    nav_pvt_cmd = gps_config.add('NAV-PVT ON', cfg_msg, cls_nav_pvt + payload_uart1)
+else:
+    gps_config.add('RMC ON', cfg_msg, cls_rmc + payload_uart1)
+    gps_config.add('GGA ON', cfg_msg, cls_gga + payload_uart1)
+    gps_config.add('NAV-PVT OFF', cfg_msg, cls_nav_pvt + payload)
+
+# HIGH RATE MODE - MEASUREMENT RATE, IF IT IS NOT TAKEN THE RECEIVER STAYS AT 1 HZ
+# OTHERWISE 1 HZ IS SET, THE RECEIVER KEEPS A HIGH RATE FROM BEFORE A RELOAD UNTIL IT IS POWER CYCLED
+if gps_high_rate:
+    rate_cmd = gps_config.add('RATE {} HZ'.format(gps_rate_hz), cfg_rate_type, ubx_cfg_rate(gps_rate_hz))
+else:
+    gps_config.add('RATE 1 HZ', cfg_rate_type, ubx_cfg_rate(1))
 
-        if msg_res == msg_ack:
-            return True
-        elif msg_res == msg_nak:
-            return False
-        elif msg_type == cfg_prt:
-            return None
+serial.reset_input_buffer()
+gps_failed = gps_config.run()
+gps_ubx_active = False
 
-        time.sleep(0.1)
+if gps_ubx_mode and nav_pvt_cmd.state == cmd_ack:
+    gps_ubx_active = True
+    gps_config.add('RMC OFF', cfg_msg, cls_rmc + payload)
+    gps_config.add('GGA OFF', cfg_msg, cls_gga + payload)
+    gps_failed += gps_config.run()
 
-# CALCULATE CHECKSUMS FOR UBX MESSAGES
-def ubx_checksum(msg):
-    cs_a = 0x00
-    cs_b = 0x00
-
-    for i in range(len(msg)):
-        cs_a += msg[i]
-        cs_b += cs_a
-
-    checksum = (cs_a & 255).to_bytes(1, 'big') + (cs_b & 255).to_bytes(1, 'big')
-    return checksum
-
-# CALCULATE MAIDENHEAD GRID SQUARE BASED ON CURRENT LAT / LON
-def calc_grid(latitude, longitude):
-    grid_lat_adj = latitude + 90
-    grid_lat_sq = grid_upper[int(grid_lat_adj / 10)]
-    grid_lat_field = str(int(grid_lat_adj % 10))
-    grid_lat_rem = (grid_lat_adj - int(grid_lat_adj)) * 60
-    grid_lat_subsq = grid_lower[int(grid_lat_rem / 2.5)]
+if gps_high_rate and rate_cmd.state != cmd_ack:
+    gps_high_rate = False
 
-    grid_lon_adj = longitude + 180
-    grid_lon_sq = grid_upper[int(grid_lon_adj / 20)]
-    grid_lon_field = str(int((grid_lon_adj/2) % 10))
-    grid_lon_rem = (grid_lon_adj - int(grid_lon_adj / 2) * 2) * 60
-    grid_lon_subsq = grid_lower[int(grid_lon_rem / 5)]
-
-    return grid_lon_sq + grid_lat_sq + grid_lon_field + grid_lat_field + grid_lon_subsq + grid_lat_subsq
+# REPORT ANY CONFIGURATION STEPS THE RECEIVER REJECTED OR NEVER ANSWERED, THEN CARRY ON
+for cmd in gps_failed:
+    print('GPS CONFIG {} {}'.format(cmd.name, 'NAK' if cmd.state == cmd_nak else 'TIMEOUT'))
 
-# CALCULATE ANGLE FROM MAGNETOMETER DATA
-def comp_degree(x_axis, y_axis):
-    x_axis -= offset_x_axis
-    y_axis -= offset_y_axis
+# WARM START, SEND THE LAST SAVED POSITION AND THE RTC TIME IF IT IS STILL VALID
+gps_warm = gps_assist(microcontroller.nvm)
+gps_warm.load()
+gps_warm.send(serial, assist_pos_accuracy, assist_time_accuracy)
 
-    if flip_x_axis:
-        x_axis *= -1
-
-    if flip_y_axis:
-        y_axis *= -1
-
-    if swap_axis:
-        x_axis, y_axis = y_axis, x_axis
-
-    if (x_axis > 0) and (y_axis == 0):
-        angle = declination
-    elif (x_axis < 0) and (y_axis == 0):
-        angle = 180 + declination
-    elif y_axis > 0:
-        angle = 90 - math.atan(x_axis/y_axis) * 180 / math.pi + declination
-    elif y_axis < 0:
-        angle = 270 - math.atan(x_axis/y_axis) * 180 / math.pi + declination
-
-    if angle < 0:
-        angle += 360
-
-    if angle >= 360:
-        angle -= 360
-
-    return angle
-
-# CALCULATE COMPASS DIRECTION FROM ANGLE
-def comp_direction(degrees):
-    if degrees == -1:
-        direction = '---'
-    elif (degrees < 11.25) or (degrees >= 348.75):
-        direction = 'N'
-    else:
-        for i in range(15):
-            c_angle = comp_angle[i]
+timer_start_gps = time.monotonic()
 
-            if (degrees >= c_angle) and (degrees < (c_angle + 22.5)):
-                direction = comp_point[i]
-                break
+# SETUP GPS DECODING, THE CONFIGURATION ENGINE IS NO LONGER NEEDED ONCE THE RECEIVER IS SET UP
+# ONLY THE DECODER IN USE IS IMPORTED
+gps_rx.remove_ubx(gps_config)
 
-    return direction
+if gps_ubx_active:
+    from ubx import ubx_gps
+    gps = ubx_gps()
+    gps_rx.add_ubx(gps)
+else:
+    from nmea import nmea_gps
+    gps = nmea_gps()
+    gps_rx.add_nmea(gps)
 
-# CALCULATE BATTERY PERCENTAGE
-def bat_level(adc_value):
-    bat_percent = 0
+# SUB SECOND TIME, FED AFTER THE DECODER SO IT SEES THE NEW TIME
+sync = time_sync(gps_rx, gps, time_offset_ms, time_window, reject_ms=time_reject_ms)
 
-    for percent in range(10, 1, -1):
-        if adc_value <= bat_curve[percent] and adc_value > bat_curve[percent - 1]:
-            bat_percent = percent * 10
-            break
+if gps_ubx_active:
+    gps_rx.add_ubx(sync)
+else:
+    gps_rx.add_nmea(sync)
 
-    return bat_percent
+# SATELLITES IN VIEW FOR THE SATELLITE PAGE, ONLY SENT BY THE RECEIVER WHILE THE PAGE IS SHOWN
+sky_data = sky_sats()
 
-# SETUP CLOCK
-clock = rtc.RTC()
+if gps_ubx_active:
+    gps_rx.add_ubx(sky_data)
+else:
+    gps_rx.add_nmea(sky_data)
 
-# SETUP OLED DISPLAY
-displayio.release_displays()
-spi = busio.SPI(pin_sck, MOSI=pin_mosi)
-disp_bus = displayio.FourWire(spi, command=pin_dc, chip_select=pin_cs, reset=pin_rst, baudrate=60000000)
-disp = SSD1351(disp_bus, width=disp_x, height=disp_y)
+boot_phase('GPS CONFIG')
 
 # SETUP MAGNETOMETER
+import adafruit_lsm303dlh_mag
+
 i2c = busio.I2C(pin_scl, pin_sda)
 comp = adafruit_lsm303dlh_mag.LSM303DLH_Mag(i2c)
+heading = compass(comp, offset_x_axis, offset_y_axis, flip_x_axis, flip_y_axis, swap_axis, declination, comp_samples, comp_hysteresis, soft_iron)
 
 # SETUP ADC FOR BATTERY MONITORING
 bat = analogio.AnalogIn(pin_battery)
+battery = bat_monitor(bat, bat_curve, bat_samples, bat_smooth, bat_rate_secs)
 
-# DISPLAY SPLASH LOGO
-bitmap = displayio.OnDiskBitmap(startup_logo)
-tile_grid = displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
-disp_group = displayio.Group()
-disp_group.append(tile_grid)
-disp.show(disp_group)
+# SETUP TRACK LOG, DISABLED IF THE FILESYSTEM IS NOT WRITABLE
+track = track_log(track_log_path, blocks=track_log_blocks)
 
-# CREATE COLOR GRADIENT AND PALETTE FOR BATTERY GAUGE
-bat_gradient = [(0.0, 0xFF0000), (0.25, 0xFF7F00), (0.50, 0xFFFF00), (0.75, 0x00FF00)]
-bat_palette = fancy.expand_gradient(bat_gradient, 100)
-bat_colors = []
+if track_log_enabled and not track.open():
+    print('TRACK LOG DISABLED, FILESYSTEM IS READ ONLY')
 
-for i in range(100):
-    color = fancy.palette_lookup(bat_palette, i / 100)
-    bat_colors.append(color.pack())
+boot_phase('HARDWARE')
 
 # REMOVE SPLASH LOGO
-time.sleep(1.5)
 disp_group.remove(tile_grid)
 
-# DISPLAY VERSION
-message_text = 'Version ' + version
-message_x = int((disp_x - len(message_text) * char_width) / 2)
-message_text = bitmap_label.Label(font, text=message_text, color=0xFFB000, x=message_x, y=int(disp_y / 2))
-disp_group.append(message_text)
-time.sleep(1.0)
-disp_group.remove(message_text)
+# DISPLAY VERSION AT THE BOTTOM OF THE SCREEN UNTIL THE DASHBOARD IS UP
+version_text = 'Version ' + version
+version_x = int((disp_x - len(version_text) * char_width) / 2)
+version_text = bitmap_label.Label(font, text=version_text, color=0xFFB000, x=version_x, y=disp_y - char_height)
+disp_group.append(version_text)
 
-# CONFIGURE GPS
-message_text = ('Configuring GPS')
-message_x = int((disp_x - len(message_text) * char_width) / 2)
-message_text = bitmap_label.Label(font, text=message_text, color=0x00FFFF, x=message_x, y=int(disp_y / 2))
-disp_group.append(message_text)
+# SHOW ANY FAILED GPS CONFIGURATION STEPS UNTIL THE DASHBOARD IS UP
+boot_labels = [version_text]
 
-# UBX HEADER
-ubx_header = bytes([0xb5, 0x62])
+if gps_failed:
+    failed_text = 'GPS Config Failed'
+    failed_x = int((disp_x - len(failed_text) * char_width) / 2)
+    failed_text = bitmap_label.Label(font, text=failed_text, color=0xFF0000, x=failed_x, y=char_height)
+    disp_group.append(failed_text)
+    boot_labels.append(failed_text)
 
-# UBX ACK/NAK
-ubx_ack = bytes([0x05, 0x01])
-ubx_nak = bytes([0x05, 0x00])
-
-# UBX MESSAGE TYPES
-cfg_prt = bytes([0x06, 0x00])
-cfg_msg = bytes([0x06, 0x01])
-
-# UBX CLASS IDS
-cls_gll = bytes([0xF0, 0x01])
-cls_gsa = bytes([0xF0, 0x02])
-cls_gsv = bytes([0xF0, 0x03])
-cls_vtg = bytes([0xF0, 0x05])
-
-# CONFIGURE UART AND GPS BAUD RATE
-serial = busio.UART(pin_tx, pin_rx, baudrate=38400, timeout=1, receiver_buffer_size=256)
-
-# DISABLE NMEA GLL, GSA, GSV AND VTG MESSAGES, ONLY RMC AND GGA ARE NEEDED
-# ENABLING MORE MESSAGES THAN NEEDED CAN CAUSE SERIAL BUFFER OVERRUNS AND DEVICE LOCKUPS
-payload = bytes([0x00, 0x00, 0x00, 0x00, 0x00, 0x00])
-
-while not ubx_send(cfg_msg, cls_gll, payload):
-    time.sleep(.1)
-
-while not ubx_send(cfg_msg, cls_gsa, payload):
-    time.sleep(.1)
-
-while not ubx_send(cfg_msg, cls_gsv, payload):
-    time.sleep(.1)
-
-while not ubx_send(cfg_msg, cls_vtg, payload):
-    time.sleep(0.1)
-
-disp_group.remove(message_text)
+    failed_text = ' '.join([cmd.name[:3] for cmd in gps_failed])
+    failed_x = int((disp_x - len(failed_text) * char_width) / 2)
+    failed_text = bitmap_label.Label(font, text=failed_text, color=0xFFFFFF, x=failed_x, y=char_height * 2 + 2)
+    disp_group.append(failed_text)
+    boot_labels.append(failed_text)
 
 # CONFIGURE GPS
 message_text = ('Waiting for GPS Fix')
@@ -404,20 +534,17 @@ message_x = int((disp_x - len(message_text) * char_width) / 2)
 message_text = bitmap_label.Label(font, text=message_text, color=0x00FFFF, x=message_x, y=int(disp_y / 2))
 disp_group.append(message_text)
 
-timer_start_gps = time.monotonic()
 counter_text = '00:00'
 counter_x = int((disp_x - len(counter_text) * char_width) / 2)
 counter_text = bitmap_label.Label(font, text=counter_text, color=0xFFFFFF, x=counter_x, y=int(disp_y / 2) + char_height + 2)
 disp_group.append(counter_text)
 
-# SETUP GPS DECODING
-gps = adafruit_gps.GPS(serial, debug=False)
-
 # WAIT FOR INITIAL GPS FIX
+# POLL AT THE GPS TASK RATE, A LONGER SLEEP LETS THE UART BUFFER OVERFLOW AND DELAYS SEEING THE FIX
 old_counter = -1
 
 while not gps.has_fix:
-    gps.update()
+    gps_rx.update()
     counter_gps = time.monotonic() - timer_start_gps
     counter_min = int(counter_gps / 60)
     counter_sec = int(counter_gps % 60)
@@ -426,8 +553,10 @@ while not gps.has_fix:
         old_counter = counter_sec
         counter_text.text = '{:02d}:{:02d}'.format(counter_min, counter_sec)
 
-    time.sleep(0.2)
+    time.sleep(gps_rate)
 
+gps_ttff = time.monotonic() - timer_start_gps
+boot_phase('GPS FIX')
 disp_group.remove(message_text)
 
 serial.reset_input_buffer()
@@ -438,27 +567,51 @@ message_text = bitmap_label.Label(font, text=message_text, color=0x00FFFF, x=mes
 disp_group.append(message_text)
 
 # WAIT FOR VALID TIME DATA TO SET RTC
+# IN UBX MODE TIMESTAMP_UTC STAYS NONE UNTIL THE RECEIVER FLAGS BOTH DATE AND TIME AS VALID
 while True:
-    if gps.timestamp_utc.tm_year != 0:
+    if gps.timestamp_utc is not None and gps.timestamp_utc.tm_year != 0:
         break
 
-    gps.update()
+    gps_rx.update()
     counter_gps = time.monotonic() - timer_start_gps
     counter_min = int(counter_gps / 60)
     counter_sec = int(counter_gps % 60)
-    counter_text.text = '{:02d}:{:02d}'.format(counter_min, counter_sec)
-    time.sleep(0.5)
+
+    if old_counter != counter_sec:
+        old_counter = counter_sec
+        counter_text.text = '{:02d}:{:02d}'.format(counter_min, counter_sec)
+
+    time.sleep(gps_rate)
 
 # SET RTC TO GPS TIME (GPS REFERENCES UTC)
 clock.datetime = time.struct_time((gps.timestamp_utc.tm_year, gps.timestamp_utc.tm_mon, gps.timestamp_utc.tm_mday, gps.timestamp_utc.tm_hour, gps.timestamp_utc.tm_min, gps.timestamp_utc.tm_sec, 0, -1, -1))
 rtc.set_time_source(gps)
+
+# SAVE THE FIRST FIX AND LOG THE TIME TO FIRST FIX
+gps_warm.set_fix(gps.latitude, gps.longitude, gps.altitude_m or 0, time.time())
+gps_warm.log(gps_ttff)
+gps_warm.save()
+
+for line in gps_warm.report():
+    print(line)
+
 disp_group.remove(counter_text)
 disp_group.remove(message_text)
 
-# DISPLAY BATTERY GAUGE
+for boot_label in boot_labels:
+    disp_group.remove(boot_label)
+
+boot_phase('TIME SYNC')
+
+# DISPLAY BATTERY GAUGE, ONLY NEEDED ONCE THE DASHBOARD IS BUILT
+from adafruit_progressbar.horizontalprogressbar import (HorizontalProgressBar, HorizontalFillDirection)
+
 bat_progress_bar = HorizontalProgressBar((disp_x - bat_x, 0), (bat_x, bat_y), value=0, min_value=0, max_value=100, fill_color=0x000000, outline_color=0xFFFFFF, bar_color=0x00FF00, direction=HorizontalFillDirection.LEFT_TO_RIGHT)
 disp_group.append(bat_progress_bar)
 
+bat_time_text = bitmap_label.Label(font, text=' '*5, color=0xFFFFFF, x=disp_x - bat_x - char_width * 5 - 2, y=char_start)
+disp_group.append(bat_time_text)
+
 # DISPLAY TIME AND DATE FIELDS
 utc_clock_text = bitmap_label.Label(font, text=' '*8, color=clock_color, x=0, y=char_start)
 disp_group.append(utc_clock_text)
@@ -482,7 +635,7 @@ disp_group.append(tz_date_text)
 lat_label = bitmap_label.Label(font, text='Lat:', color=location_color, x=0, y=char_start + (char_height + line_space) * 4 + line_gap * 2)
 disp_group.append(lat_label)
 
-lat_text = bitmap_label.Label(font, text=' '*8, color=location_color, x=char_width * 6, y=char_start + (char_height + line_space) * 4 + line_gap * 2)
+lat_text = num_field(font, 8, 4, location_color, x=char_width * 6, y=char_start + (char_height + line_space) * 4 + line_gap * 2)
 disp_group.append(lat_text)
 
 grid_text = bitmap_label.Label(font, text=' '*6, color=grid_color, x=char_width * 15, y=char_start + (char_height + line_space) * 4 + line_gap * 2)
@@ -491,9 +644,12 @@ disp_group.append(grid_text)
 lon_label = bitmap_label.Label(font, text='Lon:', color=location_color, x=0, y=char_start + (char_height + line_space) * 5 + line_gap * 2)
 disp_group.append(lon_label)
 
-lon_text = bitmap_label.Label(font, text=' '*9, color=location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 5 + line_gap * 2)
+lon_text = num_field(font, 9, 4, location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 5 + line_gap * 2)
 disp_group.append(lon_text)
 
+grid_ext_text = bitmap_label.Label(font, text=' '*4, color=grid_color, x=char_width * 15, y=char_start + (char_height + line_space) * 5 + line_gap * 2)
+disp_group.append(grid_ext_text)
+
 gps_update_text = bitmap_label.Label(font, text=' ', color=gps_color, x=char_width * 20, y=char_start + (char_height + line_space) * 5 + line_gap * 2)
 disp_group.append(gps_update_text)
 
@@ -501,13 +657,13 @@ disp_group.append(gps_update_text)
 alt_label = bitmap_label.Label(font, text='Alt:', color=location_color, x=0, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
 disp_group.append(alt_label)
 
-alt_ft_text = bitmap_label.Label(font, text=' '*5, color=location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
+alt_ft_text = num_field(font, 5, 0, location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
 disp_group.append(alt_ft_text)
 
 alt_ft_label = bitmap_label.Label(font, text='FT', color=location_color, x=char_width * 11, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
 disp_group.append(alt_ft_label)
 
-alt_m_text = bitmap_label.Label(font, text=' '*5, color=location_color, x=char_width * 14, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
+alt_m_text = num_field(font, 5, 0, location_color, x=char_width * 14, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
 disp_group.append(alt_m_text)
 
 alt_m_label = bitmap_label.Label(font, text='M', color=location_color, x=char_width * 20, y=char_start + (char_height + line_space) * 6 + line_gap * 3)
@@ -516,200 +672,424 @@ disp_group.append(alt_m_label)
 speed_label = bitmap_label.Label(font, text='Spd:', color=location_color, x=0, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
 disp_group.append(speed_label)
 
-speed_text = bitmap_label.Label(font, text=' '*5, color=location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
+speed_text = num_field(font, 5, 1, location_color, x=char_width * 5, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
 disp_group.append(speed_text)
 
 track_label = bitmap_label.Label(font, text='Trk:', color=location_color, x=char_width * 11, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
 disp_group.append(track_label)
 
-track_text = bitmap_label.Label(font, text=' '*5, color=location_color, x=char_width * 16, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
+track_text = num_field(font, 5, 1, location_color, x=char_width * 16, y=char_start + (char_height + line_space) * 7 + line_gap * 3)
 disp_group.append(track_text)
 
 sat_count_label = bitmap_label.Label(font, text='Satellites:', color=sat_color, x=0, y=char_start + (char_height + line_space) * 8 + line_gap * 4)
 disp_group.append(sat_count_label)
 
-sat_count_text = bitmap_label.Label(font, text='  ', color=sat_color, x=char_width * 12, y=char_start + (char_height + line_space) * 8 + line_gap * 4)
+sat_count_text = num_field(font, 2, 0, sat_color, x=char_width * 12, y=char_start + (char_height + line_space) * 8 + line_gap * 4)
 disp_group.append(sat_count_text)
 
 comp_text = bitmap_label.Label(font, text='   ', color=compass_color, x=char_width * 18, y=char_start + (char_height + line_space) * 8 + line_gap * 4)
 disp_group.append(comp_text)
 
+# HIDDEN DEBUG PAGE, TASK TIMES, UART AND HEAP. SHOWN IN PLACE OF THE DASHBOARD, WHICH KEEPS UPDATING UNDERNEATH
+debug_group = displayio.Group()
+debug_text = []
+
+for i in range(len(debug_tasks) + 5):
+    debug_line = bitmap_label.Label(font, text=' ', color=debug_color, x=0, y=char_start + (char_height + line_space) * i)
+    debug_group.append(debug_line)
+    debug_text.append(debug_line)
+
+# SATELLITE PAGE, BUILT NOW AND SWAPPED IN LIKE THE DEBUG PAGE
+sky = sky_page(sky_data, gps_config, cls_nav_sat if gps_ubx_active else cls_gsv, font, sat_color, char_start)
+
+# UTC / TIMEZONE CLOCK, DST TRANSITIONS ARE CACHED PER YEAR
+curr_datetime = comp_date_time(dst_start, dst_end, dst_offset, timezone_offset, timezone_desc)
+
+# GRID SQUARE LOCATOR
+locator = grid_locator(grid_chars, grid_hysteresis_m)
+
+# CURRENT FIX, UPDATED IN PLACE BY THE GPS TASK
+fix = fix_state()
+
+# DASHBOARD LABEL CHANGES ARE BATCHED AND SENT TO THE DISPLAY BY THE DISPLAY TASK
+render = render_stage(disp, disp_fps, char_width, char_height)
+
+# RECEIVER POWER SAVE AND DISPLAY DIMMING, RECEIVER POWER SAVE IS ONLY USED IF IT ACCEPTED THE CYCLIC TRACKING SETUP
+power = power_save(gps_config, disp_bus, render, gps_save and pm2_cmd.state == cmd_ack, pwr_still_knots, pwr_still_secs, pwr_idle_rate, disp_dim_secs, disp_blank_secs, disp_dim_contrast, bat_capacity_mah)
+
+# USB TELEMETRY, ONLY IF BOOT.PY ENABLED THE DATA PORT
+if usb_cdc.data is None:
+    telem_mode = None
+
+if telem_mode:
+    telem = telemetry(usb_cdc.data, telem_mode, telem_buffer)
+
+# HIGH RATE BACK PRESSURE CHECK, EXPECTS RMC + GGA OR ONE NAV-PVT PER EPOCH
+if gps_high_rate:
+    rate = rate_guard(gps_rx, gps_config, gps_rate_hz, 1 if gps_ubx_active else 2, gps_uart_buffer)
+    power.epoch_ns = 1000000000 // rate.rate
+
+# LAST DISPLAYED VALUES, LABELS ARE ONLY UPDATED WHEN DATA HAS CHANGED. GPS LABELS FOLLOW THE FIX CHANGED BITS
+class last:
+    tz_date = None
+    tz_desc = None
+    tz_time = None
+    utc_date = None
+    utc_time = None
+    bat_percent = -1
+    secs = None
+    gps_ns = 0
+    page = None
+    log_secs = 0
+    flush_secs = 0
+
+# GET GPS DATA, UPDATE GPS LABELS IF DATA HAS CHANGED
+def gps_ingest():
+    # EACH UPDATE PARSES EVERYTHING WAITING IN THE UART BUFFER, BOUNDED SO A BUSY UART CANNOT STARVE THE OTHER TASKS
+    for _ in range(gps_max_reads):
+        if not gps_rx.update():
+            break
+
+        render.set_text(gps_update_text, gps_char)
+        last.gps_ns = time.monotonic_ns()
+        fix.update(gps)
+
+        # THE SPEED TELLS POWER SAVE WHETHER THE UNIT IS MOVING
+        if fix.valid & fix_speed:
+            power.motion(fix.speed, last.gps_ns)
+
+        # LOG THE FIX, TIMESTAMPED WITH THE SECOND THE CLOCK TASK LAST SAW, ONLY ENCODED INTO RAM HERE
+        if fix.valid & fix_lock and fix.valid & fix_pos and last.secs is not None and last.secs - last.log_secs >= track_log_rate:
+            last.log_secs = last.secs
+            track.add(last.secs, fix.lat, fix.lon, fix.alt, fix.speed, fix.track, fix.sats)
+
+    # UPDATE ONLY THE LABELS WHOSE DATA HAS CHANGED
+    changed = fix.take()
+
+    # THE LOCATOR IS ONLY RECALCULATED ONCE THE FIX HAS LEFT THE CURRENT CELL
+    if changed & fix_pos and fix.valid & fix_pos:
+        render.set_number(lat_text, fix.lat)
+        render.set_number(lon_text, fix.lon)
+
+        if locator.update(fix.lat, fix.lon):
+            render.set_text(grid_text, locator.text[:6])
+
+            if grid_chars > 6:
+                render.set_text(grid_ext_text, locator.text[6:])
+
+    if changed & fix_alt:
+        render.set_number(alt_ft_text, int(fix.alt * 3.28084))
+        render.set_number(alt_m_text, fix.alt)
+
+    # CONVERT FROM KNOTS TO MPH
+    if changed & fix_speed:
+        render.set_number(speed_text, fix.speed * 1.15078)
+
+    if changed & fix_track:
+        render.set_number(track_text, fix.track)
+
+    if changed & fix_sats:
+        render.set_number(sat_count_text, fix.sats)
+
+    # WHILE STATIONARY SLEEP BETWEEN EPOCHS INSTEAD OF POLLING
+    return power.gps_delay(time.monotonic_ns(), gps_rx.bytes_in)
+
+# GET CURRENT FORMATTED TIME AND DATE, UPDATE LABELS IF ANY HAVE CHANGED
+# ONCE THE TIME SYNC IS LOCKED THE SECOND COMES FROM ITS FIT AND THE NEXT RUN IS SCHEDULED ON THE NEXT TRUE SECOND
+# UNTIL THEN THE RTC ONLY COUNTS WHOLE SECONDS, SO THE EDGE IS FOUND BY POLLING AND THE NEXT RUN IS SCHEDULED JUST
+# BEFORE THE NEXT EDGE
+def clock_tick():
+    if sync.locked:
+        curr_secs = sync.second(time.monotonic_ns())
+    else:
+        curr_secs = time.time()
+
+    if curr_secs == last.secs:
+        return sync.until_next(time.monotonic_ns()) if sync.locked else clock_poll_ns
+
+    last.secs = curr_secs
+    curr_datetime.update(curr_secs)
+
+    if last.utc_time != curr_datetime.utc_time:
+        last.utc_time = curr_datetime.utc_time
+        render.set_text(utc_clock_text, curr_datetime.utc_time)
+
+    if last.utc_date != curr_datetime.utc_date:
+        last.utc_date = curr_datetime.utc_date
+        render.set_text(utc_date_text, curr_datetime.utc_date)
+
+    if last.tz_time != curr_datetime.tz_time:
+        last.tz_time = curr_datetime.tz_time
+        render.set_text(tz_clock_text, curr_datetime.tz_time)
+
+    if last.tz_desc != curr_datetime.tz_desc:
+        last.tz_desc = curr_datetime.tz_desc
+        render.set_text(tz_clock_label, curr_datetime.tz_desc)
+
+    if last.tz_date != curr_datetime.tz_date:
+        last.tz_date = curr_datetime.tz_date
+        render.set_text(tz_date_text, curr_datetime.tz_date)
+
+    if sync.locked:
+        return sync.until_next(time.monotonic_ns())
+
+    return 1000000000 - clock_guard_ns
+
+# SAMPLE MAGNETOMETER AND UPDATE LABEL IF THE FILTERED DIRECTION HAS CHANGED, TURNING THE UNIT WAKES THE DISPLAY
+def comp_update():
+    heading.sample()
+
+    if heading.update():
+        pad_length = 3 - len(heading.direction)
+        render.set_text(comp_text, ' '*pad_length + heading.direction)
+        power.wake(time.monotonic_ns())
+
+    return power.task_delay()
+
+# CHECK BATTERY VOLTAGE AND CALCULATE PERCENTAGE OF CHARGE AND HOURS REMAINING
+def bat_check():
+    battery.update(time.monotonic_ns())
+    curr_bat_percent = int(battery.percent + 0.5)
+
+    # UPDATE BATTERY GAUGE IF PERCENTAGE HAS CHANGED, THE COLOR TABLE STARTS AT 1 PERCENT
+    if last.bat_percent != curr_bat_percent:
+        last.bat_percent = curr_bat_percent
+        bat_progress_bar.bar_color = bat_colors[curr_bat_percent - 1 if curr_bat_percent else 0]
+        bat_progress_bar.value = curr_bat_percent
+        render.mark(bat_x * bat_y)
+
+    # HOURS REMAINING, BLANK UNTIL THE DISCHARGE RATE IS KNOWN AND WHILE CHARGING
+    hours = battery.hours_left
+
+    if hours is None:
+        render.set_text(bat_time_text, ' '*5)
+    elif hours < 10:
+        render.set_text(bat_time_text, '{:4.1f}H'.format(hours))
+    else:
+        render.set_text(bat_time_text, '{:4d}H'.format(min(int(hours), 999)))
+
+    if battery.value <= bat_cutoff:
+        disp_group.remove(utc_clock_text)
+        disp_group.remove(utc_clock_label)
+        disp_group.remove(utc_date_text)
+        disp_group.remove(tz_clock_text)
+        disp_group.remove(tz_clock_label)
+        disp_group.remove(tz_date_text)
+        disp_group.remove(lat_label)
+        disp_group.remove(lat_text)
+        disp_group.remove(grid_text)
+        disp_group.remove(grid_ext_text)
+        disp_group.remove(lon_label)
+        disp_group.remove(lon_text)
+        disp_group.remove(gps_update_text)
+        disp_group.remove(alt_label)
+        disp_group.remove(alt_ft_text)
+        disp_group.remove(alt_ft_label)
+        disp_group.remove(alt_m_text)
+        disp_group.remove(alt_m_label)
+        disp_group.remove(speed_label)
+        disp_group.remove(speed_text)
+        disp_group.remove(track_label)
+        disp_group.remove(track_text)
+        disp_group.remove(sat_count_label)
+        disp_group.remove(sat_count_text)
+        disp_group.remove(comp_text)
+
+        message_text = 'LOW BATTERY'
+        message_x = int((disp_x - len(message_text) * char_width) / 2)
+        message_text = bitmap_label.Label(font, text=message_text, color=0xFFB000, x=message_x, y=int(disp_y / 2))
+        disp_group.append(message_text)
+
+        # SAVE THE REST OF THE TRACK LOG AND THE LAST POSITION FOR THE NEXT WARM START
+        track.flush(True)
+        assist_save(True)
+
+        # HAND REFRESHING BACK TO DISPLAYIO SO THE MESSAGE IS SHOWN, THEN HALT EVERYTHING, INCLUDING THE OTHER TASKS
+        disp.show(disp_group)
+        power.set_display(disp_on)
+        render.stop()
+
+        while True:
+            pass
+
+# CLEAR THE GPS HEARTBEAT ONCE IT HAS BEEN SHOWN LONG ENOUGH TO BE SEEN, THEN SEND ALL LABEL CHANGES IN ONE FRAME
+# THE FRAME IS OUT AND THE NEXT ONE IS A FRAME TIME AWAY, SO THIS IS WHEN THE GARBAGE IS COLLECTED, IF NO GPS MESSAGE IS
+# ARRIVING OR DUE
+def disp_flush():
+    if last.gps_ns and time.monotonic_ns() - last.gps_ns >= gps_char_ns:
+        last.gps_ns = 0
+        render.set_text(gps_update_text, ' ')
+
+    render.commit()
+    now = time.monotonic_ns()
+
+    if profile.gc_due(now) and gps_rx.idle() and (not sync.locked or sync.until_next(now) > gc_guard_ns):
+        profile.collect(now)
+
+    return power.task_delay()
+
+# SWITCH THE RECEIVER AND DISPLAY POWER STATES AND ADD UP THE ESTIMATED CHARGE USED
+def power_tick():
+    busy_ns = 0
+
+    for task in tasks:
+        busy_ns += task.run_ns
+
+    power.tick(time.monotonic_ns(), busy_ns)
+
+# STEP THE HIGH RATE MODE DOWN IF THE PARSER IS FALLING BEHIND, POWER SAVE WAKES THE GPS TASK AT THE RATE IN USE
+def rate_check():
+    if not gps_high_rate:
+        return
+
+    rate.check(time.monotonic_ns())
+    power.epoch_ns = 1000000000 // rate.rate
+
+# SAVE THE CURRENT POSITION FOR THE NEXT WARM START ONCE IT HAS MOVED FAR FROM THE SAVED ONE, OR ANY CHANGE WHEN FINAL
+# THE FIRST RUN AT BOOT FINDS THE POSITION JUST SAVED
+def assist_save(final=False):
+    if not (fix.valid & fix_lock and fix.valid & fix_pos):
+        return
+
+    moved = gps_warm.moved_m(fix.lat, fix.lon)
+
+    if moved is None or moved >= assist_move_m or (final and moved > 0):
+        gps_warm.set_fix(fix.lat, fix.lon, fix.alt, time.time())
+        gps_warm.save()
+
+# WRITE FULL TRACK LOG BLOCKS, AND THE PARTLY FILLED ONE EVERY TRACK_FLUSH_RATE SECONDS
+def track_flush():
+    partial = last.secs is not None and last.secs - last.flush_secs >= track_flush_rate
+
+    if partial:
+        last.flush_secs = last.secs
+
+    track.flush(partial)
+
+# QUEUE A TELEMETRY RECORD WITH THE LAST FIX, THE RTC TIME AND THE LOCATOR
+# THE FIX STATE HOLDS THE LAST POSITION AFTER THE FIX IS LOST, IT IS ONLY SENT WHILE THE RECEIVER HAS A FIX SO THE
+# RECORD IS MARKED VOID / NO FIX INSTEAD OF REPEATING A STALE POSITION
+def telem_record():
+    if not telem_mode:
+        return
+
+    if fix.valid & fix_lock and fix.valid & fix_pos:
+        telem.send(time.time(), last.secs is not None, fix.lat, fix.lon, fix.alt, fix.speed, fix.track, fix.sats, locator.text)
+    else:
+        telem.send(time.time(), last.secs is not None, None, None, fix.alt, fix.speed, fix.track, fix.sats, locator.text)
+
+# SEND QUEUED TELEMETRY, ONLY WHAT THE USB PORT TAKES WITHOUT WAITING
+def telem_send():
+    if telem_mode:
+        telem.drain()
+
+# SAMPLE THE GPS UART AND THE HEAP, AND REDRAW THE DEBUG PAGE WHILE IT IS SHOWN
+def profile_sample():
+    profile.sample(time.monotonic_ns())
+
+    if last.page is debug_group:
+        debug_update()
+
+def debug_update():
+    for line, text in zip(debug_text, profile.debug_lines(debug_tasks)):
+        render.set_text(line, text)
+
+# SWITCH THE SATELLITE MESSAGES ON WHILE THE PAGE IS SHOWN AND REDRAW IT WHEN A NEW SET ARRIVES
+def sky_tick():
+    sky.tick(render)
+
+# SHOW A PAGE IN PLACE OF THE DASHBOARD, OR GO BACK TO THE DASHBOARD IF IT IS ALREADY SHOWN
+# THE DASHBOARD KEEPS UPDATING UNDERNEATH
+def page_toggle(page):
+    last.page = None if last.page is page else page
+
+    if last.page is debug_group:
+        debug_update()
+
+    sky.show(last.page is sky.group, sky_rate * (rate.rate if gps_high_rate else 1))
+    disp.show(disp_group if last.page is None else last.page)
+    render.mark(disp_x * disp_y)
+    power.wake(time.monotonic_ns())
+
+# USB SERIAL CONSOLE COMMANDS, D SHOWS / HIDES THE DEBUG PAGE, S THE SATELLITE PAGE AND P PRINTS THE PROFILE
+# L REMOVES THE TRACK LOG MARKER SO THE COMPUTER CAN WRITE THE DRIVE AFTER THE NEXT RESET
+def console_poll():
+    while supervisor.runtime.serial_bytes_available:
+        cmd = sys.stdin.read(1).upper()
+
+        if cmd == 'D':
+            page_toggle(debug_group)
+        elif cmd == 'S':
+            page_toggle(sky.group)
+        elif cmd == 'P':
+            profile.dump()
+        elif cmd == 'L':
+            log_off()
+
+# SAVE THE TRACK LOG AND REMOVE THE MARKER THAT HAS BOOT.PY GIVE THE FILESYSTEM TO CODE.PY
+def log_off():
+    track.flush(True)
+
+    try:
+        os.remove(log_marker)
+        print('TRACK LOG MARKER REMOVED, RESET TO EDIT FILES OVER USB')
+    except OSError:
+        print('NO TRACK LOG MARKER OR FILESYSTEM READ ONLY, NOTHING TO REMOVE')
+
+# PRINT TASK STATISTICS TO THE USB SERIAL CONSOLE
+def sched_report():
+    for task in tasks:
+        print(task.report())
+
+    print(render.report())
+    print(track.report())
+    print(fix.report())
+    print(locator.report())
+    print(battery.report())
+    print(power.report())
+    print(profile.report())
+    print(sync.report())
+    print(sky.report())
+
+    if telem_mode:
+        print(telem.report())
+
+    if gps_high_rate:
+        print(rate.report())
+
+# TASK LIST, EACH TASK RUNS AT ITS OWN RATE
+tasks = (
+    sched_task('GPS', gps_ingest, gps_rate),
+    sched_task('CLOCK', clock_tick, 1),
+    sched_task('COMPASS', comp_update, comp_rate),
+    sched_task('BATTERY', bat_check, bat_rate),
+    sched_task('DISPLAY', disp_flush, disp_rate),
+    sched_task('ASSIST', assist_save, assist_save_rate),
+    sched_task('TRACK', track_flush, 1),
+    sched_task('POWER', power_tick, 1),
+    sched_task('RATE', rate_check, 1),
+    sched_task('TELEM', telem_record, telem_rate),
+    sched_task('USB OUT', telem_send, telem_out_rate),
+    sched_task('PROFILE', profile_sample, 1),
+    sched_task('CONSOLE', console_poll, 0.2),
+    sched_task('SKY', sky_tick, 1),
+    sched_task('REPORT', sched_report, report_rate),
+)
+
+# PER TASK RUN TIMES ARE KEPT BY THE SCHEDULER, THE PROFILER ADDS THE UART AND HEAP
+profile = loop_profile(tasks, gps_rx, gc_secs)
+
 def main():
-    last_alt = None
-    last_comp = None
-    last_grid_sq = None
-    last_lat = None
-    last_lon = None
-    last_tz_date = None
-    last_tz_desc = None
-    last_tz_time = None
-    last_utc_date = None
-    last_utc_time = None
-    last_bat_percent = -1
-    last_bat_time = -60
-    last_sat = -1
-    last_speed = -1
-    last_track = -1
-
-    while True:
-        # GET GPS DATA
-        if gps.update():
-            gps_update_text.text = gps_char
-
-            if gps.latitude is not None:
-                curr_lat = gps.latitude
-
-            if gps.longitude is not None:
-                curr_lon = gps.longitude
-
-            if gps.altitude_m is not None:
-                curr_alt = int(gps.altitude_m)
-            else:
-                curr_alt = 0
-
-            # CONVERT FROM KNOTS TO MPH
-            if gps.speed_knots is not None:
-                curr_speed = gps.speed_knots * 1.15078
-            else:
-                curr_speed = 0
-
-            if gps.track_angle_deg is not None:
-                curr_track = gps.track_angle_deg
-            else:
-                curr_track = 0
-
-            if gps.satellites is not None:
-                curr_sat = gps.satellites
-            else:
-                curr_sat = 0
-
-            # GET CURRENT GRID SQUARE, UPDATE LAT, LON AND GRID LABELS IF DATA HAS CHANGED
-            curr_grid_sq = calc_grid(curr_lat, curr_lon)
-
-            if last_lat != curr_lat:
-                last_lat = curr_lat
-                pad_length = 8 - len('{0:.4f}'.format(curr_lat))
-                lat_text.text = ' '*pad_length + '{0:.4f}'.format(curr_lat)
-
-            if last_lon != curr_lon:
-                last_lon = curr_lon
-                pad_length = 9 - len('{0:.4f}'.format(curr_lon))
-                lon_text.text = ' '*pad_length + '{0:.4f}'.format(curr_lon)
-
-            if last_grid_sq != curr_grid_sq:
-                last_grid_sq = curr_grid_sq
-                grid_text.text = curr_grid_sq
-
-            # UPDATE ALTITUDE LABELS IF DATA HAS CHANGED
-            if last_alt != curr_alt:
-                last_alt = curr_alt
-                alt_feet = int(curr_alt * 3.28084)
-                meter_pad_length = 5 - len(str(curr_alt))
-                feet_pad_length = 5 - len(str(alt_feet))
-                alt_ft_text.text = ' '*feet_pad_length + str(alt_feet)
-                alt_m_text.text = ' '*meter_pad_length + str(curr_alt)
-
-            # UPDATE SPEED AND TRACK ANGLE LABELS IF DATA HAS CHANGED
-            if last_speed != curr_speed:
-                last_speed = curr_speed
-                speed = '{0:.1f}'.format(curr_speed)
-                speed_pad_length = 5 - len(speed)
-                speed_text.text = ' '*speed_pad_length + speed
-
-            if last_track != curr_track:
-                last_track = curr_track
-                track = '{0:.1f}'.format(curr_track)
-                track_pad_length = 5 - len(track)
-                track_text.text = ' '*track_pad_length + track
-
-            # UPDATE SATELLITE COUNT LABEL IF DATA HAS CHANGED
-            if last_sat != curr_sat:
-                last_sat = curr_sat
-                sat_count_text.text = str(curr_sat)
-
-            time.sleep(0.1)
-
-        # GET CURRENT FORMATTED TIME AND DATE, UPDATE LABELS IF ANY HAVE CHANGED
-        curr_datetime = comp_date_time(time.time())
-
-        if last_utc_time != curr_datetime.utc_time:
-            last_utc_time = curr_datetime.utc_time
-            utc_clock_text.text = curr_datetime.utc_time
-
-        if last_utc_date != curr_datetime.utc_date:
-            last_utc_date = curr_datetime.utc_date
-            utc_date_text.text = curr_datetime.utc_date
-
-        if last_tz_time != curr_datetime.tz_time:
-            last_tz_time = curr_datetime.tz_time
-            tz_clock_text.text = curr_datetime.tz_time
-
-        if last_tz_desc != curr_datetime.tz_desc:
-            last_tz_desc = curr_datetime.tz_desc
-            tz_clock_label.text = curr_datetime.tz_desc
-
-        if last_tz_date != curr_datetime.tz_date:
-            last_tz_date = curr_datetime.tz_date
-            tz_date_text.text = curr_datetime.tz_date
-
-        # CHECK MAGNETOMETER AND UPDATE LABEL IF DATA HAS CHANGED
-        x, y, _ = comp.magnetic
-
-        curr_angle = comp_degree(x, y)
-        curr_comp = comp_direction(curr_angle)
-
-        if last_comp != curr_comp:
-            last_comp = curr_comp
-            pad_length = 3 - len(curr_comp)
-            comp_text.text = ' '*pad_length + curr_comp
-
-        # CHECK BATTERY VOLTAGE ONCE A MINUTE AND CALCULATE PERCENTAGE OF CHARGE
-        curr_bat_time = time.monotonic()
-
-        if (curr_bat_time - last_bat_time) >= 60:
-            last_bat_time = curr_bat_time
-            curr_bat = bat.value
-            curr_bat_percent = bat_level(curr_bat)
-
-            # UPDATE BATTERY GAUGE IF PERCENTAGE HAS CHANGED
-            if last_bat_percent != curr_bat_percent:
-                bat_progress_bar.bar_color = bat_colors[curr_bat_percent - 1]
-                bat_progress_bar.value = curr_bat_percent
-
-            if curr_bat <= bat_cutoff:
-                disp_group.remove(utc_clock_text)
-                disp_group.remove(utc_clock_label)
-                disp_group.remove(utc_date_text)
-                disp_group.remove(tz_clock_text)
-                disp_group.remove(tz_clock_label)
-                disp_group.remove(tz_date_text)
-                disp_group.remove(lat_label)
-                disp_group.remove(lat_text)
-                disp_group.remove(grid_text)
-                disp_group.remove(lon_label)
-                disp_group.remove(lon_text)
-                disp_group.remove(gps_update_text)
-                disp_group.remove(alt_label)
-                disp_group.remove(alt_ft_text)
-                disp_group.remove(alt_ft_label)
-                disp_group.remove(alt_m_text)
-                disp_group.remove(alt_m_label)
-                disp_group.remove(speed_label)
-                disp_group.remove(speed_text)
-                disp_group.remove(track_label)
-                disp_group.remove(track_text)
-                disp_group.remove(sat_count_label)
-                disp_group.remove(sat_count_text)
-                disp_group.remove(comp_text)
-
-                message_text = 'LOW BATTERY'
-                message_x = int((disp_x - len(message_text) * char_width) / 2)
-                message_text = bitmap_label.Label(font, text=message_text, color=0xFFB000, x=message_x, y=int(disp_y / 2))
-                disp_group.append(message_text)
-
-                while True:
-                    pass
-
-        gps_update_text.text = ' '
-
-main()
+    boot_phase('DASHBOARD')
+    boot_start = boot_phases[0][1]
+    boot_last = boot_start
+
+    for name, phase_ns in boot_phases:
+        print('BOOT {:<10} {:6d}MS {:6d}MS'.format(name, (phase_ns - boot_last) // 1000000, (phase_ns - boot_start) // 1000000))
+        boot_last = phase_ns
+
+    render.start()
+    asyncio.run(sched_run(tasks))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# FILTERED COMPASS HEADING
+#
+# MAGNETOMETER SAMPLES ARE TAKEN AT A FIXED RATE, CORRECTED FOR HARD IRON OFFSET, SOFT IRON DISTORTION AND ORIENTATION
+# AND KEPT IN A RING BUFFER. OFFSETS AND THE SOFT IRON MATRIX COME FROM CALIBRATION.PY (SEE MAG_CAL.PY)
+# THE HEADING IS THE ANGLE OF THE SUM OF THE BUFFERED FIELD VECTORS (A VECTOR MEAN), SO IT AVERAGES CORRECTLY ACROSS
+# NORTH WHERE A PLAIN MEAN OF ANGLES WOULD NOT
+# THE 16 POINT DIRECTION ONLY CHANGES ONCE THE HEADING IS MORE THAN HYSTERESIS DEGREES PAST THE SECTOR EDGE
+
+import math
+
+from array import array
+
+# 16 POINT COMPASS, SECTOR 0 IS CENTERED ON NORTH
+comp_point = ('N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
+comp_sector_deg = 22.5
+comp_half_sector_deg = 11.25
+
+# SECTOR INDEX FOR AN ANGLE IN DEGREES, 0 - 15
+def comp_sector(angle):
+    return int((angle + comp_half_sector_deg) / comp_sector_deg) & 15
+
+# DIRECTION TEXT FOR A SECTOR INDEX, --- IF THERE IS NO HEADING YET
+def comp_direction(sector):
+    if sector < 0:
+        return '---'
+
+    return comp_point[sector]
+
+class compass:
+    def __init__(self, mag, offset_x, offset_y, flip_x, flip_y, swap, declination, samples=8, hysteresis=4.0, soft_iron=(1.0, 0.0, 0.0, 1.0)):
+        self.mag = mag
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.soft_11, self.soft_12, self.soft_21, self.soft_22 = soft_iron
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+        self.swap = swap
+        self.declination = declination
+        self.hysteresis = hysteresis
+
+        # RING BUFFER OF CORRECTED SAMPLES
+        self.samples = samples
+        self.buf_x = array('f', [0.0] * samples)
+        self.buf_y = array('f', [0.0] * samples)
+        self.index = 0
+        self.count = 0
+
+        # FILTERED HEADING, SECTOR IS -1 UNTIL THE FIRST SAMPLE
+        self.angle = 0.0
+        self.sector = -1
+        self.direction = comp_direction(-1)
+
+    # READ THE MAGNETOMETER, CORRECT THE SAMPLE AND ADD IT TO THE RING BUFFER
+    def sample(self):
+        x_axis, y_axis, _ = self.mag.magnetic
+
+        x_axis -= self.offset_x
+        y_axis -= self.offset_y
+        x_axis, y_axis = self.soft_11 * x_axis + self.soft_12 * y_axis, self.soft_21 * x_axis + self.soft_22 * y_axis
+
+        if self.flip_x:
+            x_axis = -x_axis
+
+        if self.flip_y:
+            y_axis = -y_axis
+
+        if self.swap:
+            x_axis, y_axis = y_axis, x_axis
+
+        self.buf_x[self.index] = x_axis
+        self.buf_y[self.index] = y_axis
+        self.index += 1
+
+        if self.index >= self.samples:
+            self.index = 0
+
+        if self.count < self.samples:
+            self.count += 1
+
+    # RECALCULATE THE HEADING FROM THE BUFFERED SAMPLES, RETURNS TRUE IF THE DIRECTION TEXT CHANGED
+    def update(self):
+        if not self.count:
+            return False
+
+        sum_x = 0.0
+        sum_y = 0.0
+
+        for i in range(self.count):
+            sum_x += self.buf_x[i]
+            sum_y += self.buf_y[i]
+
+        angle = math.atan2(sum_y, sum_x) * 180 / math.pi + self.declination
+
+        if angle < 0:
+            angle += 360
+
+        if angle >= 360:
+            angle -= 360
+
+        self.angle = angle
+
+        # STAY IN THE CURRENT SECTOR UNTIL THE HEADING IS CLEARLY PAST ITS EDGE
+        if self.sector >= 0:
+            offset = angle - self.sector * comp_sector_deg
+
+            if offset > 180:
+                offset -= 360
+            elif offset < -180:
+                offset += 360
+
+            if -comp_half_sector_deg - self.hysteresis <= offset <= comp_half_sector_deg + self.hysteresis:
+                return False
+
+        self.sector = comp_sector(angle)
+        self.direction = comp_point[self.sector]
+
+        return True
@@ -0,0 +1,130 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# UTC / TIMEZONE CLOCK ENGINE WITH AUTOMATIC DST
+#
+# THE DST START AND END TIMES ARE CALCULATED ONCE PER YEAR AND CACHED, THEY ARE ONLY RECALCULATED WHEN THE
+# YEAR ROLLS OVER OR THE RULES ARE CHANGED. TIME STRINGS ARE BUILT WITH INTEGER MATH ONCE PER SECOND AND THE
+# DATE STRINGS ARE ONLY REBUILT WHEN THE DAY CHANGES
+#
+# TIME.LOCALTIME() IS ASSUMED TO RETURN UTC, AS IT DOES ON CIRCUITPYTHON
+
+import time
+
+# ARRAYS FOR DAY AND MONTH TEXT
+day_text = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+month_text = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+
+# FORMAT DATE TEXT FROM A TIME TUPLE
+def format_date(time_tuple):
+    return '{} {} {:02d}, {}'.format(day_text[time_tuple[6]], month_text[time_tuple[1] - 1], time_tuple[2], time_tuple[0])
+
+# FORMAT TIME TEXT FROM SECONDS SINCE MIDNIGHT
+def format_time(day_secs):
+    return '{:02d}:{:02d}:{:02d}'.format(day_secs // 3600, day_secs // 60 % 60, day_secs % 60)
+
+# CALCULATE AND FORMAT UTC TIME, UTC DATE, TIMEZONE TIME AND TIMEZONE DATE. CALCULATE DST
+class comp_date_time:
+    def __init__(self, dst_start, dst_end, dst_offset, timezone_offset, timezone_desc):
+        self.set_rules(dst_start, dst_end, dst_offset, timezone_offset, timezone_desc)
+
+    # CHANGE THE TIMEZONE / DST RULES, FORCES EVERYTHING TO BE RECALCULATED ON THE NEXT UPDATE
+    def set_rules(self, dst_start, dst_end, dst_offset, timezone_offset, timezone_desc):
+        self.dst_start = dst_start
+        self.dst_end = dst_end
+        self.dst_offset = dst_offset
+        self.timezone_offset = timezone_offset
+        self.timezone_secs = int(timezone_offset * 3600)
+        self.timezone_desc = timezone_desc
+
+        self.year_start_secs = 0
+        self.year_end_secs = 0
+        self.dst_start_secs = 0
+        self.dst_end_secs = 0
+
+        self.secs = None
+        self.utc_day = None
+        self.tz_day = None
+
+        self.utc_date = ''
+        self.utc_time = ''
+        self.tz_date = ''
+        self.tz_time = ''
+        self.tz_desc = timezone_desc[0]
+        self.dst_active = False
+
+    # CALCULATE THE DST START AND END TIMES FOR THE YEAR CONTAINING BASE_TIME_SECS IN LOCAL STANDARD TIME
+    def calc_year(self, base_time_secs):
+        timezone_secs = self.timezone_secs
+        dst_start = self.dst_start
+        dst_end = self.dst_end
+        dst_offset = self.dst_offset
+
+        # CHECK FOR DEC 31 / JAN 1 OVERLAP AND CORRECT YEAR FOR TIMEZONE DATE
+        base_year = time.localtime(base_time_secs)[0]
+        err_check_secs = time.mktime((base_year, 1, 1, 0, 0, 0, 0, 0, 0)) - timezone_secs
+
+        if base_time_secs < err_check_secs:
+            base_year -= 1
+            self.year_end_secs = err_check_secs
+            self.year_start_secs = time.mktime((base_year, 1, 1, 0, 0, 0, 0, 0, 0)) - timezone_secs
+        else:
+            self.year_start_secs = err_check_secs
+            self.year_end_secs = time.mktime((base_year + 1, 1, 1, 0, 0, 0, 0, 0, 0)) - timezone_secs
+
+        # CALCULATE IN SECONDS THE DST START TIME AND DATE
+        dst_start_secs = time.mktime((base_year, dst_start[0], dst_start[1] * 7 - 6, dst_start[3], 0, 0, 0, 0, 0))
+        dst_start_diff = dst_start[2] - time.localtime(dst_start_secs)[6]
+
+        if dst_start_diff < 0:
+            dst_start_diff += 7
+
+        self.dst_start_secs = dst_start_secs + dst_start_diff * 86400 - timezone_secs
+
+        # CALCULATE IN SECONDS THE DST END TIME AND DATE
+        dst_end_secs = time.mktime((base_year, dst_end[0], dst_end[1] * 7 - 6, dst_end[3], 0, 0, 0, 0, 0)) - dst_offset
+        dst_end_diff = dst_end[2] - time.localtime(dst_end_secs)[6]
+
+        if dst_end_diff < 0:
+            dst_end_diff += 7
+
+        self.dst_end_secs = dst_end_secs + dst_end_diff * 86400 - timezone_secs - dst_offset
+
+    # UPDATE FOR A NEW TIME IN SECONDS, RETURNS FALSE IF NOTHING CHANGED
+    def update(self, base_time_secs):
+        if base_time_secs == self.secs:
+            return False
+
+        self.secs = base_time_secs
+
+        if base_time_secs < self.year_start_secs or base_time_secs >= self.year_end_secs:
+            self.calc_year(base_time_secs)
+
+        # IF THE CURRENT TIME AND DATE FALL BETWEEN THE DST START AND END TIMES, SET DST_ACTIVE
+        dst_active = self.dst_start_secs <= base_time_secs < self.dst_end_secs
+
+        if dst_active != self.dst_active:
+            self.dst_active = dst_active
+            self.tz_desc = self.timezone_desc[dst_active]
+            self.tz_day = None
+
+        # FORMAT UTC DATA
+        utc_day = base_time_secs // 86400
+
+        if utc_day != self.utc_day:
+            self.utc_day = utc_day
+            self.utc_date = format_date(time.localtime(base_time_secs))
+
+        self.utc_time = format_time(base_time_secs - utc_day * 86400)
+
+        # CALCULATE AND FORMAT TIMEZONE TIME AND DATE
+        time_tz_secs = base_time_secs + self.timezone_secs + dst_active * self.dst_offset
+        tz_day = time_tz_secs // 86400
+
+        if tz_day != self.tz_day:
+            self.tz_day = tz_day
+            self.tz_date = format_date(time.localtime(time_tz_secs))
+
+        self.tz_time = format_time(time_tz_secs - tz_day * 86400)
+
+        return True
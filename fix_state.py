@@ -0,0 +1,124 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# FIX STATE
+#
+# ONE OBJECT, BUILT AT BOOT AND UPDATED IN PLACE, HOLDS THE FIX USED BY THE DASHBOARD, THE TRACK LOG, TELEMETRY AND THE
+# WARM START SAVE, SO THEY NO LONGER EACH READ THE DECODER AND KEEP THEIR OWN COPIES. THE GPS TASK CALLS UPDATE() WITH
+# THE DECODER AFTER EVERY READ THAT DECODED A FIX MESSAGE (RMC / GGA OR NAV-PVT)
+#
+# EACH FIELD HAS A BIT IN TWO MASKS:
+# - VALID, SET WHILE THE RECEIVER IS SENDING THE FIELD. THE VALUE IS 0 WHILE IT IS NOT, EXCEPT THE POSITION, WHICH IS
+#   HELD AT THE LAST ONE RECEIVED AND IS VALID FROM THE FIRST ONE ON. LAT / LON ARE NONE UNTIL THEN
+# - CHANGED, SET WHEN THE VALUE OR ITS VALIDITY CHANGES. TAKE() RETURNS THE BITS SET SINCE THE LAST CALL AND CLEARS
+#   THEM, SO A CONSUMER ONLY REDRAWS OR RECALCULATES WHAT HAS CHANGED
+# FIX_LOCK IS THE RECEIVER'S OWN FIX FLAG, IT HAS NO VALUE
+#
+# __SLOTS__ KEEPS THE FIELD SET FIXED (CIRCUITPYTHON ACCEPTS AND IGNORES IT, THE HOST TOOLS ENFORCE IT). THE VALUES ARE
+# SMALL INTS AND FLOATS, WHICH CIRCUITPYTHON STORES IN THE OBJECT WITHOUT ALLOCATING, SO AN UPDATE ALLOCATES NOTHING
+
+# FIELD BITS
+fix_lock = 0x01
+fix_pos = 0x02
+fix_alt = 0x04
+fix_speed = 0x08
+fix_track = 0x10
+fix_sats = 0x20
+fix_all = 0x3F
+
+class fix_state:
+    __slots__ = ('valid', 'changed', 'updates', 'lat', 'lon', 'alt', 'speed', 'track', 'sats')
+
+    def __init__(self):
+        self.valid = 0
+        self.changed = 0
+        self.updates = 0
+
+        # DEGREES, NONE UNTIL THE FIRST POSITION
+        self.lat = None
+        self.lon = None
+
+        # ALTITUDE IN WHOLE METERS, SPEED IN KNOTS, TRACK IN DEGREES
+        self.alt = 0
+        self.speed = 0
+        self.track = 0
+        self.sats = 0
+
+    # COPY THE DECODER'S FIELDS
+    def update(self, gps):
+        valid = fix_lock if gps.has_fix else 0
+
+        # EVERYTHING CHANGES ON THE FIRST UPDATE SO EVERY FIELD IS DRAWN
+        changed = 0 if self.updates else fix_all
+        self.updates += 1
+
+        lat = gps.latitude
+        lon = gps.longitude
+
+        if lat is not None and lon is not None:
+            valid |= fix_pos
+
+            if lat != self.lat or lon != self.lon:
+                self.lat = lat
+                self.lon = lon
+                changed |= fix_pos
+        elif self.lat is not None:
+            valid |= fix_pos
+
+        value = gps.altitude_m
+
+        if value is not None:
+            valid |= fix_alt
+            value = int(value)
+        else:
+            value = 0
+
+        if value != self.alt:
+            self.alt = value
+            changed |= fix_alt
+
+        value = gps.speed_knots
+
+        if value is not None:
+            valid |= fix_speed
+        else:
+            value = 0
+
+        if value != self.speed:
+            self.speed = value
+            changed |= fix_speed
+
+        value = gps.track_angle_deg
+
+        if value is not None:
+            valid |= fix_track
+        else:
+            value = 0
+
+        if value != self.track:
+            self.track = value
+            changed |= fix_track
+
+        value = gps.satellites
+
+        if value is not None:
+            valid |= fix_sats
+        else:
+            value = 0
+
+        if value != self.sats:
+            self.sats = value
+            changed |= fix_sats
+
+        # A FIELD THAT STARTED OR STOPPED BEING SENT HAS CHANGED EVEN IF ITS VALUE HAS NOT
+        self.changed |= changed | (valid ^ self.valid)
+        self.valid = valid
+
+    # BITS CHANGED SINCE THE LAST CALL
+    def take(self):
+        changed = self.changed
+        self.changed = 0
+        return changed
+
+    def report(self):
+        return 'FIX    {:6d} UPDATES  VALID{}{}{}{}{}{}'.format(self.updates, ' LOCK' if self.valid & fix_lock else '', ' POS' if self.valid & fix_pos else '', ' ALT' if self.valid & fix_alt else '', ' SPEED' if self.valid & fix_speed else '', ' TRACK' if self.valid & fix_track else '', ' SATS' if self.valid & fix_sats else '')
@@ -0,0 +1,190 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HIGH RATE NAVIGATION
+#
+# AT 38400 BAUD ONE NMEA EPOCH (RMC + GGA, ABOUT 150 BYTES) TAKES 40MS ON THE WIRE, SO 10 HZ WOULD FILL 40% OF THE
+# LINK AND A LATE GPS TASK RUN WOULD OVERRUN THE 256 BYTE UART BUFFER. HIGH RATE MODE FIRST RAISES THE RECEIVER'S
+# UART1 SPEED WITH CFG-PRT. THE RECEIVER SWITCHES AS SOON AS IT TAKES THE COMMAND AND THE ACK IS USUALLY LOST IN THE
+# SWITCH, SO THE COMMAND IS WRITTEN WITHOUT WAITING FOR A REPLY. CODE.PY THEN REOPENS THE UART AT THE NEW SPEED WITH A
+# LARGER BUFFER AND GPS_LINK_CHECK() WAITS FOR CLEAN MESSAGES, IF NONE ARRIVE THE OLD SPEED IS RESTORED
+#
+# THE MEASUREMENT RATE IS SET WITH CFG-RATE IN THE NORMAL CONFIGURATION BATCH, WHICH THEN RUNS AT THE NEW SPEED
+#
+# RATE_GUARD IS THE BACK PRESSURE CHECK. EVERY WINDOW_SECS IT COMPARES THE MESSAGES DECODED WITH THE MESSAGES EXPECTED
+# AT THE CURRENT RATE, AND LOOKS FOR CHECKSUM ERRORS (BYTES LOST TO AN OVERRUN) AND FOR THE UART BUFFER FILLING PAST
+# 3/4. IF THE PARSER IS FALLING BEHIND THE RATE STEPS DOWN TO THE NEXT ONE IN THE LIST, DOWN TO 1 HZ AT THE LOWEST
+
+import struct
+import time
+
+# UBX MESSAGE TYPES
+cfg_prt_type = bytes([0x06, 0x00])
+cfg_rate_type = bytes([0x06, 0x08])
+
+# CFG-PRT FOR A UART: PORT ID, TX READY, MODE, BAUD RATE, INPUT PROTOCOLS, OUTPUT PROTOCOLS, FLAGS
+cfg_prt_format = '<BxHIIHHH2x'
+prt_uart1 = 1
+prt_mode_8n1 = 0x000008C0
+prt_proto_ubx = 0x0001
+prt_proto_nmea = 0x0002
+
+# CFG-RATE: MEASUREMENT PERIOD (MS), NAVIGATION CYCLES PER SOLUTION, TIME REFERENCE (1 = GPS TIME)
+cfg_rate_format = '<HHH'
+rate_time_gps = 1
+
+# RATES TRIED, FASTEST FIRST
+gps_rates = (10, 5, 2, 1)
+
+# SUPPORTED RATE NEAREST TO RATE_HZ, THE LOWER ONE ON A TIE. NONE IF RATE_HZ IS NOT A POSITIVE NUMBER
+# CFG-RATE TAKES ANY PERIOD BUT RATE_GUARD ONLY STEPS THROUGH GPS_RATES, SO ANY OTHER RATE IS SNAPPED FIRST OR THE
+# RATE IT GUARDS AND SHOWS WOULD NOT BE THE ONE THE RECEIVER RUNS AT
+def gps_rate_snap(rate_hz):
+    if not isinstance(rate_hz, (int, float)) or isinstance(rate_hz, bool) or not rate_hz > 0:
+        return None
+
+    best = gps_rates[0]
+
+    for rate in gps_rates:
+        if abs(rate - rate_hz) <= abs(best - rate_hz):
+            best = rate
+
+    return best
+
+# CFG-PRT PAYLOAD, UART1 AT BAUD 8N1 WITH UBX AND NMEA IN BOTH DIRECTIONS
+def ubx_cfg_prt(baud):
+    proto = prt_proto_ubx | prt_proto_nmea
+    return struct.pack(cfg_prt_format, prt_uart1, 0, prt_mode_8n1, baud, proto, proto, 0)
+
+# CFG-RATE PAYLOAD, ONE SOLUTION PER MEASUREMENT
+def ubx_cfg_rate(rate_hz):
+    return struct.pack(cfg_rate_format, 1000 // rate_hz, 1, rate_time_gps)
+
+# WAIT UP TO TIMEOUT SECONDS FOR MESSAGES CHECKSUMMED CLEAN AT THE CURRENT UART SPEED
+# ONE ERROR IS ALLOWED FOR A MESSAGE CUT IN HALF BY THE SWITCH, MORE MEANS THE SPEEDS DO NOT MATCH
+def gps_link_check(demux, timeout, messages=2):
+    start = time.monotonic_ns()
+    timeout_ns = int(timeout * 1000000000)
+    count = demux.nmea_count + demux.ubx_count
+    errors = demux.nmea_errors + demux.ubx_errors
+
+    while time.monotonic_ns() - start < timeout_ns:
+        demux.update()
+
+        if demux.nmea_errors + demux.ubx_errors - errors > 1:
+            return False
+
+        if demux.nmea_count + demux.ubx_count - count >= messages:
+            return True
+
+        time.sleep(0.01)
+
+    return False
+
+class rate_guard:
+    def __init__(self, demux, config, rate_hz, msgs_per_epoch, buffer_size, window_secs=5, min_ratio=0.8):
+        # CONFIGURATION ENGINE FROM BOOT, ONLY REGISTERED WITH THE DEMUX WHILE A COMMAND IS OUTSTANDING
+        self.demux = demux
+        self.config = config
+        self.rates = [rate for rate in gps_rates if rate <= rate_hz]
+        self.index = 0
+        self.msgs_per_epoch = msgs_per_epoch
+        self.high_water = buffer_size * 3 // 4
+        self.window_ns = int(window_secs * 1000000000)
+        self.min_ratio = min_ratio
+
+        # RATE BEING SENT, 0 WHEN NOTHING IS OUTSTANDING
+        self.sending = 0
+
+        # COUNTERS AT THE START OF THE WINDOW, THE WINDOW IS RESTARTED AFTER EACH RATE CHANGE
+        self.window_start = 0
+        self.messages = 0
+        self.errors = 0
+
+        # STATISTICS, LAST WINDOW AND OVERALL
+        self.received = 0
+        self.expected = 0
+        self.peak = 0
+        self.windows = 0
+        self.step_downs = 0
+        self.reasons = ''
+
+    @property
+    def rate(self):
+        return self.rates[self.index]
+
+    # SECONDS PER EPOCH AT THE CURRENT RATE
+    @property
+    def epoch(self):
+        return 1 / self.rates[self.index]
+
+    def restart(self, now):
+        demux = self.demux
+        self.window_start = now
+        self.messages = demux.nmea_count + demux.ubx_count
+        self.errors = demux.nmea_errors + demux.ubx_errors
+        demux.max_waiting = 0
+
+    # RUN ONCE A SECOND
+    def check(self, now):
+        config = self.config
+
+        if self.sending:
+            if config.poll():
+                return
+
+            if config.finish():
+                print('GPS RATE {} HZ COMMAND FAILED, RATE LEFT AT {} HZ'.format(self.sending, self.rate))
+            else:
+                self.index += 1
+
+            config.demux.remove_ubx(config)
+            self.sending = 0
+            self.restart(now)
+            return
+
+        if not self.window_start:
+            self.restart(now)
+            return
+
+        elapsed = now - self.window_start
+
+        if elapsed < self.window_ns:
+            return
+
+        demux = self.demux
+        self.received = demux.nmea_count + demux.ubx_count - self.messages
+        self.expected = self.rate * self.msgs_per_epoch * elapsed // 1000000000
+        errors = demux.nmea_errors + demux.ubx_errors - self.errors
+        self.peak = demux.max_waiting
+        self.windows += 1
+
+        reasons = []
+
+        if self.received < self.expected * self.min_ratio:
+            reasons.append('{}/{} MSGS'.format(self.received, self.expected))
+
+        if errors:
+            reasons.append('{} ERRORS'.format(errors))
+
+        if self.peak > self.high_water:
+            reasons.append('BUFFER {}'.format(self.peak))
+
+        self.restart(now)
+
+        # THE CONFIGURATION ENGINE IS SHARED, IF IT IS BUSY THE NEXT WINDOW WILL SHOW THE SAME PROBLEM
+        if not reasons or self.index >= len(self.rates) - 1 or config.cmds:
+            return
+
+        # STEP DOWN ONE RATE
+        self.reasons = ' '.join(reasons)
+        self.step_downs += 1
+        self.sending = self.rates[self.index + 1]
+        print('GPS RATE {} HZ FALLING BEHIND ({}), STEPPING DOWN TO {} HZ'.format(self.rate, self.reasons, self.sending))
+
+        config.demux.add_ubx(config)
+        config.add('RATE', cfg_rate_type, ubx_cfg_rate(self.sending))
+        config.start()
+
+    def report(self):
+        return 'RATE   {:2d} HZ {:6d}/{:<6d} MSGS PEAK {:5d} BYTES {:4d} WINDOWS {:3d} STEP DOWNS {}'.format(self.rate, self.received, self.expected, self.peak, self.windows, self.step_downs, self.reasons)
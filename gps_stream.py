@@ -0,0 +1,313 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# GPS UART STREAM DEMULTIPLEXER
+#
+# THE U-BLOX RECEIVER SENDS NMEA SENTENCES AND UBX FRAMES ON THE SAME UART
+# GPS_DEMUX READS THE UART WITH READINTO() INTO A PREALLOCATED BUFFER AND SPLITS IT IN ONE PASS INTO COMPLETE,
+# CHECKSUM VALIDATED NMEA SENTENCES AND UBX FRAMES, WHICH ARE HANDED TO THE REGISTERED DECODERS IN PLACE
+#
+# NMEA DECODERS PROVIDE DECODE_NMEA(LINE, LINE_LEN, COMMAS, FIELD_COUNT)
+#   LINE HOLDS THE SENTENCE BETWEEN $ AND *, COMMAS HOLDS THE INDEX OF EACH COMMA IN LINE
+# UBX DECODERS PROVIDE DECODE_UBX(MSG_CLASS, MSG_ID, PAYLOAD, LENGTH)
+#   PAYLOAD IS A MEMORYVIEW OF THE FRAME PAYLOAD
+# BOTH RETURN TRUE IF THE MESSAGE CARRIED NEW NAVIGATION DATA
+#
+# ARRIVAL TIME: UPDATE() NOTES THE MONOTONIC TIME OF EACH READ. THE LAST BYTE READ ARRIVED ABOUT THEN, LESS ANY BYTES
+# STILL WAITING BEHIND IT, SO THE TIME EACH MESSAGE STARTED ON THE WIRE IS WORKED BACK FROM ITS POSITION IN THE READ
+# AT ONE BYTE TIME PER BYTE. MSG_NS HOLDS IT FOR THE MESSAGE BEING DECODED, FOR TIME_SYNC.PY. IT IS ONLY EXACT IF THE
+# LINE WAS STILL BUSY AT THE READ, WHICH IS CERTAIN WHEN THE MESSAGE CARRIED ON INTO A LATER READ (MSG_READ != READS)
+#
+# SYNC RECOVERY: A $ ALWAYS STARTS A NEW NMEA SENTENCE, A NON PRINTABLE CHARACTER ENDS ONE (AND MAY START A UBX
+# FRAME), A UBX LENGTH LARGER THAN THE PAYLOAD BUFFER OR A BAD CHECKSUM DROPS THE FRAME AND SCANNING RESUMES
+
+import time
+
+# LONGEST VALID NMEA SENTENCE IS 82 CHARACTERS INCLUDING $ AND CR/LF
+nmea_max_len = 82
+nmea_max_fields = 24
+
+# CHARACTER CODES
+chr_start = 0x24    # $
+chr_star = 0x2A     # *
+chr_comma = 0x2C    # ,
+
+# UBX SYNC CHARACTERS
+ubx_sync_1 = 0xB5
+ubx_sync_2 = 0x62
+
+# PARSER STATES
+state_idle = 0
+state_nmea = 1
+state_nmea_cs_high = 2
+state_nmea_cs_low = 3
+state_ubx_sync_2 = 4
+state_ubx_class = 5
+state_ubx_id = 6
+state_ubx_len_low = 7
+state_ubx_len_high = 8
+state_ubx_payload = 9
+state_ubx_ck_a = 10
+state_ubx_ck_b = 11
+
+# CONVERT A HEX DIGIT CHARACTER TO ITS VALUE, -1 IF NOT A HEX DIGIT
+def hex_value(c):
+    if 0x30 <= c <= 0x39:
+        return c - 0x30
+
+    if 0x41 <= c <= 0x46:
+        return c - 0x37
+
+    if 0x61 <= c <= 0x66:
+        return c - 0x57
+
+    return -1
+
+class gps_demux:
+    def __init__(self, uart, buffer_size=256, ubx_max_payload=100, uart_size=256):
+        self.set_uart(uart, uart_size)
+
+        self.nmea_sinks = []
+        self.ubx_sinks = []
+
+        self.rx_buf = bytearray(buffer_size)
+        self.line = bytearray(nmea_max_len)
+        self.commas = bytearray(nmea_max_fields)
+        self.payload = bytearray(ubx_max_payload)
+        self.payload_mv = memoryview(self.payload)
+
+        self.state = state_idle
+        self.line_len = 0
+        self.field_count = 0
+        self.cs_nmea = 0
+        self.cs_recv = 0
+        self.msg_class = 0
+        self.msg_id = 0
+        self.msg_len = 0
+        self.msg_pos = 0
+        self.ck_a = 0
+        self.ck_b = 0
+
+        # STATISTICS
+        self.bytes_in = 0
+        self.reads = 0
+        self.full_reads = 0
+        self.overruns = 0
+        self.nmea_count = 0
+        self.nmea_errors = 0
+        self.ubx_count = 0
+        self.ubx_errors = 0
+
+        # MOST BYTES SEEN WAITING IN THE UART, RESET BY WHOEVER IS WATCHING IT
+        self.max_waiting = 0
+
+        # MONOTONIC TIME OF THE LAST READ, WHEN ITS LAST BYTE ARRIVED, AND WHEN AND IN WHICH READ THE CURRENT MESSAGE STARTED
+        self.read_ns = 0
+        self.chunk_ns = 0
+        self.msg_ns = 0
+        self.msg_read = 0
+
+    # UART IN USE, ALSO CALLED WHEN IT IS REOPENED AT ANOTHER SPEED. UART_SIZE IS ITS RECEIVE BUFFER SIZE, FINDING IT
+    # FULL MEANS BYTES ARE BEING LOST. 10 BITS PER BYTE ON THE WIRE. HOST BENCHES THAT ONLY CALL FEED() PASS NONE
+    def set_uart(self, uart, uart_size):
+        self.uart = uart
+        self.uart_size = uart_size
+        self.byte_ns = 10000000000 // uart.baudrate if uart else 0
+
+    def add_nmea(self, sink):
+        self.nmea_sinks.append(sink)
+
+    def add_ubx(self, sink):
+        self.ubx_sinks.append(sink)
+
+    def remove_ubx(self, sink):
+        if sink in self.ubx_sinks:
+            self.ubx_sinks.remove(sink)
+
+    # TRUE BETWEEN MESSAGES WITH NOTHING WAITING, A PAUSE NOW CAN NOT HOLD UP ONE BEING RECEIVED
+    def idle(self):
+        return self.state == state_idle and not self.uart.in_waiting
+
+    # READ WAITING UART DATA AND PARSE IT, RETURNS TRUE IF A DECODER REPORTED NEW NAVIGATION DATA
+    def update(self):
+        waiting = self.uart.in_waiting
+
+        if not waiting:
+            return False
+
+        self.read_ns = time.monotonic_ns()
+        backlog = waiting
+
+        if waiting > self.max_waiting:
+            self.max_waiting = waiting
+
+        if waiting >= self.uart_size:
+            self.overruns += 1
+
+        if waiting >= len(self.rx_buf):
+            waiting = len(self.rx_buf)
+            self.full_reads += 1
+
+        count = self.uart.readinto(self.rx_buf, waiting)
+
+        if not count:
+            return False
+
+        self.reads += 1
+        self.chunk_ns = self.read_ns - (backlog - count) * self.byte_ns
+
+        return self.feed(self.rx_buf, count)
+
+    # RUN BYTES THROUGH THE STATE MACHINE
+    def feed(self, buf, count):
+        decoded = False
+        line = self.line
+        commas = self.commas
+        payload = self.payload
+        state = self.state
+        line_len = self.line_len
+        field_count = self.field_count
+        cs_nmea = self.cs_nmea
+        ck_a = self.ck_a
+        ck_b = self.ck_b
+        chunk_ns = self.chunk_ns
+        byte_ns = self.byte_ns
+
+        self.bytes_in += count
+
+        for i in range(count):
+            c = buf[i]
+
+            if state == state_nmea:
+                if c == chr_star:
+                    state = state_nmea_cs_high
+                    continue
+
+                if 0x20 <= c <= 0x7E and c != chr_start and line_len < nmea_max_len:
+                    if c == chr_comma:
+                        if field_count >= nmea_max_fields:
+                            self.nmea_errors += 1
+                            state = state_idle
+                            continue
+
+                        commas[field_count] = line_len
+                        field_count += 1
+
+                    line[line_len] = c
+                    line_len += 1
+                    cs_nmea ^= c
+                    continue
+
+                # SENTENCE CUT SHORT, FALL THROUGH SO THIS BYTE CAN START THE NEXT MESSAGE
+                self.nmea_errors += 1
+                state = state_idle
+            elif state == state_ubx_payload:
+                ck_a = (ck_a + c) & 0xFF
+                ck_b = (ck_b + ck_a) & 0xFF
+                payload[self.msg_pos] = c
+                self.msg_pos += 1
+
+                if self.msg_pos >= self.msg_len:
+                    state = state_ubx_ck_a
+
+                continue
+            elif state == state_nmea_cs_high:
+                value = hex_value(c)
+
+                if value >= 0:
+                    self.cs_recv = value << 4
+                    state = state_nmea_cs_low
+                    continue
+
+                self.nmea_errors += 1
+                state = state_idle
+            elif state == state_nmea_cs_low:
+                value = hex_value(c)
+                state = state_idle
+
+                if value >= 0 and (self.cs_recv | value) == cs_nmea:
+                    self.nmea_count += 1
+
+                    for sink in self.nmea_sinks:
+                        if sink.decode_nmea(line, line_len, commas, field_count):
+                            decoded = True
+                else:
+                    self.nmea_errors += 1
+
+                continue
+            elif state == state_ubx_sync_2:
+                if c == ubx_sync_2:
+                    state = state_ubx_class
+                    ck_a = 0
+                    ck_b = 0
+                    continue
+
+                state = state_idle
+            elif state >= state_ubx_class and state <= state_ubx_len_high:
+                ck_a = (ck_a + c) & 0xFF
+                ck_b = (ck_b + ck_a) & 0xFF
+
+                if state == state_ubx_class:
+                    self.msg_class = c
+                elif state == state_ubx_id:
+                    self.msg_id = c
+                elif state == state_ubx_len_low:
+                    self.msg_len = c
+                else:
+                    self.msg_len |= c << 8
+                    self.msg_pos = 0
+
+                    if self.msg_len > len(payload):
+                        self.ubx_errors += 1
+                        state = state_idle
+                        continue
+
+                    if self.msg_len == 0:
+                        state = state_ubx_ck_a
+                        continue
+
+                state += 1
+                continue
+            elif state == state_ubx_ck_a:
+                if c == ck_a:
+                    state = state_ubx_ck_b
+                else:
+                    self.ubx_errors += 1
+                    state = state_idle
+
+                continue
+            elif state == state_ubx_ck_b:
+                state = state_idle
+
+                if c == ck_b:
+                    self.ubx_count += 1
+
+                    for sink in self.ubx_sinks:
+                        if sink.decode_ubx(self.msg_class, self.msg_id, self.payload_mv, self.msg_len):
+                            decoded = True
+                else:
+                    self.ubx_errors += 1
+
+                continue
+
+            # IDLE, LOOK FOR THE START OF THE NEXT MESSAGE
+            if c == chr_start:
+                state = state_nmea
+                line_len = 0
+                field_count = 0
+                cs_nmea = 0
+                self.msg_ns = chunk_ns - (count - i) * byte_ns
+                self.msg_read = self.reads
+            elif c == ubx_sync_1:
+                state = state_ubx_sync_2
+                self.msg_ns = chunk_ns - (count - i) * byte_ns
+                self.msg_read = self.reads
+
+        self.state = state
+        self.line_len = line_len
+        self.field_count = field_count
+        self.cs_nmea = cs_nmea
+        self.ck_a = ck_a
+        self.ck_b = ck_b
+
+        return decoded
@@ -0,0 +1,159 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# MAIDENHEAD GRID SQUARE LOCATOR, 2 - 10 CHARACTERS
+#
+# PAIRS: FIELD (20 X 10 DEGREES, A-R), SQUARE (2 X 1 DEGREES, 0-9), SUBSQUARE (5 X 2.5 MINUTES, a-x),
+# EXTENDED SQUARE (30 X 15 SECONDS, 0-9) AND EXTENDED SUBSQUARE (1.25 X 0.625 SECONDS, a-x)
+#
+# POSITIONS ARE CONVERTED ONCE TO INTEGER UNITS OF 1/2880 DEGREE OF LONGITUDE AND 1/5760 DEGREE OF LATITUDE, THE
+# SMALLEST CELL, SO EVERY PAIR IS AN EXACT INTEGER DIVISION AND NOTHING DRIFTS AT CELL EDGES. BOTH AXES SPAN 1036800
+# UNITS AND USE THE SAME CELL SIZES. THE POLE AND THE ANTIMERIDIAN ARE CLAMPED INTO THE LAST CELL
+#
+# GRID_LOCATOR KEEPS THE BOUNDS OF THE CURRENT CELL AND ONLY RECOMPUTES THE LOCATOR WHEN A FIX FALLS OUTSIDE THEM
+# THE BOUNDS ARE WIDENED BY THE HYSTERESIS IN METERS SO THE LOCATOR DOES NOT FLAP WHEN PARKED ON A CELL EDGE
+#
+# GRID_BATCH() CONVERTS A WHOLE TRACK, ONLY BUILDING A NEW LOCATOR WHEN THE CELL CHANGES. LOGGED TRACKS HOLD INTEGER
+# DEGREES (1E-5 FOR TRACK_LOG.PY), THOSE ARE CONVERTED WITH INTEGER MATH ONLY
+
+import math
+
+grid_upper = 'ABCDEFGHIJKLMNOPQRSTUVWX'
+grid_lower = 'abcdefghijklmnopqrstuvwx'
+grid_digits = '0123456789'
+
+# UNITS PER DEGREE AND PER AXIS
+grid_lon_units = 2880
+grid_lat_units = 5760
+grid_units_max = 1036800
+
+# CELL SIZE IN UNITS, NUMBER OF CELLS ACROSS ITS PARENT AND CHARACTER SET FOR EACH PAIR
+grid_cell = (57600, 5760, 240, 24, 1)
+grid_count = (18, 10, 24, 10, 24)
+grid_chars = (grid_upper, grid_digits, grid_lower, grid_digits, grid_lower)
+
+# METERS PER DEGREE OF LATITUDE
+grid_meters_deg = 111320
+
+# POSITION IN DEGREES TO UNITS, CLAMPED TO THE GRID
+def grid_units(latitude, longitude):
+    lat = int((latitude + 90) * grid_lat_units)
+    lon = int((longitude + 180) * grid_lon_units)
+
+    if lat < 0:
+        lat = 0
+    elif lat >= grid_units_max:
+        lat = grid_units_max - 1
+
+    if lon < 0:
+        lon = 0
+    elif lon >= grid_units_max:
+        lon = grid_units_max - 1
+
+    return lat, lon
+
+# LOCATOR TEXT FROM UNITS
+def grid_text(lat, lon, pairs=3):
+    text = ''
+
+    for i in range(pairs):
+        size = grid_cell[i]
+        count = grid_count[i]
+        chars = grid_chars[i]
+        text += chars[lon // size % count] + chars[lat // size % count]
+
+    return text
+
+# CALCULATE MAIDENHEAD GRID SQUARE
+def calc_grid(latitude, longitude, chars=6):
+    lat, lon = grid_units(latitude, longitude)
+    return grid_text(lat, lon, chars // 2)
+
+class grid_locator:
+    def __init__(self, chars=6, hysteresis_m=0):
+        self.pairs = chars // 2
+        self.size = grid_cell[self.pairs - 1]
+        self.hysteresis_m = hysteresis_m
+
+        # CURRENT CELL, WIDENED BY THE HYSTERESIS, IN UNITS. EMPTY UNTIL THE FIRST FIX
+        self.lat_low = 0
+        self.lat_high = 0
+        self.lon_low = 0
+        self.lon_high = 0
+        self.text = ''
+
+        # STATISTICS
+        self.updates = 0
+        self.changes = 0
+
+    # RETURNS TRUE IF THE LOCATOR TEXT CHANGED
+    def update(self, latitude, longitude):
+        lat, lon = grid_units(latitude, longitude)
+
+        if self.lat_low <= lat < self.lat_high and self.lon_low <= lon < self.lon_high:
+            return False
+
+        self.updates += 1
+        size = self.size
+        lat_cell = lat - lat % size
+        lon_cell = lon - lon % size
+
+        # HYSTERESIS IN UNITS, ROUNDED UP. A DEGREE OF LONGITUDE SHRINKS WITH THE COSINE OF THE LATITUDE
+        lat_margin = 0
+        lon_margin = 0
+
+        if self.hysteresis_m:
+            lat_margin = int(self.hysteresis_m * grid_lat_units / grid_meters_deg) + 1
+            lon_scale = math.cos(math.radians(latitude))
+
+            if lon_scale > 0.01:
+                lon_margin = int(self.hysteresis_m * grid_lon_units / (grid_meters_deg * lon_scale)) + 1
+
+        self.lat_low = lat_cell - lat_margin
+        self.lat_high = lat_cell + size + lat_margin
+        self.lon_low = lon_cell - lon_margin
+        self.lon_high = lon_cell + size + lon_margin
+
+        text = grid_text(lat, lon, self.pairs)
+
+        if text == self.text:
+            return False
+
+        self.text = text
+        self.changes += 1
+
+        return True
+
+    def report(self):
+        return 'GRID   {:10s} {:6d} RECALCS {:6d} CHANGES'.format(self.text, self.updates, self.changes)
+
+# LOCATORS FOR A WHOLE TRACK, ONE PER POINT. SCALE IS 1 FOR DEGREES OR THE UNITS PER DEGREE OF INTEGER POSITIONS
+# POINTS IN THE SAME CELL AS THE ONE BEFORE SHARE ITS LOCATOR STRING
+def grid_batch(latitudes, longitudes, chars=6, scale=1):
+    pairs = chars // 2
+    size = grid_cell[pairs - 1]
+    lat_offset = 90 * scale
+    lon_offset = 180 * scale
+    last_lat = -1
+    last_lon = -1
+    text = ''
+    out = []
+
+    for latitude, longitude in zip(latitudes, longitudes):
+        if scale == 1:
+            lat, lon = grid_units(latitude, longitude)
+        else:
+            lat = min(max((latitude + lat_offset) * grid_lat_units // scale, 0), grid_units_max - 1)
+            lon = min(max((longitude + lon_offset) * grid_lon_units // scale, 0), grid_units_max - 1)
+
+        lat //= size
+        lon //= size
+
+        if lat != last_lat or lon != last_lon:
+            last_lat = lat
+            last_lon = lon
+            text = grid_text(lat * size, lon * size, pairs)
+
+        out.append(text)
+
+    return out
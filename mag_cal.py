@@ -0,0 +1,255 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# MAGNETOMETER HARD / SOFT IRON CALIBRATION
+#
+# ROTATED FLAT, THE X/Y FIELD TRACES A CIRCLE AROUND THE ORIGIN. HARD IRON SHIFTS THE CIRCLE AND SOFT IRON STRETCHES
+# IT INTO AN ELLIPSE. THE ELLIPSE A*X^2 + B*X*Y + C*Y^2 + D*X + E*Y = 1 IS FITTED BY LEAST SQUARES, ITS CENTER IS THE
+# HARD IRON OFFSET AND THE 2X2 MATRIX THAT MAPS IT BACK TO A CIRCLE OF THE SAME AREA IS THE SOFT IRON CORRECTION
+#
+# SAMPLES ARE AVERAGED INTO ANGULAR BINS AROUND THE CURRENT CENTER ESTIMATE SO EVERY DIRECTION CARRIES THE SAME WEIGHT
+# NO MATTER HOW LONG THE OPERATOR LINGERS, AND NOISE IN SINGLE SAMPLES IS AVERAGED OUT
+# THE NORMAL EQUATION SUMS ARE UPDATED IN PLACE AS BINS CHANGE, SO MEMORY IS FIXED AND SOLVING IS A SMALL 5X5 SYSTEM
+# THE SUMS ARE REBUILT FROM THE BINS ONCE PER BINS UPDATES TO KEEP SINGLE PRECISION ROUNDING FROM BUILDING UP
+#
+# COVERAGE IS THE PERCENTAGE OF BINS HOLDING SAMPLES, QUALITY IS THE RMS RADIUS ERROR OF THE CORRECTED BINS IN PERCENT
+
+import math
+
+from array import array
+
+# NORMAL EQUATION TERMS, V = (X^2, X*Y, Y^2, X, Y)
+cal_terms = 5
+
+class mag_cal:
+    def __init__(self, bins=36, scale=100.0, bin_samples=16):
+        self.bins = bins
+        self.scale = scale
+        self.bin_samples = bin_samples
+        self.bin_deg = 360 / bins
+
+        # PER BIN SAMPLE SUMS AND COUNTS, NORMALISED BY SCALE
+        self.bin_x = array('f', [0.0] * bins)
+        self.bin_y = array('f', [0.0] * bins)
+        self.bin_n = array('H', [0] * bins)
+        self.filled = 0
+
+        # NORMAL EQUATION SUMS, SUM(V * V') IN ROW ORDER AND SUM(V)
+        self.sum_vv = array('f', [0.0] * (cal_terms * cal_terms))
+        self.sum_v = array('f', [0.0] * cal_terms)
+        self.v = array('f', [0.0] * cal_terms)
+        self.updates = 0
+
+        # RAW RANGE, CENTER ESTIMATE UNTIL THE FIRST FIT
+        self.min_x = 0.0
+        self.max_x = 0.0
+        self.min_y = 0.0
+        self.max_y = 0.0
+        self.samples = 0
+
+        # RESULT, IN RAW SENSOR UNITS
+        self.valid = False
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.soft_iron = (1.0, 0.0, 0.0, 1.0)
+        self.rms = 0.0
+
+    @property
+    def coverage(self):
+        return self.filled * 100 // self.bins
+
+    # ADD OR REMOVE ONE NORMALISED POINT FROM THE NORMAL EQUATION SUMS
+    def accumulate(self, x, y, weight):
+        v = self.v
+        v[0] = x * x
+        v[1] = x * y
+        v[2] = y * y
+        v[3] = x
+        v[4] = y
+
+        sum_vv = self.sum_vv
+        sum_v = self.sum_v
+
+        for i in range(cal_terms):
+            vi = v[i] * weight
+            sum_v[i] += vi
+            row = i * cal_terms
+
+            for j in range(i, cal_terms):
+                sum_vv[row + j] += vi * v[j]
+
+    # REBUILD THE SUMS FROM THE BINS
+    def rebuild(self):
+        for i in range(cal_terms * cal_terms):
+            self.sum_vv[i] = 0.0
+
+        for i in range(cal_terms):
+            self.sum_v[i] = 0.0
+
+        for i in range(self.bins):
+            n = self.bin_n[i]
+
+            if n:
+                self.accumulate(self.bin_x[i] / n, self.bin_y[i] / n, 1)
+
+    # ADD A RAW SAMPLE
+    def add(self, x, y):
+        if self.samples == 0:
+            self.min_x = self.max_x = x
+            self.min_y = self.max_y = y
+        else:
+            self.min_x = min(self.min_x, x)
+            self.max_x = max(self.max_x, x)
+            self.min_y = min(self.min_y, y)
+            self.max_y = max(self.max_y, y)
+
+        self.samples += 1
+
+        if self.valid:
+            center_x = self.offset_x
+            center_y = self.offset_y
+        else:
+            center_x = (self.min_x + self.max_x) / 2
+            center_y = (self.min_y + self.max_y) / 2
+
+        angle = math.atan2(y - center_y, x - center_x) * 180 / math.pi
+
+        if angle < 0:
+            angle += 360
+
+        index = int(angle / self.bin_deg) % self.bins
+        x /= self.scale
+        y /= self.scale
+        n = self.bin_n[index]
+
+        # SWAP THIS BIN'S MEAN POINT IN THE SUMS FOR ITS NEW MEAN
+        if n:
+            self.accumulate(self.bin_x[index] / n, self.bin_y[index] / n, -1)
+
+            # HALVE A FULL BIN SO IT FOLLOWS NEWER SAMPLES
+            if n >= self.bin_samples:
+                self.bin_x[index] /= 2
+                self.bin_y[index] /= 2
+                n //= 2
+        else:
+            self.filled += 1
+
+        self.bin_x[index] += x
+        self.bin_y[index] += y
+        n += 1
+        self.bin_n[index] = n
+        self.accumulate(self.bin_x[index] / n, self.bin_y[index] / n, 1)
+
+        self.updates += 1
+
+        if self.updates >= self.bins:
+            self.updates = 0
+            self.rebuild()
+
+    # SOLVE THE NORMAL EQUATIONS FOR THE ELLIPSE, RETURNS FALSE IF THE POINTS DO NOT DESCRIBE ONE
+    def solve(self):
+        if self.filled < cal_terms:
+            return False
+
+        # AUGMENTED MATRIX, THE SUMS ONLY HOLD THE UPPER TRIANGLE
+        size = cal_terms + 1
+        m = [0.0] * (cal_terms * size)
+
+        for i in range(cal_terms):
+            for j in range(cal_terms):
+                if j >= i:
+                    m[i * size + j] = self.sum_vv[i * cal_terms + j]
+                else:
+                    m[i * size + j] = self.sum_vv[j * cal_terms + i]
+
+            m[i * size + cal_terms] = self.sum_v[i]
+
+        # GAUSSIAN ELIMINATION WITH PARTIAL PIVOTING
+        for col in range(cal_terms):
+            pivot = col
+
+            for row in range(col + 1, cal_terms):
+                if abs(m[row * size + col]) > abs(m[pivot * size + col]):
+                    pivot = row
+
+            if m[pivot * size + col] == 0:
+                return False
+
+            if pivot != col:
+                for j in range(size):
+                    m[col * size + j], m[pivot * size + j] = m[pivot * size + j], m[col * size + j]
+
+            div = m[col * size + col]
+
+            for row in range(cal_terms):
+                if row == col:
+                    continue
+
+                factor = m[row * size + col] / div
+
+                if factor:
+                    for j in range(col, size):
+                        m[row * size + j] -= factor * m[col * size + j]
+
+        a, b, c, d, e = [m[i * size + cal_terms] / m[i * size + i] for i in range(cal_terms)]
+
+        # CENTER, WHERE THE GRADIENT IS ZERO
+        det = 4 * a * c - b * b
+
+        if det <= 0:
+            return False
+
+        center_x = (b * e - 2 * c * d) / det
+        center_y = (b * d - 2 * a * e) / det
+
+        # MOVED TO THE CENTER THE ELLIPSE IS A*U^2 + B*U*V + C*V^2 = G
+        g = 1 - (a * center_x * center_x + b * center_x * center_y + c * center_y * center_y + d * center_x + e * center_y)
+
+        if g <= 0:
+            return False
+
+        # SHAPE MATRIX Q, U' * Q * U = 1, THE CORRECTION IS SQRT(Q) SCALED TO A DETERMINANT OF 1
+        q11 = a / g
+        q12 = b / (2 * g)
+        q22 = c / g
+        s = math.sqrt(q11 * q22 - q12 * q12)
+        t = math.sqrt(q11 + q22 + 2 * s) * math.sqrt(s)
+
+        self.soft_iron = ((q11 + s) / t, q12 / t, q12 / t, (q22 + s) / t)
+        self.offset_x = center_x * self.scale
+        self.offset_y = center_y * self.scale
+        self.valid = True
+        self.rms = self.residual()
+
+        return True
+
+    # APPLY THE CALIBRATION TO A RAW SAMPLE
+    def correct(self, x, y):
+        x -= self.offset_x
+        y -= self.offset_y
+        w = self.soft_iron
+
+        return w[0] * x + w[1] * y, w[2] * x + w[3] * y
+
+    # RMS RADIUS ERROR OF THE CORRECTED BIN MEANS IN PERCENT OF THE MEAN RADIUS
+    def residual(self):
+        total = 0.0
+        total_sq = 0.0
+        count = 0
+
+        for i in range(self.bins):
+            n = self.bin_n[i]
+
+            if n:
+                x, y = self.correct(self.bin_x[i] / n * self.scale, self.bin_y[i] / n * self.scale)
+                r = math.sqrt(x * x + y * y)
+                total += r
+                total_sq += r * r
+                count += 1
+
+        mean = total / count
+
+        if mean == 0:
+            return 0.0
+
+        return math.sqrt(max(total_sq / count - mean * mean, 0)) * 100 / mean
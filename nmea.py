@@ -0,0 +1,290 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# NMEA DECODER FOR RMC AND GGA SENTENCES
+#
+# DROP IN REPLACEMENT FOR THE PARTS OF ADAFRUIT_GPS.GPS USED BY THIS PROJECT
+# SENTENCES ARE FRAMED AND CHECKSUMMED BY GPS_STREAM.GPS_DEMUX, WHICH ALSO RECORDS THE COMMA POSITIONS
+# SO FIELDS CAN BE DECODED IN PLACE IN THE DEMUX LINE BUFFER
+# NUMBERS ARE BUILT FROM THE DIGITS WITH INTEGER MATH, NO STRINGS ARE CREATED AND NOTHING IS SPLIT
+#
+# ONLY THE FIELDS USED BY CODE.PY ARE DECODED:
+# LATITUDE, LONGITUDE, ALTITUDE_M, SPEED_KNOTS, TRACK_ANGLE_DEG, SATELLITES, FIX_QUALITY AND THE UTC TIMESTAMP
+
+import time
+
+# FRACTIONAL DIGITS KEPT WHEN DECODING NUMBERS
+# FOUR DIGITS OF ARC MINUTES IS ABOUT 0.2M AND KEEPS THE INTEGER MANTISSA SMALL ENOUGH TO AVOID LONG INTS
+nmea_max_dec = 4
+
+# POWERS OF TEN FOR FIXED POINT CONVERSION
+pow10 = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# CHARACTER CODES
+chr_dot = 0x2E      # .
+chr_minus = 0x2D    # -
+
+class nmea_gps:
+    def __init__(self):
+        # SENTENCE BEING DECODED, POINTS AT THE DEMUX BUFFERS
+        self.line = None
+        self.commas = None
+        self.line_len = 0
+        self.field_count = 0
+
+        # DECODED DATA, NONE UNTIL RECEIVED
+        self.latitude = None
+        self.longitude = None
+        self.altitude_m = None
+        self.speed_knots = None
+        self.track_angle_deg = None
+        self.satellites = None
+        self.fix_quality = 0
+
+        # UTC TIMESTAMP, YEAR STAYS 0 UNTIL AN RMC SENTENCE WITH A DATE IS RECEIVED
+        self.time_valid = False
+        self.year = 0
+        self.month = 0
+        self.day = 0
+        self.hour = 0
+        self.minute = 0
+        self.second = 0
+        self.time_struct = None
+
+        # STATISTICS
+        self.sentences = 0
+
+        # FIELD DECODING SCRATCH VALUES
+        self.start = 0
+        self.end = 0
+        self.mant = 0
+        self.dec = 0
+
+    @property
+    def has_fix(self):
+        return self.fix_quality >= 1
+
+    # STRUCT_TIME IS BUILT ONCE PER NEW TIME, NONE UNTIL A TIME HAS BEEN RECEIVED
+    # RTC.SET_TIME_SOURCE() READS THIS ON EVERY TIME.TIME() CALL SO IT IS CACHED
+    @property
+    def timestamp_utc(self):
+        if not self.time_valid:
+            return None
+
+        if self.time_struct is None:
+            self.time_struct = time.struct_time((self.year, self.month, self.day, self.hour, self.minute, self.second, 0, 0, -1))
+
+        return self.time_struct
+
+    # FOR RTC.SET_TIME_SOURCE()
+    @property
+    def datetime(self):
+        return self.timestamp_utc
+
+    # DECODE ONE CHECKSUM VALIDATED SENTENCE FROM THE DEMUX, RETURNS TRUE IF IT WAS RMC OR GGA
+    def decode_nmea(self, line, line_len, commas, field_count):
+        self.line = line
+        self.line_len = line_len
+        self.commas = commas
+        self.field_count = field_count
+
+        return self.decode()
+
+    # SET SELF.START AND SELF.END TO THE INDEX RANGE OF A FIELD IN THE LINE BUFFER, FIELD 0 IS THE SENTENCE ID
+    # STORED ON THE OBJECT RATHER THAN RETURNED AS A TUPLE SO NOTHING IS ALLOCATED
+    def field(self, index):
+        if index == 0:
+            self.start = 0
+        else:
+            self.start = self.commas[index - 1] + 1
+
+        if index < self.field_count:
+            self.end = self.commas[index]
+        else:
+            self.end = self.line_len
+
+    # MATCH THE SENTENCE TYPE, RETURNS TRUE IF IT WAS RMC OR GGA
+    def decode(self):
+        line = self.line
+
+        if self.field_count < 1 or self.commas[0] != 5:
+            return False
+
+        self.sentences += 1
+
+        # MATCH ANY TALKER ID, GP, GN, GL ETC
+        if line[2] == 0x52 and line[3] == 0x4D and line[4] == 0x43:
+            return self.decode_rmc()
+
+        if line[2] == 0x47 and line[3] == 0x47 and line[4] == 0x41:
+            return self.decode_gga()
+
+        return False
+
+    # RMC - TIME, STATUS, LAT, N/S, LON, E/W, SPEED, TRACK, DATE
+    def decode_rmc(self):
+        if self.field_count < 9:
+            return False
+
+        self.field(2)
+
+        if self.end > self.start and self.line[self.start] == 0x41:
+            if self.fix_quality == 0:
+                self.fix_quality = 1
+        else:
+            self.fix_quality = 0
+
+        self.decode_time(1)
+        self.decode_date(9)
+        self.latitude = self.decode_degrees(3, 0x53)
+        self.longitude = self.decode_degrees(5, 0x57)
+        self.speed_knots = self.decode_number(7)
+        self.track_angle_deg = self.decode_number(8)
+
+        return True
+
+    # GGA - TIME, LAT, N/S, LON, E/W, FIX QUALITY, SATELLITES, HDOP, ALTITUDE
+    def decode_gga(self):
+        if self.field_count < 10:
+            return False
+
+        self.decode_time(1)
+        self.latitude = self.decode_degrees(2, 0x53)
+        self.longitude = self.decode_degrees(4, 0x57)
+
+        fix_quality = self.decode_int(6)
+        self.fix_quality = fix_quality if fix_quality is not None else 0
+
+        self.satellites = self.decode_int(7)
+        self.altitude_m = self.decode_number(9)
+
+        return True
+
+    # DECODE AN UNSIGNED INTEGER FIELD, NONE IF EMPTY
+    def decode_int(self, index):
+        self.field(index)
+        start = self.start
+        end = self.end
+
+        if start == end:
+            return None
+
+        line = self.line
+        value = 0
+
+        for i in range(start, end):
+            c = line[i] - 0x30
+
+            if c < 0 or c > 9:
+                return None
+
+            value = value * 10 + c
+
+        return value
+
+    # DECODE A FIELD TO AN INTEGER MANTISSA AND NUMBER OF DECIMALS, STORED IN SELF.MANT / SELF.DEC
+    # RETURNS FALSE IF THE FIELD IS EMPTY OR INVALID
+    def decode_fixed(self, index):
+        self.field(index)
+        start = self.start
+        end = self.end
+
+        if start == end:
+            return False
+
+        line = self.line
+        mant = 0
+        dec = -1
+        neg = False
+
+        if line[start] == chr_minus:
+            neg = True
+            start += 1
+
+        for i in range(start, end):
+            c = line[i]
+
+            if c == chr_dot:
+                dec = 0
+                continue
+
+            c -= 0x30
+
+            if c < 0 or c > 9:
+                return False
+
+            if dec >= 0:
+                if dec >= nmea_max_dec:
+                    continue
+
+                dec += 1
+
+            mant = mant * 10 + c
+
+        self.mant = -mant if neg else mant
+        self.dec = dec if dec > 0 else 0
+
+        return True
+
+    # DECODE A DECIMAL NUMBER FIELD, NONE IF EMPTY
+    def decode_number(self, index):
+        if not self.decode_fixed(index):
+            return None
+
+        return self.mant / pow10[self.dec]
+
+    # DECODE DDDMM.MMMM AND ITS HEMISPHERE FIELD TO SIGNED DEGREES, NONE IF EMPTY
+    def decode_degrees(self, index, neg_char):
+        if not self.decode_fixed(index):
+            return None
+
+        scale = pow10[self.dec]
+        degrees = self.mant // (scale * 100)
+        minutes = self.mant - degrees * scale * 100
+        value = degrees + minutes / (scale * 60)
+
+        self.field(index + 1)
+
+        if self.end > self.start and self.line[self.start] == neg_char:
+            value = -value
+
+        return value
+
+    # DECODE HHMMSS.SS
+    def decode_time(self, index):
+        self.field(index)
+        start = self.start
+
+        if self.end - start < 6:
+            return
+
+        line = self.line
+        hour = (line[start] - 0x30) * 10 + line[start + 1] - 0x30
+        minute = (line[start + 2] - 0x30) * 10 + line[start + 3] - 0x30
+        second = (line[start + 4] - 0x30) * 10 + line[start + 5] - 0x30
+
+        if second != self.second or minute != self.minute or hour != self.hour or not self.time_valid:
+            self.time_struct = None
+            self.hour = hour
+            self.minute = minute
+            self.second = second
+            self.time_valid = True
+
+    # DECODE DDMMYY
+    def decode_date(self, index):
+        self.field(index)
+        start = self.start
+
+        if self.end - start < 6:
+            return
+
+        line = self.line
+        day = (line[start] - 0x30) * 10 + line[start + 1] - 0x30
+        month = (line[start + 2] - 0x30) * 10 + line[start + 3] - 0x30
+        year = 2000 + (line[start + 4] - 0x30) * 10 + line[start + 5] - 0x30
+
+        if day != self.day or month != self.month or year != self.year:
+            self.time_struct = None
+            self.day = day
+            self.month = month
+            self.year = year
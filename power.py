@@ -0,0 +1,262 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# POWER MANAGEMENT
+#
+# ONCE THE GROUND SPEED HAS STAYED BELOW STILL_KNOTS FOR STILL_SECS THE UNIT IS IDLE (STATIONARY), UNTIL IT GOES OVER
+# TWICE STILL_KNOTS AGAIN. WHILE IDLE:
+# - THE RECEIVER IS IN POWER SAVE MODE (CFG-RXM), USING THE CYCLIC TRACKING SETUP SENT AT BOOT (CFG-PM2). IT STILL
+#   OUTPUTS A FIX EVERY EPOCH BUT ONLY POWERS THE RF AND BASEBAND FOR AS LONG AS IT NEEDS TO KEEP TRACKING
+# - THE GPS TASK STOPS POLLING EVERY GPS_RATE AND SLEEPS FROM THE END OF ONE EPOCH'S BURST UNTIL JUST BEFORE THE NEXT
+#   ONE IS DUE. THE 256 BYTE UART BUFFER HOLDS A WHOLE EPOCH, SO A WAKE UP THAT IS EARLY OR LATE LOSES NOTHING
+# - THE COMPASS AND DISPLAY TASKS RUN AT THE IDLE RATE
+# BETWEEN TASK RUNS ASYNCIO WAITS IN A LIGHT SLEEP (WFI UNTIL THE NEXT INTERRUPT, THE UART KEEPS RECEIVING), SO THE CPU
+# SAVING COMES FROM WAKING LESS OFTEN. ALARM.LIGHT_SLEEP_UNTIL_ALARMS() WOULD STALL THE OTHER TASKS AND ON THE RP2040
+# SLEEPS NO DEEPER
+#
+# THE DISPLAY IS DIMMED AFTER DIM_SECS AND BLANKED (PANEL SLEEP, NO FRAMES SENT) AFTER BLANK_SECS WITHOUT ACTIVITY,
+# 0 = NEVER. MOVING OR TURNING THE UNIT (A COMPASS DIRECTION CHANGE) COUNTS AS ACTIVITY AND WAKES IT
+#
+# THE AVERAGE CURRENT IS ESTIMATED FROM THE TIME SPENT IN EACH STATE AND THE CPU BUSY TIME REPORTED BY THE SCHEDULER,
+# USING THE PER COMPONENT FIGURES BELOW, AND COMPARED WITH RUNNING EVERYTHING FULL TIME
+
+import struct
+
+# UBX MESSAGE TYPES
+cfg_pm2_type = bytes([0x06, 0x3B])
+cfg_rxm_type = bytes([0x06, 0x11])
+
+# CFG-PM2 VERSION 1: VERSION, MAX STARTUP STATE DURATION, FLAGS, UPDATE PERIOD (MS), SEARCH PERIOD (MS), GRID OFFSET,
+# ON TIME (S), MINIMUM ACQUISITION TIME (S)
+cfg_pm2_format = '<BxBxIIIIHH20x'
+pm2_version = 1
+pm2_update_eph = 0x00001000
+pm2_cyclic_tracking = 0x00020000
+
+# CFG-RXM LOW POWER MODE
+rxm_continuous = 0
+rxm_power_save = 1
+
+# SSD1351 COMMANDS, MASTER CONTRAST IS 0 - 15
+ssd1351_contrast = 0xC7
+ssd1351_display_off = 0xAE
+ssd1351_display_on = 0xAF
+ssd1351_contrast_full = 15
+
+# DISPLAY STATES
+disp_on = 0
+disp_dim = 1
+disp_blank = 2
+disp_state_text = ('ON', 'DIM', 'OFF')
+
+# ESTIMATED CURRENT PER COMPONENT IN MA, REPLACE WITH MEASURED VALUES FOR A BETTER ESTIMATE
+# DISPLAY CURRENT IS FOR THE DASHBOARD AT FULL CONTRAST AND SCALES WITH THE CONTRAST
+pwr_gps_track_ma = 45.0
+pwr_gps_save_ma = 18.0
+pwr_cpu_run_ma = 45.0
+pwr_cpu_idle_ma = 25.0
+pwr_disp_ma = 40.0
+pwr_base_ma = 5.0
+
+# CFG-PM2 PAYLOAD FOR CYCLIC TRACKING, ONE FIX EVERY UPDATE_MS, RETRY ACQUISITION EVERY SEARCH_MS IF THE FIX IS LOST
+def ubx_cfg_pm2(update_ms, search_ms):
+    return struct.pack(cfg_pm2_format, pm2_version, 0, pm2_update_eph | pm2_cyclic_tracking, update_ms, search_ms, 0, 0, 0)
+
+# CFG-RXM PAYLOAD, THE FIRST BYTE IS RESERVED AND MUST BE 8
+def ubx_cfg_rxm(mode):
+    return bytes([0x08, mode])
+
+class power_save:
+    def __init__(self, config, disp_bus, render, gps_save, still_knots, still_secs, idle_rate, dim_secs, blank_secs, dim_contrast, capacity_mah, epoch=1.0, guard=0.05):
+        # CONFIGURATION ENGINE FROM BOOT, ONLY REGISTERED WITH THE DEMUX WHILE A COMMAND IS OUTSTANDING
+        self.config = config
+        self.disp_bus = disp_bus
+        self.render = render
+        self.gps_save = gps_save
+
+        self.still_knots = still_knots
+        self.move_knots = still_knots * 2
+        self.still_ns = int(still_secs * 1000000000)
+        self.idle_ns = int(idle_rate * 1000000000)
+        self.dim_ns = int(dim_secs * 1000000000)
+        self.blank_ns = int(blank_secs * 1000000000)
+        self.epoch_ns = int(epoch * 1000000000)
+        self.guard_ns = int(guard * 1000000000)
+        self.capacity_mah = capacity_mah
+
+        # PREBUILT DISPLAY COMMAND DATA
+        self.contrast_full = bytes([ssd1351_contrast_full])
+        self.contrast_dim = bytes([dim_contrast])
+        self.dim_contrast = dim_contrast
+        self.no_data = b''
+
+        self.idle = False
+        self.still_since = 0
+        self.active_ns = 0
+        self.disp_state = disp_on
+
+        # RECEIVER MODE IN EFFECT AND THE MODE BEING SENT, -1 WHEN NOTHING IS OUTSTANDING
+        self.gps_mode = rxm_continuous
+        self.gps_sending = -1
+
+        # GPS BURST TRACKING, TIME THE UART LAST DELIVERED BYTES
+        self.rx_bytes = 0
+        self.rx_ns = 0
+
+        # CHARGE USED IN MA MS, AND TIME, SPLIT INTO IDLE AND ACTIVE
+        self.last_ns = 0
+        self.last_busy_ns = 0
+        self.charge = 0
+        self.elapsed_ms = 0
+        self.idle_ms = 0
+        self.active_ms = 0
+        self.active_busy_ms = 0
+        self.curr_ma = 0.0
+
+    # GROUND SPEED FROM EACH FIX
+    def motion(self, speed_knots, now):
+        if speed_knots >= self.move_knots:
+            self.still_since = 0
+            self.wake(now)
+        elif speed_knots < self.still_knots and not self.still_since:
+            self.still_since = now
+
+    # ACTIVITY, RESTART THE DIM / BLANK TIMERS AND TURN THE DISPLAY BACK ON
+    def wake(self, now):
+        self.active_ns = now
+
+        if self.disp_state != disp_on:
+            self.set_display(disp_on)
+
+    def set_display(self, state):
+        bus = self.disp_bus
+
+        if state == disp_blank:
+            bus.send(ssd1351_display_off, self.no_data)
+            self.render.paused = True
+        else:
+            bus.send(ssd1351_contrast, self.contrast_dim if state == disp_dim else self.contrast_full)
+
+            if self.disp_state == disp_blank:
+                bus.send(ssd1351_display_on, self.no_data)
+                self.render.paused = False
+
+        self.disp_state = state
+
+    # NANOSECONDS UNTIL THE GPS TASK SHOULD RUN AGAIN, NONE FOR ITS NORMAL RATE
+    # WHILE BYTES ARE ARRIVING THE BURST IS READ AT THE NORMAL RATE, ONCE IT HAS ENDED THE TASK SLEEPS UNTIL JUST BEFORE
+    # THE NEXT ONE. IF NOTHING HAS ARRIVED FOR A WHOLE EPOCH THE NORMAL RATE IS USED UNTIL THE BURSTS ARE FOUND AGAIN
+    def gps_delay(self, now, bytes_in):
+        if not self.idle:
+            return None
+
+        if bytes_in != self.rx_bytes:
+            self.rx_bytes = bytes_in
+            self.rx_ns = now
+            return None
+
+        wake_ns = self.rx_ns + self.epoch_ns - self.guard_ns
+
+        if now - self.rx_ns > self.epoch_ns or wake_ns <= now:
+            return None
+
+        return wake_ns - now
+
+    # NANOSECONDS UNTIL THE NEXT RUN FOR TASKS THAT SLOW DOWN WHILE IDLE, NONE FOR THEIR NORMAL RATE
+    def task_delay(self):
+        return self.idle_ns if self.idle else None
+
+    # RUN ONCE A SECOND, BUSY_NS IS THE TOTAL RUN TIME OF ALL TASKS SO FAR
+    def tick(self, now, busy_ns):
+        if not self.last_ns:
+            self.last_ns = now
+            self.last_busy_ns = busy_ns
+            self.active_ns = now
+
+        self.idle = self.still_since != 0 and now - self.still_since >= self.still_ns
+
+        # SWITCH THE RECEIVER ONE COMMAND AT A TIME, ONLY WHILE THE CONFIGURATION ENGINE IS FREE (THE RATE GUARD AND THE
+        # SATELLITE PAGE SHARE IT). A NAK OR NO REPLY TURNS RECEIVER POWER SAVE OFF
+        config = self.config
+
+        if self.gps_sending >= 0:
+            if not config.poll():
+                if config.finish():
+                    self.gps_save = False
+                    print('GPS POWER SAVE DISABLED, RXM COMMAND FAILED')
+                else:
+                    self.gps_mode = self.gps_sending
+
+                config.demux.remove_ubx(config)
+                self.gps_sending = -1
+        elif self.gps_save:
+            mode = rxm_power_save if self.idle else rxm_continuous
+
+            if mode != self.gps_mode and not config.cmds:
+                config.demux.add_ubx(config)
+                config.add('RXM', cfg_rxm_type, ubx_cfg_rxm(mode))
+                config.start()
+                self.gps_sending = mode
+
+        # DIM, THEN BLANK, AFTER A PERIOD WITHOUT ACTIVITY
+        inactive = now - self.active_ns
+
+        if self.blank_ns and inactive >= self.blank_ns:
+            if self.disp_state != disp_blank:
+                self.set_display(disp_blank)
+        elif self.dim_ns and inactive >= self.dim_ns:
+            if self.disp_state != disp_dim:
+                self.set_display(disp_dim)
+
+        self.account(now, busy_ns)
+
+    # ADD THE CHARGE USED SINCE THE LAST TICK
+    def account(self, now, busy_ns):
+        dt_ms = (now - self.last_ns) // 1000000
+        busy_ms = (busy_ns - self.last_busy_ns) // 1000000
+        self.last_ns = now
+        self.last_busy_ns = busy_ns
+
+        if busy_ms > dt_ms:
+            busy_ms = dt_ms
+
+        gps_ma = pwr_gps_save_ma if self.gps_mode == rxm_power_save else pwr_gps_track_ma
+
+        if self.disp_state == disp_blank:
+            disp_ma = 0.0
+        elif self.disp_state == disp_dim:
+            disp_ma = pwr_disp_ma * (self.dim_contrast + 1) / (ssd1351_contrast_full + 1)
+        else:
+            disp_ma = pwr_disp_ma
+
+        charge = int((gps_ma + disp_ma + pwr_base_ma + pwr_cpu_idle_ma) * dt_ms + (pwr_cpu_run_ma - pwr_cpu_idle_ma) * busy_ms)
+
+        if dt_ms:
+            self.curr_ma = charge / dt_ms
+
+        self.charge += charge
+        self.elapsed_ms += dt_ms
+
+        if self.idle:
+            self.idle_ms += dt_ms
+        else:
+            self.active_ms += dt_ms
+            self.active_busy_ms += busy_ms
+
+    # AVERAGE CURRENT SO FAR, AND WITH EVERYTHING FULL TIME AT THE CPU LOAD SEEN WHILE ACTIVE
+    def average_ma(self):
+        if not self.elapsed_ms:
+            return 0.0, 0.0
+
+        busy = self.active_busy_ms / self.active_ms if self.active_ms else 0.0
+        full_ma = pwr_gps_track_ma + pwr_disp_ma + pwr_base_ma + pwr_cpu_idle_ma + (pwr_cpu_run_ma - pwr_cpu_idle_ma) * busy
+
+        return self.charge / self.elapsed_ms, full_ma
+
+    def report(self):
+        avg_ma, full_ma = self.average_ma()
+        runtime = self.capacity_mah / avg_ma if avg_ma else 0.0
+        full_runtime = self.capacity_mah / full_ma if full_ma else 0.0
+        idle_pct = self.idle_ms * 100 // self.elapsed_ms if self.elapsed_ms else 0
+
+        return 'POWER  {:4s} GPS {:4s} DISP {:3s} IDLE {:3d}%  NOW {:5.1f}MA AVG {:5.1f}MA FULL TIME {:5.1f}MA  RUNTIME {:4.1f}H VS {:4.1f}H'.format('IDLE' if self.idle else 'ACTV', 'SAVE' if self.gps_mode == rxm_power_save else 'CONT', disp_state_text[self.disp_state], idle_pct, self.curr_ma, avg_ma, full_ma, runtime, full_runtime)
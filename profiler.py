@@ -0,0 +1,147 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# LOOP PROFILER
+#
+# THE SCHEDULER KEEPS A RUN TIME HISTOGRAM FOR EVERY TASK (GPS UPDATE, CLOCK, COMPASS, BATTERY, DISPLAY ...)
+# LOOP_PROFILE ADDS A SAMPLE ONCE A SECOND OF:
+# - THE GPS UART, BYTES PER SECOND, THE MOST BYTES SEEN WAITING AND OVERRUNS (THE RECEIVE BUFFER FOUND FULL, ANY BYTES
+#   ARRIVING AFTER THAT ARE LOST), AND CHECKSUM ERRORS
+# - THE HEAP, FREE BYTES AND THEIR LOW POINT. FREE HEAP GOING UP BETWEEN SAMPLES IS COUNTED AS AN AUTOMATIC COLLECTION
+#
+# SCHEDULED COLLECTION: LEFT TO ITSELF THE HEAP IS COLLECTED WHENEVER AN ALLOCATION FINDS IT FULL, WHICH CAN BE IN THE
+# MIDDLE OF A FRAME OR WHILE A GPS MESSAGE IS ARRIVING. INSTEAD THE DISPLAY TASK ASKS GC_DUE() RIGHT AFTER ITS FLUSH AND,
+# IF THE GPS LINE IS QUIET, RUNS COLLECT() EVERY GC_SECS (0 = NEVER), OFTEN ENOUGH THAT THE HEAP DOES NOT FILL. EACH
+# COLLECTION IS TIMED, GIVING THE PAUSE TIME, THE HEAP STILL IN USE AFTER IT, AND THE ALLOCATION RATE SINCE THE LAST
+# ONE. THE RATE IS A LOW ESTIMATE IF AN AUTOMATIC COLLECTION HAPPENED IN BETWEEN
+#
+# SAMPLING ALLOCATES NOTHING. DEBUG_LINES() FORMATS THE HIDDEN DEBUG PAGE AND DUMP() PRINTS EVERYTHING TO THE USB
+# SERIAL CONSOLE, BOTH ONLY WHEN ASKED FOR
+
+import gc
+import time
+
+from scheduler import hist_base_ns, hist_bin, hist_bins, hist_percentile
+
+# LONGEST NUMBER SHOWN IN A 5 CHARACTER DEBUG PAGE COLUMN
+debug_max = 99999
+
+class loop_profile:
+    def __init__(self, tasks, demux, gc_secs=10):
+        self.tasks = tasks
+        self.demux = demux
+        self.gc_ns = int(gc_secs * 1000000000)
+
+        # UART, BYTES PER SECOND OVER THE LAST SAMPLE
+        self.last_ns = 0
+        self.last_bytes = 0
+        self.bytes_per_sec = 0
+
+        # HEAP, FREE BYTES AT THE LAST SAMPLE AND THE LOWEST SEEN
+        self.mem_free = 0
+        self.min_free = 0
+        self.auto_collects = 0
+
+        # TIMED COLLECTIONS
+        self.gc_hist = [0] * hist_bins
+        self.gc_runs = 0
+        self.gc_last_ns = 0
+        self.gc_max_ns = 0
+        self.gc_pause_ns = 0
+        self.gc_free = 0
+        self.heap_used = 0
+        self.alloc_per_sec = 0
+
+    # RUN ONCE A SECOND
+    def sample(self, now):
+        demux = self.demux
+
+        if self.last_ns and now > self.last_ns:
+            self.bytes_per_sec = (demux.bytes_in - self.last_bytes) * 1000000000 // (now - self.last_ns)
+
+        self.last_ns = now
+        self.last_bytes = demux.bytes_in
+
+        free = gc.mem_free()
+
+        if self.mem_free and free > self.mem_free:
+            self.auto_collects += 1
+
+        self.mem_free = free
+
+        if not self.min_free or free < self.min_free:
+            self.min_free = free
+
+    # TRUE ONCE GC_SECS HAVE PASSED SINCE THE LAST COLLECTION
+    def gc_due(self, now):
+        return self.gc_ns and now - self.gc_last_ns >= self.gc_ns
+
+    # TIMED GC.COLLECT()
+    def collect(self, now):
+        before = gc.mem_free()
+        start = time.monotonic_ns()
+        gc.collect()
+        pause = time.monotonic_ns() - start
+        after = gc.mem_free()
+
+        # BYTES ALLOCATED SINCE THE FREE HEAP LEFT BY THE LAST TIMED COLLECTION
+        if self.gc_last_ns and now > self.gc_last_ns:
+            self.alloc_per_sec = (self.gc_free - before) * 1000000000 // (now - self.gc_last_ns)
+
+        self.gc_runs += 1
+        self.gc_hist[hist_bin(pause)] += 1
+        self.gc_pause_ns = pause
+        self.gc_last_ns = now
+        self.gc_free = after
+        self.heap_used = gc.mem_alloc()
+        self.mem_free = after
+
+        if pause > self.gc_max_ns:
+            self.gc_max_ns = pause
+
+    # HIDDEN DEBUG PAGE, 21 CHARACTERS PER LINE. TASK TIMES ARE IN US
+    def debug_lines(self, names):
+        demux = self.demux
+        lines = ['TASK    P50  P99  MAX']
+
+        for task in self.tasks:
+            if task.name in names:
+                p50 = hist_percentile(task.hist, 50, task.max_run_ns)
+                p99 = hist_percentile(task.hist, 99, task.max_run_ns)
+                lines.append('{:6.6s}{:5d}{:5d}{:5d}'.format(task.name, min(p50, debug_max), min(p99, debug_max), min(task.max_run_ns // 1000, debug_max)))
+
+        lines.append('UART {:5d}B/S PK {:4d}'.format(min(self.bytes_per_sec, debug_max), min(demux.max_waiting, 9999)))
+        lines.append('OVRN {:5d} ERR {:6d}'.format(min(demux.overruns, debug_max), min(demux.nmea_errors + demux.ubx_errors, 999999)))
+        lines.append('HEAP{:7d} MIN{:6d}'.format(self.mem_free, self.min_free))
+        lines.append('GC {:5.1f}MS {:6d}B/S'.format(self.gc_pause_ns / 1000000, min(self.alloc_per_sec, 999999)))
+
+        return lines
+
+    # EVERYTHING, FOR THE USB SERIAL CONSOLE
+    def dump(self):
+        demux = self.demux
+        bounds = ''
+
+        for b in range(hist_bins - 1):
+            bounds += '{:>7s}'.format('<{}'.format((hist_base_ns << b) // 1000))
+
+        print('PROFILE {}{:>7s} {:>7s} {:>7s} {:>7s}  (US)'.format(bounds, 'MORE', 'P50', 'P99', 'MAX'))
+
+        for task in self.tasks:
+            print(self.hist_line(task.name, task.hist, task.max_run_ns))
+
+        print(self.hist_line('GC', self.gc_hist, self.gc_max_ns))
+        print('UART     {:6d} BYTES {:5d} B/S {:5d} PEAK WAITING OF {:5d} {:5d} OVERRUNS {:5d} FULL READS {:5d} ERRORS'.format(demux.bytes_in, self.bytes_per_sec, demux.max_waiting, demux.uart_size, demux.overruns, demux.full_reads, demux.nmea_errors + demux.ubx_errors))
+        print('HEAP     {:6d} FREE {:6d} MIN FREE {:6d} USED AFTER GC {:5d} AUTO GCS'.format(self.mem_free, self.min_free, self.heap_used, self.auto_collects))
+        print('GC       {:6d} RUNS {:6d}US LAST {:6d}US MAX {:6d} B/S ALLOCATED'.format(self.gc_runs, self.gc_pause_ns // 1000, self.gc_max_ns // 1000, self.alloc_per_sec))
+
+    def hist_line(self, name, hist, max_ns):
+        line = '{:8.8s}'.format(name)
+
+        for count in hist:
+            line += ' {:6d}'.format(count)
+
+        return line + ' {:7d} {:7d} {:7d}'.format(hist_percentile(hist, 50, max_ns), hist_percentile(hist, 99, max_ns), max_ns // 1000)
+
+    def report(self):
+        return 'PROFILE UART {:5d}B/S {:4d} PEAK {:3d} OVERRUNS  HEAP {:6d} FREE {:6d} MIN  GC {:5.1f}MS {:6d}B/S'.format(self.bytes_per_sec, self.demux.max_waiting, self.demux.overruns, self.mem_free, self.min_free, self.gc_pause_ns / 1000000, self.alloc_per_sec)
@@ -0,0 +1,187 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# BATCHED DISPLAY REFRESH
+#
+# AUTO REFRESH IS TURNED OFF AND EVERY LABEL CHANGE GOES THROUGH SET_TEXT(), WHICH ONLY RECORDS THAT THE SCREEN IS
+# DIRTY. COMMIT() THEN PUSHES ALL CHANGES MADE SINCE THE LAST FRAME WITH ONE DISP.REFRESH(), NO MORE OFTEN THAN THE
+# TARGET FRAME RATE. DISPLAYIO ONLY SENDS THE AREAS THAT CHANGED, SO ONE REFRESH PER TICK KEEPS SPI TRAFFIC LOW
+#
+# FRAMES AND DIRTY PIXELS PER SECOND ARE COUNTED, DIRTY PIXELS ARE ESTIMATED FROM THE CHARACTER CELLS CHANGED
+
+import displayio
+import time
+
+class render_stage:
+    def __init__(self, disp, fps, cell_width, cell_height):
+        self.disp = disp
+        self.frame_ns = 1000000000 // fps
+        self.cell_px = cell_width * cell_height
+
+        self.dirty = False
+        self.last_frame_ns = 0
+
+        # WHILE PAUSED CHANGES ARE KEPT BUT NOT SENT, SUCH AS WHILE THE PANEL IS BLANKED
+        self.paused = False
+
+        # COUNTS FOR THE CURRENT SECOND AND THE LAST COMPLETE SECOND
+        self.frames = 0
+        self.dirty_px = 0
+        self.second_ns = 0
+        self.frames_per_sec = 0
+        self.px_per_sec = 0
+
+        self.pending_px = 0
+
+    # TAKE OVER REFRESHING FROM DISPLAYIO
+    def start(self):
+        self.disp.auto_refresh = False
+        self.second_ns = time.monotonic_ns()
+
+    # HAND REFRESHING BACK TO DISPLAYIO, USED BEFORE HALTING
+    def stop(self):
+        self.disp.auto_refresh = True
+
+    # CHANGE A LABEL, NOTHING IS SENT UNTIL COMMIT()
+    # SETTING THE SAME TEXT AGAIN, SUCH AS THE GPS HEARTBEAT ON BACK TO BACK SENTENCES, IS IGNORED
+    def set_text(self, label, text):
+        old_text = label.text
+
+        if old_text == text:
+            return
+
+        old_len = len(old_text)
+        label.text = text
+        self.dirty = True
+        self.pending_px += (old_len if old_len > len(text) else len(text)) * self.cell_px
+
+    # SHOW A NUMBER IN A NUM_FIELD, NOTHING IS SENT UNTIL COMMIT()
+    def set_number(self, field, value):
+        cells = field.set(value)
+
+        if cells:
+            self.dirty = True
+            self.pending_px += cells * self.cell_px
+
+    # RECORD A CHANGE MADE DIRECTLY TO A DISPLAY OBJECT, SUCH AS THE BATTERY GAUGE
+    def mark(self, pixels):
+        self.dirty = True
+        self.pending_px += pixels
+
+    # PUSH ALL PENDING CHANGES IN ONE REFRESH IF THE FRAME RATE ALLOWS, RETURNS TRUE IF A FRAME WAS SENT
+    def commit(self):
+        now = time.monotonic_ns()
+
+        if now - self.second_ns >= 1000000000:
+            self.second_ns = now
+            self.frames_per_sec = self.frames
+            self.px_per_sec = self.dirty_px
+            self.frames = 0
+            self.dirty_px = 0
+
+        if self.paused or not self.dirty or now - self.last_frame_ns < self.frame_ns:
+            return False
+
+        self.disp.refresh()
+        self.last_frame_ns = now
+        self.dirty = False
+        self.frames += 1
+        self.dirty_px += self.pending_px
+        self.pending_px = 0
+
+        return True
+
+    def report(self):
+        return 'DISPLAY  {:3d} FRAMES/S {:6d} DIRTY PX/S'.format(self.frames_per_sec, self.px_per_sec)
+
+# RIGHT ALIGNED FIXED WIDTH NUMBER FIELD
+#
+# A ONE ROW TILEGRID OVER THE SAME FONT BITMAP BITMAP_LABEL USES, ONE TILE PER CHARACTER CELL
+# THE NUMBER IS SCALED TO A FIXED POINT INTEGER AND ITS DIGITS ARE WRITTEN STRAIGHT INTO THE CELLS, NO STRINGS ARE BUILT
+# ONLY CELLS WHOSE CHARACTER CHANGED ARE SET, SO DISPLAYIO ONLY REDRAWS THOSE CELLS
+# A NUMBER TOO WIDE FOR THE FIELD IS SHOWN AS ALL *
+#
+# POSITIONED LIKE BITMAP_LABEL, X IS THE LEFT EDGE AND Y IS THE VERTICAL CENTER OF THE TEXT
+class num_field(displayio.Group):
+    def __init__(self, font, width, decimals, color, x, y):
+        cell_width, cell_height = font.get_bounding_box()[:2]
+        super().__init__(x=x, y=y)
+
+        # TILE INDEX FOR 0-9, SPACE, MINUS, DOT AND STAR
+        self.tiles = [font.get_glyph(ord(c)).tile_index for c in '0123456789 -.*']
+
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = color
+        palette.make_transparent(0)
+
+        self.grid = displayio.TileGrid(font.bitmap, pixel_shader=palette, width=width, height=1, tile_width=cell_width, tile_height=cell_height, default_tile=self.tiles[10], y=-(cell_height // 2))
+        self.append(self.grid)
+
+        self.width = width
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self.cells = [self.tiles[10]] * width
+        self.value = None
+        self.changed = 0
+
+    # SET ONE CELL IF ITS CHARACTER CHANGED
+    def put(self, index, tile):
+        if self.cells[index] != tile:
+            self.cells[index] = tile
+            self.grid[index] = tile
+            self.changed += 1
+
+    # SHOW A NUMBER, RETURNS THE NUMBER OF CELLS CHANGED
+    def set(self, value):
+        if value >= 0:
+            scaled = int(value * self.scale + 0.5)
+        else:
+            scaled = int(value * self.scale - 0.5)
+
+        if scaled == self.value:
+            return 0
+
+        self.value = scaled
+        self.changed = 0
+        tiles = self.tiles
+        neg = scaled < 0
+        n = -scaled if neg else scaled
+        i = self.width - 1
+
+        # FRACTIONAL DIGITS, DECIMAL POINT, THEN AT LEAST ONE WHOLE DIGIT
+        for _ in range(self.decimals):
+            self.put(i, tiles[n % 10])
+            n //= 10
+            i -= 1
+
+        if self.decimals:
+            self.put(i, tiles[12])
+            i -= 1
+
+        while i >= 0:
+            self.put(i, tiles[n % 10])
+            n //= 10
+            i -= 1
+
+            if not n:
+                break
+
+        if neg:
+            if i < 0:
+                n = 1
+            else:
+                self.put(i, tiles[11])
+                i -= 1
+
+        if n:
+            for i in range(self.width):
+                self.put(i, tiles[13])
+
+            return self.changed
+
+        while i >= 0:
+            self.put(i, tiles[10])
+            i -= 1
+
+        return self.changed
@@ -0,0 +1,115 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# COOPERATIVE TASK SCHEDULER
+#
+# EACH TASK WRAPS A PLAIN FUNCTION THAT IS CALLED AT A FIXED RATE FROM ITS OWN ASYNCIO TASK
+# THE FUNCTION MAY RETURN THE NUMBER OF NANOSECONDS UNTIL IT SHOULD RUN AGAIN, OTHERWISE THE PERIOD IS USED
+# A RUN IS COUNTED AS AN OVERRUN IF IT STARTED MORE THAN ONE PERIOD LATE OR TOOK LONGER THAN ONE PERIOD
+#
+# TIME.MONOTONIC_NS() IS USED INSTEAD OF TIME.MONOTONIC() AS THE FLOAT VERSION LOSES RESOLUTION AFTER A FEW HOURS OF UPTIME
+#
+# RUN TIMES ARE ALSO COUNTED IN A FIXED SIZE HISTOGRAM WITH POWER OF TWO BINS: UNDER 125US, 250US, 500US ... 32MS, OVER
+# HIST_PERCENTILE() GIVES THE UPPER BOUND OF THE BIN A PERCENTILE FALLS IN
+
+import asyncio
+import time
+
+# HISTOGRAM BINS AND THE UPPER BOUND OF THE FIRST ONE
+hist_bins = 10
+hist_base_ns = 125000
+
+# HISTOGRAM BIN FOR A TIME IN NS
+def hist_bin(ns):
+    t = ns // hist_base_ns
+    b = 0
+
+    while t and b < hist_bins - 1:
+        t >>= 1
+        b += 1
+
+    return b
+
+# UPPER BOUND IN US OF THE BIN HOLDING PCT PERCENT OF THE COUNTS, THE LAST BIN IS OPEN SO MAX_NS IS USED FOR IT
+def hist_percentile(hist, pct, max_ns):
+    total = 0
+
+    for count in hist:
+        total += count
+
+    if not total:
+        return 0
+
+    target = (total * pct + 99) // 100
+    seen = 0
+
+    for b in range(hist_bins):
+        seen += hist[b]
+
+        if seen >= target:
+            break
+
+    if b == hist_bins - 1:
+        return max_ns // 1000
+
+    return (hist_base_ns << b) // 1000
+
+class sched_task:
+    def __init__(self, name, func, period):
+        self.name = name
+        self.func = func
+        self.period_ns = int(period * 1000000000)
+
+        self.runs = 0
+        self.run_ns = 0
+        self.overruns = 0
+        self.max_late_ns = 0
+        self.max_run_ns = 0
+        self.hist = [0] * hist_bins
+
+    async def run(self):
+        period_ns = self.period_ns
+        next_run = time.monotonic_ns()
+
+        while True:
+            start = time.monotonic_ns()
+            late = start - next_run
+            delay = self.func()
+            end = time.monotonic_ns()
+            run_time = end - start
+
+            self.runs += 1
+            self.run_ns += run_time
+            self.hist[hist_bin(run_time)] += 1
+
+            if late > self.max_late_ns:
+                self.max_late_ns = late
+
+            if run_time > self.max_run_ns:
+                self.max_run_ns = run_time
+
+            if late > period_ns or run_time > period_ns:
+                self.overruns += 1
+
+            if delay is None:
+                next_run += period_ns
+            else:
+                next_run = end + delay
+
+            # SKIP MISSED PERIODS INSTEAD OF RUNNING BACK TO BACK TO CATCH UP
+            if next_run < end:
+                next_run = end + period_ns
+
+            wait = next_run - time.monotonic_ns()
+
+            if wait < 0:
+                wait = 0
+
+            await asyncio.sleep(wait / 1000000000)
+
+    def report(self):
+        return '{:8s} RUNS {:7d} OVERRUNS {:5d} MAX LATE {:6d}us MAX RUN {:6d}us'.format(self.name, self.runs, self.overruns, self.max_late_ns // 1000, self.max_run_ns // 1000)
+
+# START ALL TASKS AND RUN THEM FOREVER
+async def sched_run(tasks):
+    await asyncio.gather(*[asyncio.create_task(task.run()) for task in tasks])
@@ -0,0 +1,179 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# PERSISTENT SETTINGS STORE
+#
+# SETTINGS ARE KEPT AS A FIXED LAYOUT STRUCT RECORD IN MICROCONTROLLER.NVM, SO THEY SURVIVE RELOADS AND REFLASHES OF
+# CODE.PY. THE VALUES IN CODE.PY ARE THE DEFAULTS, A FIELD FOUND IN THE STORE OVERRIDES ITS DEFAULT
+#
+# RECORD: MAGIC, HEADER VERSION, RECORD LENGTH, SEQUENCE NUMBER, MASK OF FIELDS PRESENT, FIELDS, CRC32 OF EVERYTHING
+# BEFORE IT. THE CRC IS AT THE RECORD LENGTH, SO A RECORD WRITTEN BEFORE FIELDS WERE ADDED STILL LOADS: FIELDS PAST ITS
+# END ARE TREATED AS NOT IN THE MASK AND KEEP THEIR DEFAULTS. A LONGER RECORD FROM A NEWER LAYOUT LOADS THE SAME WAY,
+# ITS EXTRA FIELDS ARE IGNORED (AND DROPPED BY THE NEXT SAVE). ONLY A HEADER CHANGE NEEDS A NEW VERSION, WHICH MAKES
+# THE STORED RECORDS UNREADABLE SO THE CODE.PY DEFAULTS APPLY UNTIL THE NEXT SAVE
+# THERE ARE TWO RECORD SLOTS, A SAVE WRITES THE SLOT NOT HOLDING THE NEWEST RECORD WITH THE NEXT SEQUENCE NUMBER, AND
+# LOAD USES THE VALID RECORD WITH THE HIGHEST SEQUENCE NUMBER
+#
+# WEAR AND POWER LOSS: ON THE RP2040 NVM IS ONE 4KB FLASH SECTOR, AND EVERY WRITE TO IT (A SAVE HERE, OR AN ASSIST.PY
+# SAVE, WHICH SHARES THE SECTOR) ERASES AND REPROGRAMS THE WHOLE SECTOR, BOTH SLOTS INCLUDED. SO EACH SAVE COSTS ONE
+# ERASE CYCLE OF THE SECTOR (THE FLASH IS RATED FOR ABOUT 100,000), AND THE SLOTS DO NOT PROTECT AGAINST A RESET OR
+# FLAT BATTERY DURING A SAVE: CUT SHORT IN THE ERASE IT CAN LOSE BOTH. THE CRC ONLY MAKES SURE A DAMAGED RECORD IS
+# NEVER USED, LOAD THEN FINDS NOTHING AND THE CODE.PY DEFAULTS APPLY. SAVES ARE THEREFORE ONLY MADE ON A USER CHANGE OR
+# A NEW CALIBRATION, NEVER PERIODICALLY
+#
+# CALIBRATION.PY SAVES ONLY THE CALIBRATION FIELDS, FIELDS NOT IN THE MASK KEEP THEIR CODE.PY DEFAULTS
+
+import struct
+
+from binascii import crc32
+
+settings_magic = b'GS'
+settings_version = 2
+
+# NVM LAYOUT, SLOT SIZE IS FIXED SO THE RECORD CAN GROW INTO IT AS FIELDS ARE ADDED
+settings_base = 0
+settings_slot_size = 128
+settings_slots = 2
+settings_end = settings_base + settings_slot_size * settings_slots
+
+# FIELD NAME, STRUCT TYPE AND COUNT, IN RECORD ORDER. NEW FIELDS ARE ONLY EVER ADDED AT THE END, NEVER REMOVED OR
+# RESIZED, AND THE RECORD PLUS ITS CRC MUST STILL FIT IN THE SLOT
+# TYPE ? IS A BOOLEAN STORED AS A BYTE, TYPE S IS A STRING STORED AS 4 BYTES
+settings_fields = (
+    ('dst_start', 'B', 4),
+    ('dst_end', 'B', 4),
+    ('dst_offset', 'i', 1),
+    ('timezone_offset', 'f', 1),
+    ('timezone_desc', 'S', 2),
+    ('declination', 'f', 1),
+    ('offset_x_axis', 'f', 1),
+    ('offset_y_axis', 'f', 1),
+    ('soft_iron', 'f', 4),
+    ('flip_x_axis', '?', 1),
+    ('flip_y_axis', '?', 1),
+    ('swap_axis', '?', 1),
+    ('clock_color', 'I', 1),
+    ('compass_color', 'I', 1),
+    ('date_color', 'I', 1),
+    ('gps_color', 'I', 1),
+    ('grid_color', 'I', 1),
+    ('location_color', 'I', 1),
+    ('sat_color', 'I', 1),
+    ('bat_curve', 'H', 11),
+    ('bat_cutoff', 'H', 1),
+)
+
+settings_header = '<2sBBHI'
+settings_header_len = struct.calcsize(settings_header)
+settings_field_format = tuple('<' + ('4s' if kind == 'S' else 'B' if kind == '?' else kind) * count for _, kind, count in settings_fields)
+settings_format = '<' + ''.join(fmt[1:] for fmt in settings_field_format)
+settings_len = settings_header_len + struct.calcsize(settings_format)
+
+# RECORD LENGTH NEEDED TO HOLD EACH FIELD, IN FIELD ORDER
+settings_field_end = []
+end = settings_header_len
+
+for fmt in settings_field_format:
+    end += struct.calcsize(fmt)
+    settings_field_end.append(end)
+
+class settings:
+    def __init__(self):
+        self.values = {}
+        self.seq = 0
+        self.slot = -1
+
+    def get(self, name, default):
+        return self.values.get(name, default)
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    # READ BOTH SLOTS AND KEEP THE NEWEST VALID RECORD, RETURNS FALSE IF THERE IS NONE
+    def load(self, nvm):
+        found = False
+        data = nvm[settings_base:settings_end]
+
+        for slot in range(settings_slots):
+            start = slot * settings_slot_size
+            record = data[start:start + settings_slot_size]
+            magic, version, length, seq, mask = struct.unpack_from(settings_header, record)
+
+            if magic != settings_magic or version != settings_version:
+                continue
+
+            if length < settings_header_len or length + 4 > settings_slot_size:
+                continue
+
+            if struct.unpack_from('<I', record, length)[0] != crc32(record[:length]):
+                continue
+
+            # SEQUENCE NUMBERS WRAP, THE NEWER ONE IS LESS THAN HALF THE RANGE AHEAD
+            if found and (seq - self.seq) & 0xFFFF >= 0x8000:
+                continue
+
+            found = True
+            self.seq = seq
+            self.slot = slot
+            self.unpack(record, length, mask)
+
+        return found
+
+    # FIELDS THAT DO NOT FIT IN THE RECORD LENGTH WERE ADDED AFTER IT WAS WRITTEN AND ARE LEFT OUT
+    def unpack(self, record, length, mask):
+        self.values = {}
+        pos = settings_header_len
+
+        for bit, (name, kind, count) in enumerate(settings_fields):
+            end = settings_field_end[bit]
+
+            if end > length:
+                break
+
+            if mask & (1 << bit):
+                values = struct.unpack_from(settings_field_format[bit], record, pos)
+
+                if kind == 'S':
+                    value = tuple(v.rstrip(b'\x00').decode() for v in values)
+                elif kind == '?':
+                    value = bool(values[0])
+                elif count == 1:
+                    value = values[0]
+                else:
+                    value = values
+
+                self.values[name] = value
+
+            pos = end
+
+    # WRITE ALL FIELDS SET INTO THE OTHER SLOT
+    def save(self, nvm):
+        values = []
+        mask = 0
+
+        for bit, (name, kind, count) in enumerate(settings_fields):
+            value = self.values.get(name)
+
+            if value is None:
+                values.extend([b'' if kind == 'S' else 0] * count)
+                continue
+
+            mask |= 1 << bit
+
+            if kind == 'S':
+                values.extend(v.encode() for v in value)
+            elif count == 1:
+                values.append(int(value) if kind == '?' else value)
+            else:
+                values.extend(value)
+
+        seq = (self.seq + 1) & 0xFFFF
+        slot = 0 if self.slot == 1 else 1
+        record = struct.pack(settings_header, settings_magic, settings_version, settings_len, seq, mask) + struct.pack(settings_format, *values)
+        record += struct.pack('<I', crc32(record))
+
+        start = settings_base + slot * settings_slot_size
+        nvm[start:start + len(record)] = record
+
+        self.seq = seq
+        self.slot = slot
@@ -0,0 +1,293 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# SATELLITE VIEW PAGE
+#
+# THE DASHBOARD ONLY NEEDS RMC AND GGA (OR NAV-PVT), SO GSV IS SWITCHED OFF AT BOOT TO SAVE UART BANDWIDTH. THIS PAGE
+# SHOWS EACH SATELLITE IN VIEW AS A SIGNAL STRENGTH (C/N0) BAR AND AS A DOT ON A SKY PLOT (NORTH UP, HORIZON ON THE
+# OUTER RING, 45 DEGREES ON THE INNER ONE). WHILE IT IS SHOWN THE RECEIVER IS ASKED FOR GSV (NMEA) OR NAV-SAT (UBX
+# MODE) ONCE EVERY RATE EPOCHS WITH CFG-MSG, AND WHEN IT IS CLOSED THE MESSAGE IS SWITCHED OFF AGAIN
+#
+# SKY_SATS DECODES BOTH. GSV COMES AS SEVERAL SENTENCES PER CONSTELLATION, THE SET BEING COLLECTED IS SWAPPED WITH THE
+# SHOWN ONE AT THE FIRST OTHER SENTENCE AFTER THEM. NAV-SAT CARRIES A WHOLE SET AND SAYS WHICH SATELLITES ARE USED
+#
+# THE PAGE IS BUILT ONCE AT BOOT AND SWAPPED IN WITH DISP.SHOW(), ONLY THE BITMAPS ARE REDRAWN WHEN A NEW SET ARRIVES
+
+import bitmaptools
+import displayio
+import math
+import struct
+
+from adafruit_display_text import bitmap_label
+
+from ubx import cfg_msg_type, cfg_msg_uart1, nav_class
+
+# MESSAGE CLASS / IDS
+cls_gsv = bytes([0xF0, 0x03])
+cls_nav_sat = bytes([nav_class, 0x35])
+
+# NAV-SAT, 8 BYTE HEADER THEN PER SATELLITE: GNSS ID, SV ID, C/N0, ELEVATION, AZIMUTH, PSEUDORANGE RESIDUAL, FLAGS
+nav_sat_header_len = 8
+nav_sat_sv_len = 12
+nav_sat_sv_format = '<BBBbhhI'
+nav_sat_used = 0x08
+
+# MOST SATELLITES KEPT, THE DEMUX UBX PAYLOAD BUFFER MUST HOLD A NAV-SAT WITH THIS MANY
+sky_max_sats = 40
+nav_sat_max_len = nav_sat_header_len + nav_sat_sv_len * sky_max_sats
+
+# BAR GRAPH, ONE 3 PIXEL BAR PER SATELLITE, FULL HEIGHT AT CNO_FULL DBHZ
+bar_y = 12
+bar_height = 40
+bar_pitch = 4
+cno_full = 50
+
+# SKY PLOT, HORIZON RING RADIUS IN PIXELS
+plot_size = 72
+plot_radius = 33
+
+# PALETTE: CLEAR, GRID / NOT TRACKED, THEN WEAK, FAIR AND STRONG SIGNALS
+sky_colors = (0x000000, 0x505050, 0xFF0000, 0xFFFF00, 0x00FF00)
+sky_weak = 20
+sky_strong = 30
+
+# CFG-MSG PAYLOAD, THE MESSAGE ONCE EVERY RATE EPOCHS ON UART1 (0 = OFF)
+def ubx_cfg_msg_rate(msg_class_id, rate):
+    rates = bytearray(6)
+    rates[cfg_msg_uart1] = rate
+    return bytes(msg_class_id) + rates
+
+# PALETTE INDEX FOR A C/N0
+def sky_color(cno):
+    if not cno:
+        return 1
+
+    if cno < sky_weak:
+        return 2
+
+    if cno < sky_strong:
+        return 3
+
+    return 4
+
+# INTEGER VALUE OF AN NMEA FIELD, -1 IF EMPTY
+def nmea_field_int(line, line_len, commas, field_count, index):
+    start = commas[index - 1] + 1
+    end = commas[index] if index < field_count else line_len
+
+    if start >= end:
+        return -1
+
+    value = 0
+
+    for i in range(start, end):
+        value = value * 10 + line[i] - 0x30
+
+    return value
+
+# ONE SET OF SATELLITES, ELEVATION -1 WHEN NOT KNOWN
+class sky_set:
+    def __init__(self, size):
+        self.elev = [0] * size
+        self.azim = [0] * size
+        self.cno = bytearray(size)
+        self.used = bytearray(size)
+        self.count = 0
+        self.used_count = 0
+
+class sky_sats:
+    def __init__(self, size=sky_max_sats):
+        self.shown = sky_set(size)
+        self.next = sky_set(size)
+        self.collecting = False
+
+        # SETS COMPLETED, THE PAGE REDRAWS WHEN IT CHANGES
+        self.updates = 0
+
+        # FALSE FOR GSV, WHICH DOES NOT SAY WHICH SATELLITES ARE USED
+        self.has_used = False
+
+    def publish(self):
+        self.shown, self.next = self.next, self.shown
+        self.collecting = False
+        self.updates += 1
+
+    def decode_nmea(self, line, line_len, commas, field_count):
+        if line_len < 5 or line[2] != 0x47 or line[3] != 0x53 or line[4] != 0x56:
+            if self.collecting:
+                self.publish()
+
+            return False
+
+        sats = self.next
+
+        if not self.collecting:
+            self.collecting = True
+            sats.count = 0
+            sats.used_count = 0
+            self.has_used = False
+
+        # GROUPS OF PRN, ELEVATION, AZIMUTH, SNR FROM FIELD 4, A SIGNAL ID MAY FOLLOW THE LAST ONE
+        field = 4
+
+        while field + 3 <= field_count and sats.count < len(sats.cno):
+            i = sats.count
+            sats.elev[i] = nmea_field_int(line, line_len, commas, field_count, field + 1)
+            sats.azim[i] = nmea_field_int(line, line_len, commas, field_count, field + 2)
+            sats.cno[i] = max(nmea_field_int(line, line_len, commas, field_count, field + 3), 0)
+            sats.used[i] = 0
+            sats.count += 1
+            field += 4
+
+        return False
+
+    def decode_ubx(self, msg_class, msg_id, payload, length):
+        if msg_class != cls_nav_sat[0] or msg_id != cls_nav_sat[1] or length < nav_sat_header_len:
+            return False
+
+        sats = self.next
+        count = min(payload[5], len(sats.cno), (length - nav_sat_header_len) // nav_sat_sv_len)
+        sats.used_count = 0
+
+        for i in range(count):
+            gnss, sv, cno, elev, azim, res, flags = struct.unpack_from(nav_sat_sv_format, payload, nav_sat_header_len + i * nav_sat_sv_len)
+            sats.elev[i] = elev if azim >= 0 else -1
+            sats.azim[i] = azim
+            sats.cno[i] = cno
+            sats.used[i] = 1 if flags & nav_sat_used else 0
+            sats.used_count += sats.used[i]
+
+        sats.count = count
+        self.has_used = True
+        self.publish()
+
+        return False
+
+class sky_page:
+    def __init__(self, sats, config, msg_class_id, font, color, char_start):
+        self.sats = sats
+        self.config = config
+        self.msg_class_id = msg_class_id
+
+        # RATE ASKED FOR WHILE SHOWN, RATE THE RECEIVER IS SET TO, AND RATE BEING SENT (-1 = NOTHING OUTSTANDING)
+        self.rate = 0
+        self.rate_on = 0
+        self.sending = -1
+        self.visible = False
+        self.failed = False
+        self.drawn = 0
+
+        palette = displayio.Palette(len(sky_colors))
+
+        for i, value in enumerate(sky_colors):
+            palette[i] = value
+
+        palette.make_transparent(0)
+
+        self.title = bitmap_label.Label(font, text='WAITING FOR SATS', color=color, x=0, y=char_start)
+        self.bars = displayio.Bitmap(128, bar_height, len(sky_colors))
+        self.dots = displayio.Bitmap(plot_size, plot_size, len(sky_colors))
+        plot_x = (128 - plot_size) // 2
+        plot_y = 128 - plot_size
+
+        # RINGS AT THE HORIZON AND 45 DEGREES, DRAWN ONCE
+        grid = displayio.Bitmap(plot_size, plot_size, 2)
+        center = plot_size // 2
+
+        for radius in (plot_radius, plot_radius // 2):
+            steps = radius * 7
+
+            for step in range(steps):
+                angle = step * 2 * math.pi / steps
+                grid[center + int(radius * math.sin(angle)), center - int(radius * math.cos(angle))] = 1
+
+        grid[center, center] = 1
+
+        self.group = displayio.Group()
+        self.group.append(self.title)
+        self.group.append(bitmap_label.Label(font, text='N', color=color, x=plot_x - 8, y=plot_y + char_start))
+        self.group.append(displayio.TileGrid(self.bars, pixel_shader=palette, x=0, y=bar_y))
+        self.group.append(displayio.TileGrid(grid, pixel_shader=palette, x=plot_x, y=plot_y))
+        self.group.append(displayio.TileGrid(self.dots, pixel_shader=palette, x=plot_x, y=plot_y))
+
+    # CALLED WHEN THE PAGE IS SHOWN OR CLOSED, RATE IS IN EPOCHS. THE MESSAGE IS SWITCHED BY TICK()
+    def show(self, visible, rate):
+        self.visible = visible
+        self.rate = rate
+        self.drawn = -1
+
+    # RUN ONCE A SECOND: SWITCH THE MESSAGE ON OR OFF TO MATCH THE PAGE, ONE COMMAND AT A TIME AND ONLY WHILE THE
+    # CONFIGURATION ENGINE IS FREE, THEN REDRAW IF A NEW SET HAS ARRIVED. A FAILED COMMAND LEAVES THE MESSAGE OFF
+    def tick(self, render):
+        config = self.config
+
+        if self.sending >= 0:
+            if config.poll():
+                return
+
+            if config.finish():
+                print('SKY {} COMMAND FAILED, SATELLITE VIEW DISABLED'.format('ON' if self.sending else 'OFF'))
+                self.failed = True
+                self.rate_on = 0
+            else:
+                self.rate_on = self.sending
+
+            config.demux.remove_ubx(config)
+            self.sending = -1
+        else:
+            rate = self.rate if self.visible and not self.failed else 0
+
+            if rate != self.rate_on and not config.cmds:
+                config.demux.add_ubx(config)
+                config.add('SKY', cfg_msg_type, ubx_cfg_msg_rate(self.msg_class_id, rate))
+                config.start()
+                self.sending = rate
+
+        if self.visible and self.drawn != self.sats.updates:
+            self.draw(render)
+
+    def draw(self, render):
+        sats = self.sats
+        shown = sats.shown
+        bars = self.bars
+        dots = self.dots
+        center = plot_size // 2
+        bar_max = 128 // bar_pitch
+
+        self.drawn = sats.updates
+        bars.fill(0)
+        dots.fill(0)
+
+        for i in range(shown.count):
+            cno = shown.cno[i]
+            color = sky_color(cno)
+
+            if i < bar_max:
+                height = min(cno, cno_full) * bar_height // cno_full
+
+                if height:
+                    bitmaptools.fill_region(bars, i * bar_pitch, bar_height - height, i * bar_pitch + bar_pitch - 1, bar_height, color)
+
+            elev = shown.elev[i]
+
+            if 0 <= elev <= 90:
+                radius = plot_radius * (90 - elev) // 90
+                angle = math.radians(shown.azim[i])
+                x = center + int(radius * math.sin(angle))
+                y = center - int(radius * math.cos(angle))
+                size = 2 if shown.used[i] else 1
+                bitmaptools.fill_region(dots, x - size, y - size, x + size + 1, y + size + 1, color)
+
+        if not sats.updates:
+            text = 'WAITING FOR SATS'
+        elif sats.has_used:
+            text = 'IN VIEW {:2d} USED {:2d}'.format(shown.count, shown.used_count)
+        else:
+            text = 'IN VIEW {:2d}'.format(shown.count)
+
+        render.set_text(self.title, text)
+        render.mark(128 * bar_height + plot_size * plot_size)
+
+    def report(self):
+        shown = self.sats.shown
+        return 'SKY    {:6s} RATE {:2d} {:5d} SETS {:2d} IN VIEW {:2d} USED{}'.format('SHOWN' if self.visible else 'HIDDEN', self.rate_on, self.sats.updates, shown.count, shown.used_count, ' FAILED' if self.failed else '')
@@ -0,0 +1,191 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# USB SERIAL TELEMETRY
+#
+# STREAMS THE FIX, THE GPS DISCIPLINED TIME AND THE MAIDENHEAD LOCATOR TO A COMPUTER ON THE SECOND (DATA) USB SERIAL
+# PORT, WHICH BOOT.PY ENABLES NEXT TO THE CONSOLE, FOR LOGGING AND DIGITAL MODE SOFTWARE. TWO RECORD FORMATS:
+#
+# BINARY: ONE FIXED SIZE FRAME PER RECORD, LITTLE ENDIAN
+#   SYNC 0xA5 0x5A, VERSION, SEQUENCE NUMBER, FLAGS (1 = POSITION VALID, 2 = TIME VALID), UTC SECONDS SINCE 1970,
+#   LAT / LON IN 1E-7 DEGREES, ALTITUDE IN METERS, SPEED IN 0.1 KNOTS, TRACK IN 0.1 DEGREES, SATELLITES, LOCATOR
+#   (10 ASCII CHARACTERS, NUL PADDED), THEN A UBX STYLE FLETCHER CHECKSUM OVER EVERYTHING AFTER THE SYNC
+#   THE SEQUENCE NUMBER LETS THE HOST COUNT RECORDS THAT WERE DROPPED
+# NMEA: RMC AND GGA SENTENCES REBUILT FROM THE FIX, WHICH MOST LOGGING AND TIME SETTING PROGRAMS ALREADY READ, AND
+#   $PGRID,LOCATOR,HHMMSS WITH THE LOCATOR SHOWN ON THE DASHBOARD
+#
+# RECORDS ARE QUEUED IN A FIXED SIZE RING AND DRAIN() WRITES WHAT THE USB PORT WILL TAKE WITHOUT WAITING
+# (WRITE_TIMEOUT = 0). A RECORD THAT DOES NOT FIT IN THE RING IS DROPPED WHOLE, AND WHILE NO PROGRAM HAS THE PORT OPEN
+# THE RING IS EMPTIED, SO A HOST THAT IS SLOW OR NOT READING NEVER HOLDS UP THE OTHER TASKS
+
+import struct
+import time
+
+from ubx import ubx_checksum
+
+# RECORD FORMATS
+telem_binary = 'BINARY'
+telem_nmea = 'NMEA'
+
+# BINARY FRAME
+telem_sync = b'\xa5\x5a'
+telem_version = 1
+telem_format = '<2sBHBIiihHHB10s'
+telem_body_len = struct.calcsize(telem_format)
+telem_frame_len = telem_body_len + 2
+
+# FLAGS
+telem_pos_valid = 0x01
+telem_time_valid = 0x02
+
+# ADD $, CHECKSUM AND CR/LF TO AN NMEA SENTENCE BODY
+def telem_sentence(body):
+    checksum = 0
+
+    for c in body:
+        checksum ^= ord(c)
+
+    return '${}*{:02X}\r\n'.format(body, checksum)
+
+# DEGREES AS DDMM.MMMMM / DDDMM.MMMMM AND THE HEMISPHERE
+# THE MINUTES ARE ROUNDED TO THE 5 DECIMALS SENT FIRST, SO 59.999996 CARRIES INTO THE DEGREES INSTEAD OF PRINTING AS 60
+def telem_degrees(value, width, pos_char, neg_char):
+    hemi = pos_char if value >= 0 else neg_char
+    value = abs(value)
+    degrees = int(value)
+    minutes = round((value - degrees) * 60, 5)
+
+    if minutes >= 60:
+        degrees += 1
+        minutes -= 60
+
+    return '{:0{}d}{:08.5f},{}'.format(degrees, width, minutes, hemi)
+
+class telemetry:
+    def __init__(self, port, mode, size=1024):
+        self.port = port
+        self.mode = mode
+
+        if port is not None:
+            port.write_timeout = 0
+
+        # RING OF QUEUED BYTES, HEAD IS WRITTEN BY PUT() AND TAIL READ BY DRAIN()
+        self.ring = bytearray(size)
+        self.ring_mv = memoryview(self.ring)
+        self.size = size
+        self.head = 0
+        self.tail = 0
+        self.used = 0
+
+        self.frame = bytearray(telem_frame_len)
+        self.seq = 0
+
+        # STATISTICS
+        self.records = 0
+        self.dropped = 0
+        self.discarded = 0
+        self.bytes_out = 0
+        self.peak = 0
+
+    # QUEUE A RECORD, DROPPED WHOLE IF IT DOES NOT FIT
+    def put(self, data):
+        count = len(data)
+
+        if count > self.size - self.used:
+            self.dropped += 1
+            return False
+
+        head = self.head
+        first = self.size - head
+
+        if count <= first:
+            self.ring[head:head + count] = data
+        else:
+            self.ring[head:] = data[:first]
+            self.ring[:count - first] = data[first:]
+
+        self.head = (head + count) % self.size
+        self.used += count
+        self.records += 1
+
+        if self.used > self.peak:
+            self.peak = self.used
+
+        return True
+
+    # WRITE AS MUCH AS THE PORT TAKES WITHOUT WAITING, EMPTY THE RING IF NO PROGRAM HAS THE PORT OPEN
+    def drain(self):
+        port = self.port
+
+        if not self.used or port is None:
+            return
+
+        if not port.connected:
+            self.discarded += self.used
+            self.head = 0
+            self.tail = 0
+            self.used = 0
+            return
+
+        tail = self.tail
+        end = tail + self.used
+
+        if end > self.size:
+            end = self.size
+
+        count = port.write(self.ring_mv[tail:end]) or 0
+        self.tail = (tail + count) % self.size
+        self.used -= count
+        self.bytes_out += count
+
+    # QUEUE ONE RECORD IN THE CONFIGURED FORMAT. LAT / LON ARE NONE UNTIL THE FIRST FIX
+    def send(self, secs, time_valid, lat, lon, alt, speed_knots, track, sats, grid):
+        if self.mode == telem_binary:
+            self.put(self.binary(secs, time_valid, lat, lon, alt, speed_knots, track, sats, grid))
+        else:
+            self.put(self.nmea(secs, time_valid, lat, lon, alt, speed_knots, track, sats, grid))
+
+    # BINARY FRAME, BUILT IN PLACE
+    def binary(self, secs, time_valid, lat, lon, alt, speed_knots, track, sats, grid):
+        flags = telem_time_valid if time_valid else 0
+
+        if lat is not None and lon is not None:
+            flags |= telem_pos_valid
+        else:
+            lat = 0
+            lon = 0
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        frame = self.frame
+        struct.pack_into(telem_format, frame, 0, telem_sync, telem_version, self.seq, flags, secs, int(lat * 10000000), int(lon * 10000000), alt, int(speed_knots * 10), int(track * 10), sats, grid.encode())
+        checksum = ubx_checksum(frame, 2, telem_body_len)
+        frame[telem_body_len] = checksum & 0xFF
+        frame[telem_body_len + 1] = checksum >> 8
+
+        return frame
+
+    # RMC + GGA + PGRID. RMC IS MARKED VOID AND GGA HAS FIX QUALITY 0 WITHOUT A POSITION
+    def nmea(self, secs, time_valid, lat, lon, alt, speed_knots, track, sats, grid):
+        utc = time.localtime(secs)
+        hhmmss = '{:02d}{:02d}{:02d}'.format(utc.tm_hour, utc.tm_min, utc.tm_sec) if time_valid else ''
+        date = '{:02d}{:02d}{:02d}'.format(utc.tm_mday, utc.tm_mon, utc.tm_year % 100) if time_valid else ''
+
+        if lat is not None and lon is not None:
+            position = telem_degrees(lat, 2, 'N', 'S') + ',' + telem_degrees(lon, 3, 'E', 'W')
+            status = 'A'
+            mode = 'A'
+            quality = 1
+        else:
+            position = ',,,'
+            status = 'V'
+            mode = 'N'
+            quality = 0
+
+        text = telem_sentence('GPRMC,{},{},{},{:.1f},{:.1f},{},,,{}'.format(hhmmss, status, position, speed_knots, track, date, mode))
+        text += telem_sentence('GPGGA,{},{},{},{:02d},,{},M,,M,,'.format(hhmmss, position, quality, sats, alt))
+        text += telem_sentence('PGRID,{},{}'.format(grid, hhmmss))
+
+        return text.encode()
+
+    def report(self):
+        return 'TELEM  {:6s} {:6d} RECORDS {:5d} DROPPED {:8d} BYTES OUT {:8d} DISCARDED {:4d} PEAK'.format(self.mode, self.records, self.dropped, self.bytes_out, self.discarded, self.peak)
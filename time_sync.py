@@ -0,0 +1,220 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# SUB SECOND TIME DISCIPLINE
+#
+# THE RTC ONLY COUNTS WHOLE SECONDS AND TIME.TIME() FOLLOWS THE LAST DECODED GPS TIME, SO THE DISPLAYED SECOND USED
+# TO CHANGE WHEN THE RMC / NAV-PVT MESSAGE FINISHED DECODING, THE LENGTH OF THE MESSAGE ON THE WIRE PLUS THE GPS TASK
+# POLL DELAY AFTER THE TRUE SECOND. THE RECEIVER STARTS SENDING EACH WHOLE SECOND EPOCH A CONSTANT TIME AFTER THE
+# SECOND, AND GPS_DEMUX WORKS OUT WHEN ON THE MONOTONIC CLOCK EACH MESSAGE STARTED, SO EVERY EPOCH GIVES A PAIR
+# (UTC SECOND, MONOTONIC NS). A LEAST SQUARES LINE THROUGH THE LAST WINDOW PAIRS GIVES:
+# - THE PHASE, WHEN THE MESSAGE FOR ANY SECOND STARTS ON THE MONOTONIC CLOCK
+# - THE DRIFT, THE RP2040 CRYSTAL'S ERROR AGAINST GPS TIME, AS THE SLOPE
+# THE TRUE SECOND IS THE MESSAGE START LESS OFFSET_MS, THE RECEIVER'S OWN OUTPUT DELAY. THE SERIAL STREAM ALONE CAN NOT
+# TELL IT APART FROM THE PHASE, SO IT IS SET FROM A MEASUREMENT AGAINST A REFERENCE (PPS LED, WWV TICKS)
+#
+# ONLY WHOLE SECOND EPOCHS ARE USED, SO HIGH RATE MODE WORKS THE SAME. WHEN THE GPS TASK READS AFTER THE LINE HAS GONE
+# QUIET THE START IS WORKED BACK FROM THE READ TIME AND COMES OUT LATE BY THE QUIET TIME, SO ONLY MESSAGES THAT WERE
+# STILL ARRIVING AT A READ ARE USED, THE OTHERS ARE COUNTED AS QUIET. A MESSAGE IS NEVER SEEN EARLY, ONLY UP TO A BYTE
+# TIME LATE, SO THE SLOPE IS THE LEAST SQUARES ONE (KEPT WITHIN MAX_PPM OF A CRYSTAL'S ERROR) BUT THE LINE IS MOVED
+# DOWN ONTO THE EARLIEST SAMPLES. A SAMPLE LATER THAN THE LINE BY MORE THAN REJECT_MS (A READ HELD UP BETWEEN
+# IN_WAITING AND READINTO) IS LEFT OUT, AND ONE EARLIER BY MORE THAN THAT MEANS THE LINE IS WRONG (THE RECEIVER'S TIME
+# JUMPED) AND IT IS STARTED AGAIN FROM THAT ONE. A WHOLE WINDOW OF SAMPLES LEFT OUT IN A ROW ALSO STARTS IT AGAIN
+#
+# THE RESIDUALS OF THE WINDOW AGAINST THE LINE, THE DRIFT AND THE MEASURED LATENCY (MESSAGE START TO DECODE, WHAT THE
+# OLD CLOCK WAS LATE BY) ARE IN REPORT(), SO ACCURACY CAN BE CHECKED ON RECORDED STREAMS WITH TOOLS/REPLAY.PY
+#
+# TIMES ARE INTEGER NS, DIFFERENCES ARE TAKEN FROM THE NEWEST SAMPLE SO THE SUMS STAY SMALL. ONE FIT PER SECOND
+
+import time
+
+# MESSAGE CLASS / ID OF NAV-PVT
+nav_class = 0x01
+nav_pvt_id = 0x07
+
+# LONGEST NAV-PVT TIME FRACTION ACCEPTED AS A WHOLE SECOND
+whole_second_ns = 1000000
+
+class time_sync:
+    def __init__(self, demux, gps, offset_ms=0, window=32, min_samples=8, reject_ms=5, max_ppm=200):
+        self.demux = demux
+        self.gps = gps
+        self.offset_ns = int(offset_ms * 1000000)
+        self.window = window
+        self.min_samples = min_samples
+        self.reject_ns = int(reject_ms * 1000000)
+        self.max_drift = int(max_ppm * 1000)
+
+        # RING OF (UTC SECONDS, MESSAGE START NS) PAIRS
+        self.secs = [0] * window
+        self.starts = [0] * window
+        self.index = 0
+        self.count = 0
+        self.misses = 0
+
+        # LINE, THE MESSAGE FOR UTC SECOND BASE_SECS + N STARTS AT BASE_NS + N * PERIOD_NS
+        self.locked = False
+        self.base_secs = 0
+        self.base_ns = 0
+        self.period_ns = 1000000000
+
+        # STATISTICS
+        self.samples = 0
+        self.quiet = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.resid_ns = 0
+        self.rms_ns = 0
+        self.max_ns = 0
+        self.latency_ns = 0
+
+    # NMEA SINK, REGISTERED AFTER THE GPS DECODER SO THE TIME FIELDS ARE ALREADY DECODED
+    def decode_nmea(self, line, line_len, commas, field_count):
+        if line_len < 5 or line[2] != 0x52 or line[3] != 0x4D or line[4] != 0x43 or field_count < 2:
+            return False
+
+        # HHMMSS WITH NO FRACTION OR AN ALL ZERO ONE
+        start = commas[0] + 1
+        end = commas[1]
+
+        if end - start < 6:
+            return False
+
+        for i in range(start + 7, end):
+            if line[i] != 0x30:
+                return False
+
+        self.add_gps()
+
+        return False
+
+    # UBX SINK
+    def decode_ubx(self, msg_class, msg_id, payload, length):
+        if msg_class == nav_class and msg_id == nav_pvt_id and -whole_second_ns < self.gps.nano < whole_second_ns:
+            self.add_gps()
+
+        return False
+
+    def add_gps(self):
+        gps = self.gps
+
+        if not gps.time_valid or gps.year < 2000:
+            return
+
+        demux = self.demux
+        self.latency_ns = demux.read_ns - demux.msg_ns
+
+        if demux.msg_read == demux.reads:
+            self.quiet += 1
+            return
+
+        self.add(time.mktime(gps.timestamp_utc), demux.msg_ns)
+
+    # MONOTONIC NS THE MESSAGE FOR UTC SECOND SECS STARTS, BY THE LINE
+    def predict(self, secs):
+        return self.base_ns + (secs - self.base_secs) * self.period_ns
+
+    def add(self, secs, start_ns):
+        # SAME SECOND AGAIN OR TIME WENT BACKWARDS
+        if self.count and secs <= self.secs[(self.index - 1) % self.window]:
+            return
+
+        self.samples += 1
+
+        if self.count:
+            resid = start_ns - self.predict(secs)
+            self.resid_ns = resid
+
+            if resid > self.reject_ns:
+                self.rejected += 1
+                self.misses += 1
+
+                if self.misses >= self.window:
+                    self.restart()
+
+                return
+
+            if resid < -self.reject_ns:
+                self.restart()
+
+        self.misses = 0
+        self.secs[self.index] = secs
+        self.starts[self.index] = start_ns
+        self.index = (self.index + 1) % self.window
+
+        if self.count < self.window:
+            self.count += 1
+
+        self.fit()
+
+    def restart(self):
+        self.restarts += 1
+        self.count = 0
+        self.index = 0
+        self.misses = 0
+        self.locked = False
+
+    # LEAST SQUARES LINE THROUGH THE RING, X IN SECONDS AND Y IN NS, BOTH FROM THE NEWEST SAMPLE
+    # Y HAS THE NOMINAL SECOND TAKEN OUT SO IT IS ONLY THE DRIFT AND THE JITTER. THE LINE IS THEN MOVED DOWN TO THE
+    # EARLIEST SAMPLE, THE RMS AND MAX RESIDUALS ARE AGAINST THE LEAST SQUARES LINE
+    def fit(self):
+        count = self.count
+        newest = (self.index - 1) % self.window
+        last_secs = self.secs[newest]
+        last_ns = self.starts[newest]
+        sum_x = 0
+        sum_y = 0
+        sum_xx = 0
+        sum_xy = 0
+
+        for i in range(count):
+            x = self.secs[i] - last_secs
+            y = self.starts[i] - last_ns - x * 1000000000
+            sum_x += x
+            sum_y += y
+            sum_xx += x * x
+            sum_xy += x * y
+
+        den = count * sum_xx - sum_x * sum_x
+        drift = (count * sum_xy - sum_x * sum_y) // den if den else 0
+        drift = max(-self.max_drift, min(self.max_drift, drift))
+        phase = (sum_y - drift * sum_x) // count
+
+        # RESIDUALS OF THE WINDOW AGAINST THE NEW LINE
+        sum_rr = 0
+        max_r = 0
+        min_r = 0
+
+        for i in range(count):
+            x = self.secs[i] - last_secs
+            r = self.starts[i] - last_ns - x * 1000000000 - phase - drift * x
+            sum_rr += r * r
+
+            if r > max_r or -r > max_r:
+                max_r = abs(r)
+
+            if r < min_r:
+                min_r = r
+
+        self.base_secs = last_secs
+        self.base_ns = last_ns + phase + min_r
+        self.period_ns = 1000000000 + drift
+        self.rms_ns = int((sum_rr // count) ** 0.5)
+        self.max_ns = max_r
+        self.locked = count >= self.min_samples
+
+    # UTC SECOND IN EFFECT AT MONOTONIC TIME NOW, ONLY WHEN LOCKED
+    def second(self, now):
+        return self.base_secs + (now + self.offset_ns - self.base_ns) // self.period_ns
+
+    # NS FROM NOW TO THE START OF THE NEXT UTC SECOND, ONLY WHEN LOCKED
+    def until_next(self, now):
+        elapsed = now + self.offset_ns - self.base_ns
+        return self.period_ns - elapsed % self.period_ns
+
+    @property
+    def drift_ppm(self):
+        return (self.period_ns - 1000000000) / 1000
+
+    def report(self):
+        return 'TIME   {:6s} {:6d} SAMPLES {:6d} QUIET {:4d} REJECTED {:2d} RESTARTS  DRIFT {:+7.2f}PPM  RESIDUAL RMS {:5d}US MAX {:5d}US LAST {:+6d}US  LATENCY {:5.1f}MS'.format('LOCKED' if self.locked else 'FREE', self.samples, self.quiet, self.rejected, self.restarts, self.drift_ppm, self.rms_ns // 1000, self.max_ns // 1000, self.resid_ns // 1000, self.latency_ns / 1000000)
@@ -0,0 +1,283 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE MICRO BENCHMARKS - THE PURE FUNCTIONS RUN ON EVERY GPS, CLOCK, COMPASS AND BATTERY PASS
+#
+# EACH CASE RUNS ITS FUNCTION OVER A FIXED SET OF RANDOM AND EDGE CASE INPUTS (POLES, ANTIMERIDIAN, GRID AND COMPASS
+# SECTOR BOUNDARIES, BATTERY CURVE POINTS, DST TRANSITIONS AND YEAR ROLLOVER). THE INPUTS ARE SEEDED SO EVERY RUN IS
+# THE SAME. THE TIME PER CALL IS THE BEST OF --ROUNDS WITH THE COST OF AN EMPTY CALL TAKING THE SAME ARGUMENTS
+# REMOVED, ALLOCATIONS PER CALL ARE MEASURED SEPARATELY UNDER TRACEMALLOC
+# THESE FUNCTIONS LIVE IN MODULES WITHOUT HARDWARE IMPORTS SO THEY LOAD UNCHANGED ON CPYTHON, THE COMPASS IS GIVEN A
+# STAND IN MAGNETOMETER
+#
+# --SAVE STORES THE RESULTS AS THE BASELINE. OTHERWISE THE RESULTS ARE COMPARED WITH THE BASELINE, AND A CASE MORE THAN
+# --THRESHOLD SLOWER (PLUS 5 NS OF TIMER NOISE, WHICH MATTERS FOR THE TABLE LOOKUPS), ALLOCATING MORE, OR RETURNING
+# DIFFERENT RESULTS IS FLAGGED AND THE EXIT STATUS IS 1
+# HOST TIMINGS ONLY RANK THE CASES AND CATCH REGRESSIONS, THE RP2040 IS ROUGHLY 100 TIMES SLOWER
+#
+# USAGE: python3 tools/bench.py [--save] [--baseline FILE] [--threshold FRACTION] [--only NAME]
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# DATE_TIME.PY EXPECTS TIME.LOCALTIME() TO BE UTC AS IT IS ON CIRCUITPYTHON
+os.environ['TZ'] = 'UTC'
+time.tzset()
+
+from battery import bat_level
+from compass import comp_direction, comp_sector, compass
+from date_time import comp_date_time
+from grid import calc_grid, grid_locator
+from ubx import ubx_checksum
+
+bench_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# SETTINGS FROM CODE.PY
+bat_curve = (43300, 44000, 45000, 45700, 46000, 46600, 47500, 48800, 50000, 51400, 65535)
+dst_rules = ((3, 2, 6, 2), (11, 1, 6, 2), 3600, -5, ('EST', 'EDT'))
+
+# 2024 US DST TRANSITIONS FOR UTC - 5, AND NEW YEAR
+dst_2024_start = 1710054000
+dst_2024_end = 1730613600
+year_2025 = 1735689600
+
+class stand_in_mag:
+    def __init__(self, samples):
+        self.samples = samples
+        self.index = 0
+
+    @property
+    def magnetic(self):
+        sample = self.samples[self.index]
+        self.index = (self.index + 1) % len(self.samples)
+        return sample
+
+def grid_inputs(rand):
+    inputs = [(rand.uniform(-90, 90), rand.uniform(-180, 180)) for _ in range(2000)]
+    edges = [-90, -89.99999, -45, -0.00001, 0, 0.00001, 45, 89.99999, 90]
+    edges += [lat + d for lat in range(-80, 90, 10) for d in (-0.00001, 0)]
+    edges += [lat + minute / 60 for lat in (-1, 0, 41) for minute in (0, 2.5, 57.5)]
+    lon_edges = [-180, -179.99999, -0.00001, 0, 0.00001, 179.99999, 180]
+    lon_edges += [lon + d for lon in range(-160, 180, 20) for d in (-0.00001, 0)]
+    lon_edges += [lon + minute / 60 for lon in (-2, 0, 88) for minute in (0, 5, 115)]
+
+    for lat in edges:
+        inputs.append((lat, rand.uniform(-180, 180)))
+
+    for lon in lon_edges:
+        inputs.append((rand.uniform(-90, 90), lon))
+
+    return inputs
+
+# ONE HOUR OF 1 HZ FIXES DRIVING AT ABOUT 30 KNOTS
+def track_inputs():
+    return [(41.7 + 0.05 * math.sin(i * math.pi / 300), -88.1 + 0.05 * math.cos(i * math.pi / 300)) for i in range(3600)]
+
+def sector_inputs(rand):
+    inputs = [(rand.uniform(0, 360),) for _ in range(2000)]
+
+    for sector in range(17):
+        edge = sector * 22.5 - 11.25
+        inputs += [(edge - 0.0001,), (edge,), (edge + 0.0001,)]
+
+    return inputs + [(0.0,), (359.9999,), (360.0,), (-0.0001,)]
+
+def bat_inputs(rand):
+    inputs = [(rand.randint(0, 65535),) for _ in range(2000)]
+
+    for point in bat_curve:
+        inputs += [(point - 1,), (point,), (point + 1,)]
+
+    return inputs + [(0,), (65535,)]
+
+def checksum_inputs(rand):
+    inputs = []
+
+    for length in range(0, 101):
+        buf = bytes([0xB5, 0x62, 0x01, 0x07, length & 0xFF, 0]) + bytes(rand.getrandbits(8) for _ in range(length))
+        inputs.append((buf, 2, len(buf)))
+
+    return inputs
+
+def date_time_tick_inputs(rand):
+    inputs = []
+
+    for edge in (dst_2024_start, dst_2024_end, year_2025 + 5 * 3600, year_2025):
+        inputs += [(secs,) for secs in range(edge - 600, edge + 600)]
+
+    return inputs
+
+def date_time_jump_inputs(rand):
+    inputs = [(rand.randint(946684800, 4102444800),) for _ in range(1000)]
+    return inputs + [(dst_2024_start - 1,), (dst_2024_start,), (dst_2024_end - 1,), (dst_2024_end,), (year_2025 - 1,), (year_2025,)]
+
+def date_time_new_inputs(rand):
+    zones = (dst_rules, ((3, 5, 6, 1), (10, 5, 6, 1), 3600, 0, ('GMT', 'BST')), ((10, 1, 6, 2), (4, 1, 6, 3), 3600, 10, ('AEST', 'AEDT')))
+    return [(zones[i % len(zones)],) for i in range(300)]
+
+def build_cases(rand):
+    heading = compass(stand_in_mag([(rand.uniform(-50, 50), rand.uniform(-50, 50), -40.0) for _ in range(500)]), 2.0, -3.0, False, False, False, -3.5, 8, 4.0, (1.02, 0.01, 0.01, 0.98))
+
+    def comp_step():
+        heading.sample()
+        heading.update()
+        return heading.sector
+
+    locator = grid_locator(6, 25)
+
+    def locator_step(latitude, longitude):
+        locator.update(latitude, longitude)
+        return locator.text
+
+    tick = comp_date_time(*dst_rules)
+
+    def date_time_update(secs):
+        tick.update(secs)
+        return tick.tz_time + tick.tz_desc + tick.tz_date + tick.utc_date
+
+    jump = comp_date_time(*dst_rules)
+
+    def date_time_jump(secs):
+        jump.update(secs)
+        return jump.tz_time + jump.tz_desc + jump.tz_date
+
+    def date_time_new(rules):
+        clock = comp_date_time(*rules)
+        return clock.tz_desc
+
+    return (
+        ('CALC_GRID', calc_grid, grid_inputs(rand)),
+        ('GRID_LOCATOR', locator_step, track_inputs()),
+        ('COMP_SECTOR', comp_sector, sector_inputs(rand)),
+        ('COMP_DIRECTION', comp_direction, [(sector,) for sector in range(-1, 16)] * 50),
+        ('COMPASS_UPDATE', comp_step, [()] * 1000),
+        ('BAT_LEVEL', lambda adc: bat_level(adc, bat_curve), bat_inputs(rand)),
+        ('UBX_CHECKSUM', ubx_checksum, checksum_inputs(rand)),
+        ('DATE_TIME_NEW', date_time_new, date_time_new_inputs(rand)),
+        ('DATE_TIME_TICK', date_time_update, date_time_tick_inputs(rand)),
+        ('DATE_TIME_JUMP', date_time_jump, date_time_jump_inputs(rand)),
+    )
+
+# EMPTY CALLS WITH THE SAME NUMBER OF POSITIONAL ARGUMENTS AS THE CASE, A *ARGS STUB COSTS MORE THAN A CHEAP ONE
+# ARGUMENT CALL AND WOULD HIDE IT
+def empty_0():
+    return None
+
+def empty_1(a):
+    return None
+
+def empty_2(a, b):
+    return None
+
+def empty_3(a, b, c):
+    return None
+
+empty_calls = (empty_0, empty_1, empty_2, empty_3)
+
+# BEST TIME FOR ONE PASS OVER THE INPUTS, IN NS
+def time_pass(func, inputs, rounds):
+    best = None
+
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+
+        for args in inputs:
+            func(*args)
+
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def measure(func, inputs, rounds):
+    elapsed = time_pass(func, inputs, rounds) - time_pass(empty_calls[len(inputs[0])], inputs, rounds)
+    ns_per_call = max(elapsed, 0) / len(inputs)
+
+    # BYTES STILL ALLOCATED AT THE PEAK OF EACH CALL, RESULTS INCLUDED
+    sample = inputs[:500]
+    tracemalloc.start()
+    alloc = 0
+
+    for args in sample:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        alloc += tracemalloc.get_traced_memory()[1] - before
+
+    tracemalloc.stop()
+
+    # CHECKSUM OF THE RESULTS, CHANGES IF A FUNCTION STARTS RETURNING SOMETHING DIFFERENT
+    results = zlib.crc32(repr([func(*args) for args in inputs]).encode())
+
+    return {'calls': len(inputs), 'ns': round(ns_per_call, 1), 'bytes': round(alloc / len(sample), 1), 'results': results}
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro benchmarks')
+    parser.add_argument('--baseline', default=bench_baseline, help='baseline file')
+    parser.add_argument('--save', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before a case is flagged, as a fraction')
+    parser.add_argument('--rounds', type=int, default=20, help='timing rounds per case, the best is kept')
+    parser.add_argument('--only', help='only run cases containing this text')
+    args = parser.parse_args()
+
+    cases = build_cases(random.Random(2022))
+    baseline = {}
+
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    flagged = 0
+
+    print('{:16s} {:>7s} {:>10s} {:>10s} {:>10s}  {}'.format('CASE', 'CALLS', 'NS/CALL', 'BYTES', 'BASE NS', 'STATUS'))
+
+    for name, func, inputs in cases:
+        if args.only and args.only.upper() not in name:
+            continue
+
+        result = measure(func, inputs, args.rounds)
+        results[name] = result
+        base = baseline.get(name)
+        status = ''
+
+        if base:
+            flags = []
+
+            if result['ns'] > base['ns'] * (1 + args.threshold) + 5:
+                flags.append('SLOWER {:+.0f}%'.format((result['ns'] / max(base['ns'], 0.1) - 1) * 100))
+
+            if result['bytes'] > base['bytes'] * (1 + args.threshold) + 8:
+                flags.append('MORE ALLOC')
+
+            if result['results'] != base['results']:
+                flags.append('RESULTS CHANGED')
+
+            status = ', '.join(flags) if flags else 'OK'
+            flagged += bool(flags)
+
+        print('{:16s} {:7d} {:10.1f} {:10.1f} {:>10s}  {}'.format(name, result['calls'], result['ns'], result['bytes'], '{:.1f}'.format(base['ns']) if base else '-', status))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+        print('BASELINE SAVED TO {}'.format(args.baseline))
+    elif not baseline:
+        print('NO BASELINE, RUN WITH --SAVE TO STORE ONE')
+
+    if flagged:
+        print('{} CASE(S) REGRESSED'.format(flagged))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE BENCHMARK - GPS_STREAM.GPS_DEMUX ON A MIXED NMEA / UBX STREAM
+#
+# REPORTS THROUGHPUT AND HOW MANY SENTENCES / FRAMES WERE RECOVERED, OPTIONALLY WITH RANDOM BYTE CORRUPTION
+# A CAPTURE FILE CAN BE GIVEN, OTHERWISE EACH SYNTHETIC EPOCH HOLDS RMC + GGA + NAV-PVT + AN ACK
+#
+# USAGE: python3 tools/bench_demux.py [CAPTURE_FILE] [--epochs N] [--corrupt RATE] [--chunk BYTES]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from gps_stream import gps_demux
+from gps_gen import nmea_epoch, ubx_epoch, ubx_frame
+
+# COUNTS EVERYTHING THE DEMUX HANDS OUT
+class count_sink:
+    def __init__(self):
+        self.nmea = 0
+        self.ubx = 0
+
+    def decode_nmea(self, line, line_len, commas, field_count):
+        self.nmea += 1
+        return True
+
+    def decode_ubx(self, msg_class, msg_id, payload, length):
+        self.ubx += 1
+        return True
+
+def mixed_stream(epochs):
+    out = bytearray()
+    ack = ubx_frame(0x05, 0x01, bytes([0x06, 0x01]))
+
+    for i in range(epochs):
+        out += nmea_epoch(43200 + i, 41.7, -88.1 + i / 100000, 200, 30, 90)
+        out += ubx_epoch(43200 + i, 41.7, -88.1 + i / 100000, 200, 30, 90)
+        out += ack
+
+    return bytes(out)
+
+def corrupt(data, rate, seed=1):
+    rng = random.Random(seed)
+    out = bytearray(data)
+
+    for _ in range(int(len(out) * rate)):
+        out[rng.randrange(len(out))] = rng.randrange(256)
+
+    return bytes(out)
+
+def main():
+    parser = argparse.ArgumentParser(description='NMEA / UBX demultiplexer benchmark')
+    parser.add_argument('capture', nargs='?', help='raw mixed capture file')
+    parser.add_argument('--epochs', type=int, default=2000, help='synthetic epochs when no capture is given')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='fraction of bytes overwritten with random values')
+    parser.add_argument('--chunk', type=int, default=256, help='bytes per UART read')
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as capture:
+            data = capture.read()
+    else:
+        data = mixed_stream(args.epochs)
+
+    # A CAPTURE CAN ONLY BE ESTIMATED FROM THE SYNC CHARACTERS, WHICH CAN ALSO APPEAR INSIDE UBX PAYLOADS
+    if args.capture:
+        clean_nmea = data.count(b'$')
+        clean_ubx = data.count(b'\xb5\x62')
+    else:
+        clean_nmea = args.epochs * 2
+        clean_ubx = args.epochs * 2
+
+    if args.corrupt:
+        data = corrupt(data, args.corrupt)
+
+    demux = gps_demux(None, buffer_size=args.chunk)
+    sink = count_sink()
+    demux.add_nmea(sink)
+    demux.add_ubx(sink)
+
+    view = memoryview(data)
+    start = time.perf_counter()
+
+    for pos in range(0, len(data), args.chunk):
+        chunk = view[pos:pos + args.chunk]
+        demux.feed(chunk, len(chunk))
+
+    elapsed = time.perf_counter() - start
+
+    print('{} BYTES IN {:.3f}s, {:.1f} KB/S, {:.0f} MESSAGES/S'.format(len(data), elapsed, len(data) / elapsed / 1024, (sink.nmea + sink.ubx) / elapsed))
+    print('NMEA {} OF {} ({} ERRORS)'.format(sink.nmea, clean_nmea, demux.nmea_errors))
+    print('UBX  {} OF {} ({} ERRORS)'.format(sink.ubx, clean_ubx, demux.ubx_errors))
+
+if __name__ == '__main__':
+    main()
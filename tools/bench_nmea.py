@@ -0,0 +1,160 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE BENCHMARK - GPS_DEMUX + NMEA.NMEA_GPS VS ADAFRUIT_GPS.GPS, PLUS UBX.UBX_GPS ON THE SAME TRACK AS NAV-PVT
+#
+# REPORTS SENTENCES (OR FRAMES) PER SECOND AND BYTES ALLOCATED PER SENTENCE FOR EACH PARSER
+# ALLOCATIONS ARE MEASURED WITH TRACEMALLOC ON CPYTHON, WHERE EVERY INT AND FLOAT IS AN OBJECT, SO ABSOLUTE
+# NUMBERS ARE HIGHER THAN ON CIRCUITPYTHON BUT THE COMPARISON BETWEEN THE TWO PARSERS STILL HOLDS
+#
+# USAGE: python3 tools/bench_nmea.py [CAPTURE_FILE] [--epochs N]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from gps_stream import gps_demux
+from nmea import nmea_gps
+from ubx import ubx_gps
+from gps_gen import gps_track, ubx_epoch
+
+# FAKE UART THAT SERVES A CAPTURE IN CHUNKS, LIKE BUSIO.UART WITH A RECEIVE BUFFER
+class capture_uart:
+    baudrate = 38400
+
+    def __init__(self, data, chunk=256):
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self.data) - self.pos)
+
+    def readinto(self, buf, nbytes=None):
+        count = min(len(buf) if nbytes is None else nbytes, len(self.data) - self.pos)
+        buf[:count] = self.data[self.pos:self.pos + count]
+        self.pos += count
+        return count
+
+    def read(self, count):
+        out = self.data[self.pos:self.pos + count]
+        self.pos += len(out)
+        return out or None
+
+    def readline(self):
+        end = self.data.find(b'\n', self.pos)
+        end = len(self.data) if end < 0 else end + 1
+        out = self.data[self.pos:end]
+        self.pos = end
+        return out or None
+
+    def done(self):
+        return self.pos >= len(self.data)
+
+# ADAFRUIT_GPS IMPORTS A FEW CIRCUITPYTHON MODULES FOR TYPE HINTS ONLY, GIVE IT EMPTY ONES ON THE HOST
+def load_adafruit_gps():
+    stubs = {
+        'micropython': {'const': lambda value: value},
+        'busio': {'I2C': object, 'UART': object},
+        'circuitpython_typing': {'ReadableBuffer': bytes},
+    }
+
+    for name, attrs in stubs.items():
+        if name not in sys.modules:
+            stub = types.ModuleType(name)
+            stub.__dict__.update(attrs)
+            sys.modules[name] = stub
+
+    try:
+        import adafruit_gps
+    except ImportError:
+        return None
+
+    return adafruit_gps.GPS
+
+# DEMUX WITH ONE DECODER ATTACHED, RETURNS THE UPDATE FUNCTION AND THE DECODER
+def nmea_parser(uart):
+    demux = gps_demux(uart)
+    decoder = nmea_gps()
+    demux.add_nmea(decoder)
+    return demux.update, decoder
+
+def ubx_parser(uart):
+    demux = gps_demux(uart)
+    decoder = ubx_gps()
+    demux.add_ubx(decoder)
+    return demux.update, decoder
+
+def adafruit_parser(gps_class):
+    def make(uart):
+        decoder = gps_class(uart, debug=False)
+        return decoder.update, decoder
+
+    return make
+
+def run(name, make_parser, data, sentences):
+    # TIMING PASS
+    uart = capture_uart(data)
+    update, parser = make_parser(uart)
+    start = time.perf_counter()
+
+    while not uart.done():
+        update()
+
+    elapsed = time.perf_counter() - start
+
+    # ALLOCATION PASS
+    uart = capture_uart(data)
+    update, parser = make_parser(uart)
+    tracemalloc.start()
+    total = 0
+
+    # PEAK MINUS STARTING MEMORY FOR EACH UPDATE IS THE MOST THAT UPDATE HAD ALLOCATED AT ONCE
+    while not uart.done():
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        update()
+        total += tracemalloc.get_traced_memory()[1] - before
+
+    tracemalloc.stop()
+
+    print('{:12s} {:10.0f} SENTENCES/S {:8.1f} PEAK BYTES ALLOCATED/SENTENCE  LAT {} LON {}'.format(name, sentences / elapsed, total / sentences, parser.latitude, parser.longitude))
+
+def main():
+    parser = argparse.ArgumentParser(description='NMEA parser benchmark')
+    parser.add_argument('capture', nargs='?', help='raw NMEA capture file')
+    parser.add_argument('--epochs', type=int, default=3000, help='synthetic epochs when no capture is given')
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as capture:
+            data = capture.read()
+    else:
+        data = gps_track(args.epochs)
+
+    sentences = data.count(b'$')
+    print('{} BYTES, {} SENTENCES'.format(len(data), sentences))
+
+    run('nmea_gps', nmea_parser, data, sentences)
+
+    adafruit_gps = load_adafruit_gps()
+
+    if adafruit_gps is None:
+        print('adafruit_gps       NOT INSTALLED, SKIPPED (pip install adafruit-circuitpython-gps)')
+    else:
+        run('adafruit_gps', adafruit_parser(adafruit_gps), data, sentences)
+
+    # SAME TRACK AS UBX-NAV-PVT, ONE FRAME PER EPOCH INSTEAD OF RMC + GGA
+    if not args.capture:
+        ubx_data = gps_track(args.epochs, epoch=ubx_epoch)
+        print('{} BYTES AS NAV-PVT, {:.0f} BYTES/EPOCH VS {:.0f} BYTES/EPOCH AS NMEA'.format(len(ubx_data), len(ubx_data) / args.epochs, len(data) / args.epochs))
+        run('ubx_gps', ubx_parser, ubx_data, args.epochs)
+
+if __name__ == '__main__':
+    main()
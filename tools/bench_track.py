@@ -0,0 +1,101 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE BENCHMARK - TRACK_LOG.PY
+#
+# TIMES TRACK_LOG.ADD(), WHICH RUNS ON THE GPS PATH, SEPARATELY FROM FLUSH(), WHICH RUNS IN ITS OWN TASK, AND REPORTS
+# BYTES PER FIX, PEAK ALLOCATION PER ADD() AND A ROUND TRIP CHECK THROUGH TOOLS/TRACK_DECODE.PY
+# ADD() TIME IS COMPARED WITH THE COST OF DECODING ONE NMEA EPOCH, WHICH THE GPS PATH ALREADY PAYS
+#
+# USAGE: python3 tools/bench_track.py [--fixes N] [--blocks N]
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from gps_gen import gps_track
+from gps_stream import gps_demux
+from nmea import nmea_gps
+from track_decode import decode_track
+from track_log import track_log
+
+# FIXES ALONG THE SAME CIRCULAR TRACK AS GPS_GEN
+def track_fixes(count):
+    fixes = []
+
+    for i in range(count):
+        angle = i * 2 * math.pi / 600
+        fixes.append((1718452800 + i, 41.7 + 0.05 * math.sin(angle), -88.1 + 0.05 * math.cos(angle), 200 + 50 * math.sin(angle * 3), (30 + 10 * math.cos(angle)) / 1.15078, (math.degrees(angle) + 90) % 360, 9))
+
+    return fixes
+
+def nmea_epoch_ns(count):
+    data = gps_track(count)
+    demux = gps_demux(None)
+    demux.add_nmea(nmea_gps())
+    start = time.perf_counter_ns()
+    demux.feed(data, len(data))
+    return (time.perf_counter_ns() - start) / count
+
+def main():
+    parser = argparse.ArgumentParser(description='Track logger benchmark')
+    parser.add_argument('--fixes', type=int, default=20000, help='fixes to log')
+    parser.add_argument('--blocks', type=int, default=256, help='ring size in blocks')
+    args = parser.parse_args()
+
+    fixes = track_fixes(args.fixes)
+    path = os.path.join(tempfile.mkdtemp(), 'track.bin')
+    log = track_log(path, blocks=args.blocks)
+    log.open()
+
+    add_ns = 0
+    add_max_ns = 0
+    flush_ns = 0
+    flush_max_ns = 0
+
+    for fix in fixes:
+        start = time.perf_counter_ns()
+        log.add(*fix)
+        elapsed = time.perf_counter_ns() - start
+        add_ns += elapsed
+        add_max_ns = max(add_max_ns, elapsed)
+
+        # THE FLUSH TASK, RUN ONCE PER FIX HERE SO A FULL BLOCK NEVER WAITS
+        start = time.perf_counter_ns()
+        log.flush()
+        elapsed = time.perf_counter_ns() - start
+        flush_ns += elapsed
+        flush_max_ns = max(flush_max_ns, elapsed)
+
+    log.flush(partial=True)
+
+    tracemalloc.start()
+    log.add(*fixes[-1])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    with open(path, 'rb') as f:
+        decoded = decode_track(f.read())
+
+    # THE RING KEEPS THE NEWEST FIXES, EACH MUST MATCH WHAT WAS LOGGED
+    expected = [[int(secs), int(lat * 100000), int(lon * 100000), int(alt), int(speed * 10), int(track * 10), sats] for secs, lat, lon, alt, speed, track, sats in fixes[-len(decoded):]]
+    epoch_ns = nmea_epoch_ns(2000)
+
+    print('FIXES          {:10d}'.format(args.fixes))
+    print('BLOCK WRITES   {:10d}'.format(log.writes))
+    print('BYTES PER FIX  {:10.2f}'.format(log.writes * log.block_size / args.fixes))
+    print('ADD            {:10.2f} US MEAN {:8.2f} US MAX'.format(add_ns / args.fixes / 1000, add_max_ns / 1000))
+    print('FLUSH          {:10.2f} US MEAN {:8.2f} US MAX'.format(flush_ns / args.fixes / 1000, flush_max_ns / 1000))
+    print('NMEA EPOCH     {:10.2f} US (RMC + GGA DECODE, FOR SCALE)'.format(epoch_ns / 1000))
+    print('ADD / EPOCH    {:10.2f} %'.format(add_ns / args.fixes * 100 / epoch_ns))
+    print('ADD PEAK ALLOC {:10d} BYTES'.format(peak))
+    print('ROUND TRIP     {:>10} ({} FIXES IN RING)'.format('OK' if decoded == expected else 'MISMATCH', len(decoded)))
+
+if __name__ == '__main__':
+    main()
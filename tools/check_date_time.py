@@ -0,0 +1,165 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE CHECK - DATE_TIME.PY AGAINST THE ORIGINAL PER CALL CLOCK CLASS
+#
+# THE ORIGINAL CODE.PY CLASS, WHICH WORKED OUT THE DST DATES AND FORMATTED EVERYTHING FROM SCRATCH ON EVERY CALL, IS
+# KEPT HERE AS THE REFERENCE. ONE CACHED COMP_DATE_TIME PER RULE SET IS RUN OVER 2000 - 2040 AND EVERY STRING AND THE
+# DST STATE ARE COMPARED:
+# - EVERY HOUR, IN ORDER, AS THE CLOCK TASK WOULD SEE THEM
+# - EVERY MINUTE FOR A DAY AROUND EACH NEW YEAR (THE DEC 31 / JAN 1 OVERLAP) AND EACH DST START AND END
+# - RANDOM JUMPS IN BOTH DIRECTIONS, SO THE YEAR CACHE IS ALSO LEFT THE WRONG WAY
+# THE RULE SETS COVER BOTH HEMISPHERES, HALF HOUR AND LARGE OFFSETS AND NO DST
+#
+# EXITS 1 ON THE FIRST MISMATCHES (UP TO --MAX-ERRORS ARE PRINTED)
+#
+# USAGE: python3 tools/check_date_time.py [--start-year Y] [--end-year Y] [--random N] [--max-errors N]
+
+import argparse
+import calendar
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# TIME.LOCALTIME() / MKTIME() MUST BE UTC, AS ON CIRCUITPYTHON
+os.environ['TZ'] = 'UTC'
+time.tzset()
+
+from date_time import comp_date_time
+
+# NAME, DST START / END (MONTH, WEEK, DAY, HOUR), DST OFFSET, TIMEZONE OFFSET, DESCRIPTIONS
+rule_sets = (
+    ('US EASTERN', (3, 2, 6, 2), (11, 1, 6, 2), 3600, -5, ('EST', 'EDT')),
+    ('US PACIFIC', (3, 2, 6, 2), (11, 1, 6, 2), 3600, -8, ('PST', 'PDT')),
+    ('UK', (3, 5, 6, 1), (10, 5, 6, 2), 3600, 0, ('GMT', 'BST')),
+    ('CENTRAL EUROPE', (3, 5, 6, 2), (10, 5, 6, 3), 3600, 1, ('CET', 'CST')),
+    ('NEW ZEALAND', (9, 5, 6, 2), (4, 1, 6, 3), 3600, 12, ('NZS', 'NZD')),
+    ('LORD HOWE', (10, 1, 6, 2), (4, 1, 6, 2), 1800, 10.5, ('LHS', 'LHD')),
+    ('INDIA', (1, 1, 0, 0), (1, 1, 0, 0), 0, 5.5, ('IST', 'IST')),
+    ('MARQUESAS', (1, 1, 0, 0), (1, 1, 0, 0), 0, -9.5, ('MAR', 'MAR')),
+    ('KIRITIMATI', (1, 1, 0, 0), (1, 1, 0, 0), 0, 14, ('LIN', 'LIN')),
+)
+
+day_text = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+month_text = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+
+# THE ORIGINAL CLASS, WITH THE RULES PASSED IN INSTEAD OF READ FROM CODE.PY GLOBALS
+def reference(base_time_secs, dst_start, dst_end, dst_offset, timezone_offset, timezone_desc):
+    time_utc_tuple = time.localtime(base_time_secs)
+
+    base_year = time_utc_tuple[0]
+    err_check_tuple = (base_year, 1, 1, 0, 0, 0, 0, 0, 0)
+    err_check_secs = time.mktime(err_check_tuple) - timezone_offset * 3600
+
+    if base_time_secs < err_check_secs:
+        base_year -= 1
+
+    dst_start_tuple = (base_year, dst_start[0], dst_start[1] * 7 - 6, dst_start[3], 0, 0, 0, 0, 0)
+    dst_start_secs = time.mktime(dst_start_tuple)
+    dst_start_tuple = time.localtime(dst_start_secs)
+
+    dst_start_diff = dst_start[2] - dst_start_tuple[6]
+
+    if dst_start_diff < 0:
+        dst_start_diff += 7
+
+    dst_start_secs += dst_start_diff * 86400 - timezone_offset * 3600
+
+    dst_end_tuple = (base_year, dst_end[0], dst_end[1] * 7 - 6, dst_end[3], 0, 0, 0, 0, 0)
+    dst_end_secs = time.mktime(dst_end_tuple) - dst_offset
+    dst_end_tuple = time.localtime(dst_end_secs)
+
+    dst_end_diff = dst_end[2] - dst_end_tuple[6]
+
+    if dst_end_diff < 0:
+        dst_end_diff += 7
+
+    dst_end_secs += dst_end_diff * 86400 - timezone_offset * 3600 - dst_offset
+
+    dst_active = dst_start_secs <= base_time_secs < dst_end_secs
+
+    utc_date = '{} {} {:02d}, {}'.format(day_text[time_utc_tuple[6]], month_text[time_utc_tuple[1] - 1], time_utc_tuple[2], time_utc_tuple[0])
+    utc_time = '{:02d}:{:02d}:{:02d}'.format(time_utc_tuple[3], time_utc_tuple[4], time_utc_tuple[5])
+
+    time_tz_secs = int(base_time_secs + timezone_offset * 3600 + dst_active * dst_offset)
+    time_tz_tuple = time.localtime(time_tz_secs)
+
+    tz_date = '{} {} {:02d}, {}'.format(day_text[time_tz_tuple[6]], month_text[time_tz_tuple[1] - 1], time_tz_tuple[2], time_tz_tuple[0])
+    tz_time = '{:02d}:{:02d}:{:02d}'.format(time_tz_tuple[3], time_tz_tuple[4], time_tz_tuple[5])
+
+    return utc_date, utc_time, tz_date, tz_time, timezone_desc[dst_active], dst_active, dst_start_secs, dst_end_secs
+
+class checker:
+    def __init__(self, rules, max_errors):
+        self.name = rules[0]
+        self.rules = rules[1:]
+        self.engine = comp_date_time(*self.rules)
+        self.max_errors = max_errors
+        self.checks = 0
+        self.errors = 0
+
+    def check(self, secs):
+        engine = self.engine
+        engine.update(secs)
+        ref = reference(secs, *self.rules)
+        got = (engine.utc_date, engine.utc_time, engine.tz_date, engine.tz_time, engine.tz_desc, engine.dst_active)
+        self.checks += 1
+
+        if got != ref[:6]:
+            self.errors += 1
+
+            if self.errors <= self.max_errors:
+                print('{:15s} {} UTC: GOT {} WANT {}'.format(self.name, time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(secs)), got, ref[:6]))
+
+        return ref
+
+    # EVERY MINUTE FOR 12 HOURS EACH SIDE OF SECS
+    def around(self, secs):
+        for step in range(-720, 721):
+            self.check(int(secs) + step * 60)
+
+def main():
+    parser = argparse.ArgumentParser(description='date_time.py check against the original clock class')
+    parser.add_argument('--start-year', type=int, default=2000)
+    parser.add_argument('--end-year', type=int, default=2040)
+    parser.add_argument('--random', type=int, default=20000, help='random jumps per rule set')
+    parser.add_argument('--max-errors', type=int, default=10, help='mismatches printed per rule set')
+    args = parser.parse_args()
+
+    start = calendar.timegm((args.start_year, 1, 1, 0, 0, 0))
+    end = calendar.timegm((args.end_year + 1, 1, 1, 0, 0, 0))
+    failed = False
+    rand = random.Random(1)
+
+    for rules in rule_sets:
+        check = checker(rules, args.max_errors)
+
+        for secs in range(start, end, 3600):
+            check.check(secs)
+
+        # A FRESH ENGINE FOR THE DENSE CHECKS, SO THEY ARE NOT ALL CACHE HITS
+        check.engine = comp_date_time(*check.rules)
+
+        for year in range(args.start_year, args.end_year + 1):
+            new_year = calendar.timegm((year, 1, 1, 0, 0, 0))
+            check.around(new_year)
+            ref = reference(new_year + 180 * 86400, *check.rules)
+            check.around(ref[6])
+            check.around(ref[7])
+
+        check.engine = comp_date_time(*check.rules)
+
+        for _ in range(args.random):
+            check.check(rand.randrange(start, end))
+
+        print('{:15s} {:9d} CHECKS {:6d} MISMATCHES'.format(check.name, check.checks, check.errors))
+        failed = failed or check.errors > 0
+
+    print('FAILED' if failed else 'ALL MATCH')
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
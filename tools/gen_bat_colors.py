@@ -0,0 +1,109 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE HELPER - GENERATES THE BATTERY GAUGE COLOR TABLE USED BY CODE.PY
+#
+# CODE.PY USED TO BUILD THE TABLE AT BOOT WITH ADAFRUIT_FANCYLED EXPAND_GRADIENT() AND PALETTE_LOOKUP()
+# THE SAME MATH IS DONE HERE SO THE TABLE CAN BE PASTED IN AS A CONSTANT
+# WITH --CHECK THE RESULT IS COMPARED AGAINST ADAFRUIT_FANCYLED IF IT CAN BE IMPORTED
+
+import argparse
+
+# GRADIENT AND TABLE SIZE AS USED BY CODE.PY
+bat_gradient = ((0.0, 0xFF0000), (0.25, 0xFF7F00), (0.50, 0xFFFF00), (0.75, 0x00FF00))
+bat_steps = 100
+
+def unpack(color):
+    return ((color >> 16) / 255.0, ((color >> 8) & 0xFF) / 255.0, (color & 0xFF) / 255.0)
+
+def mix(color1, color2, weight2):
+    weight1 = 1.0 - weight2
+    return tuple(min(max(c1 * weight1 + c2 * weight2, 0.0), 1.0) for c1, c2 in zip(color1, color2))
+
+def pack(color):
+    return sum(min(max(int(c * 256.0), 0), 255) << shift for c, shift in zip(color, (16, 8, 0)))
+
+# FANCYLED EXPAND_GRADIENT(), EVENLY SPACED PALETTE FROM GRADIENT POINTS
+def expand_gradient(gradient, length):
+    gradient = sorted(gradient)
+    least = gradient[0][0]
+    most = gradient[-1][0]
+    palette = []
+
+    for i in range(length):
+        pos = i / float(length - 1)
+
+        if pos <= least:
+            below, above = 0, 0
+        elif pos >= most:
+            below, above = -1, -1
+        else:
+            below, above = 0, -1
+
+            for n, point in enumerate(gradient):
+                if pos >= point[0]:
+                    below = n
+
+            for n, point in enumerate(gradient[-1:0:-1]):
+                if pos <= point[0]:
+                    above = -1 - n
+
+        span = gradient[above][0] - gradient[below][0]
+
+        if span <= 0:
+            palette.append(unpack(gradient[below][1]))
+        else:
+            palette.append(mix(unpack(gradient[below][1]), unpack(gradient[above][1]), (pos - gradient[below][0]) / span))
+
+    return palette
+
+# FANCYLED PALETTE_LOOKUP(), INTERPOLATED PALETTE ENTRY, POSITION WRAPS AT 1.0
+def palette_lookup(palette, position):
+    position %= 1.0
+    weight2 = position * len(palette)
+    index = int(weight2)
+    weight2 -= index
+
+    return mix(palette[index], palette[(index + 1) % len(palette)], weight2)
+
+def bat_colors():
+    palette = expand_gradient(bat_gradient, bat_steps)
+    return [pack(palette_lookup(palette, i / bat_steps)) for i in range(bat_steps)]
+
+# NONE IF ADAFRUIT_FANCYLED IS NOT INSTALLED
+def check(colors):
+    try:
+        import adafruit_fancyled.adafruit_fancyled as fancy
+    except ImportError:
+        return None
+
+    palette = fancy.expand_gradient(list(bat_gradient), bat_steps)
+    expected = [fancy.palette_lookup(palette, i / bat_steps).pack() for i in range(bat_steps)]
+    return expected == colors
+
+def main():
+    parser = argparse.ArgumentParser(description='Battery gauge color table generator')
+    parser.add_argument('--check', action='store_true', help='compare with adafruit_fancyled')
+    args = parser.parse_args()
+
+    colors = bat_colors()
+
+    if args.check:
+        match = check(colors)
+
+        if match is None:
+            print('adafruit_fancyled NOT INSTALLED, CHECK SKIPPED (pip install adafruit-circuitpython-fancyled)')
+        else:
+            print('MATCH' if match else 'MISMATCH')
+
+        return
+
+    lines = []
+
+    for i in range(0, len(colors), 10):
+        lines.append('    ' + ', '.join('0x{:06X}'.format(c) for c in colors[i:i + 10]) + ',')
+
+    print('bat_colors = (\n' + '\n'.join(lines) + '\n)')
+
+if __name__ == '__main__':
+    main()
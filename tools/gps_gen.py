@@ -0,0 +1,111 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE HELPER - GENERATES SYNTHETIC NMEA RMC / GGA SENTENCES AND UBX NAV-PVT FRAMES ALONG A SIMPLE TRACK
+# USED BY THE BENCHMARKS WHEN NO RECORDED CAPTURE IS GIVEN
+# ALSO GSV SENTENCES AND NAV-SAT FRAMES FOR A SET OF SATELLITES DRIFTING ACROSS THE SKY, FOR THE SATELLITE PAGE
+
+import math
+import struct
+
+# ADD $, CHECKSUM AND CR/LF TO A SENTENCE BODY
+def nmea_sentence(body):
+    checksum = 0
+
+    for c in body.encode('ascii'):
+        checksum ^= c
+
+    return '${}*{:02X}\r\n'.format(body, checksum).encode('ascii')
+
+# FORMAT DEGREES AS DDMM.MMMMM / DDDMM.MMMMM WITH HEMISPHERE
+def nmea_degrees(value, width, pos_char, neg_char):
+    hemi = pos_char if value >= 0 else neg_char
+    value = abs(value)
+    degrees = int(value)
+    minutes = round((value - degrees) * 60, 5)
+
+    if minutes >= 60:
+        degrees += 1
+        minutes -= 60
+
+    return '{:0{}d}{:08.5f}'.format(degrees, width, minutes), hemi
+
+# ONE EPOCH OF RMC + GGA FOR THE GIVEN TIME (SECONDS SINCE MIDNIGHT) AND POSITION
+# WITHOUT A FIX THE TIME IS STILL SENT BUT THE POSITION, SPEED, TRACK AND ALTITUDE FIELDS ARE EMPTY
+def nmea_epoch(secs, lat, lon, alt, speed, track, sats=9, day=(15, 6, 24), fix=True):
+    hhmmss = '{:02d}{:02d}{:02d}.00'.format(int(secs) // 3600 % 24, int(secs) // 60 % 60, int(secs) % 60)
+    lat_text, lat_hemi = nmea_degrees(lat, 2, 'N', 'S')
+    lon_text, lon_hemi = nmea_degrees(lon, 3, 'E', 'W')
+    date = '{:02d}{:02d}{:02d}'.format(*day)
+
+    if not fix:
+        rmc = 'GNRMC,{},V,,,,,,,{},,,N'.format(hhmmss, date)
+        gga = 'GNGGA,{},,,,,0,{:02d},99.99,,,,,,'.format(hhmmss, sats)
+        return nmea_sentence(rmc) + nmea_sentence(gga)
+
+    rmc = 'GNRMC,{},A,{},{},{},{},{:.3f},{:.2f},{},,,A'.format(hhmmss, lat_text, lat_hemi, lon_text, lon_hemi, speed, track, date)
+    gga = 'GNGGA,{},{},{},{},{},1,{:02d},0.90,{:.1f},M,-34.0,M,,'.format(hhmmss, lat_text, lat_hemi, lon_text, lon_hemi, sats, alt)
+
+    return nmea_sentence(rmc) + nmea_sentence(gga)
+
+# COMPLETE UBX FRAME WITH SYNC CHARACTERS AND CHECKSUM
+def ubx_frame(msg_class, msg_id, payload):
+    body = bytes([msg_class, msg_id]) + len(payload).to_bytes(2, 'little') + payload
+    cs_a = 0
+    cs_b = 0
+
+    for c in body:
+        cs_a = (cs_a + c) & 0xFF
+        cs_b = (cs_b + cs_a) & 0xFF
+
+    return b'\xb5\x62' + body + bytes([cs_a, cs_b])
+
+# ONE UBX-NAV-PVT FRAME FOR THE GIVEN TIME (SECONDS SINCE MIDNIGHT) AND POSITION
+# WITHOUT A FIX THE FIX TYPE IS 0 AND GNSSFIXOK IS CLEAR
+def ubx_epoch(secs, lat, lon, alt, speed, track, sats=9, day=(15, 6, 24), fix=True):
+    payload = bytearray(92)
+    secs = int(secs)
+    struct.pack_into('<IHBBBBBBIi', payload, 0, (secs % 86400) * 1000, 2000 + day[2], day[1], day[0], secs // 3600 % 24, secs // 60 % 60, secs % 60, 0x07, 50, 0)
+    struct.pack_into('<BBBBiiiiII', payload, 20, 3 if fix else 0, 0x01 if fix else 0, 0, sats, round(lon * 10000000), round(lat * 10000000), round(alt * 1000) + 34000, round(alt * 1000), 2500, 4000)
+    struct.pack_into('<ii', payload, 60, round(speed / 0.00194384), round(track * 100000))
+    return ubx_frame(0x01, 0x07, bytes(payload))
+
+# SATELLITES IN VIEW AT A TIME (SECONDS SINCE MIDNIGHT) AS (PRN, ELEVATION, AZIMUTH, C/N0)
+def sky_track(secs, count=12):
+    secs = int(secs)
+    return [(i * 2 + 1, 5 + (i * 23 + secs // 60) % 85, (i * 30 + secs // 20) % 360, 12 + (i * 7) % 36) for i in range(count)]
+
+# GSV SENTENCES, FOUR SATELLITES EACH
+def nmea_gsv(sats, talker='GP'):
+    total = (len(sats) + 3) // 4
+    out = b''
+
+    for n in range(total):
+        body = '{}GSV,{},{},{:02d}'.format(talker, total, n + 1, len(sats))
+
+        for prn, elev, azim, cno in sats[n * 4:n * 4 + 4]:
+            body += ',{:02d},{:02d},{:03d},{:02d}'.format(prn, elev, azim, cno)
+
+        out += nmea_sentence(body)
+
+    return out
+
+# ONE UBX-NAV-SAT FRAME, SATELLITES OVER 30 DBHZ ARE MARKED USED
+def ubx_nav_sat(secs, sats):
+    payload = struct.pack('<IBBxx', (int(secs) % 86400) * 1000, 1, len(sats))
+
+    for prn, elev, azim, cno in sats:
+        payload += struct.pack('<BBBbhhI', 0, prn, cno, elev, azim, 0, 0x08 if cno >= 30 else 0)
+
+    return ubx_frame(0x01, 0x35, payload)
+
+# A DRIVE OF COUNT EPOCHS AROUND A CIRCLE, NMEA BY DEFAULT OR UBX WITH EPOCH=UBX_EPOCH
+# EPOCHS IN THE RANGE NO_FIX HAVE NO FIX
+def gps_track(count, lat=41.7, lon=-88.1, radius=0.05, start_secs=43200, epoch=nmea_epoch, no_fix=range(0)):
+    out = bytearray()
+
+    for i in range(count):
+        angle = i * 2 * math.pi / 600
+        out += epoch(start_secs + i, lat + radius * math.sin(angle), lon + radius * math.cos(angle), 200 + 50 * math.sin(angle * 3), 30 + 10 * math.cos(angle), (math.degrees(angle) + 90) % 360, fix=i not in no_fix)
+
+    return bytes(out)
@@ -0,0 +1,786 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE REPLAY HARNESS - RUNS CODE.PY UNDER CPYTHON AGAINST A RECORDED GPS STREAM
+#
+# THE CIRCUITPYTHON HARDWARE MODULES (BOARD, BUSIO, DISPLAYIO, RTC, ANALOGIO, MICROCONTROLLER, THE DISPLAY, TEXT,
+# PROGRESS BAR AND MAGNETOMETER DRIVERS) ARE REPLACED WITH STAND INS, AND TIME AND ASYNCIO WITH A VIRTUAL CLOCK THAT
+# JUMPS STRAIGHT TO THE NEXT WAKE UP, SO HOURS OF DATA REPLAY IN SECONDS. THE REAL GPS, CLOCK, GRID, COMPASS, BATTERY
+# AND DISPLAY TASKS FROM CODE.PY RUN UNCHANGED
+#
+# THE CAPTURE IS RAW UART BYTES (NMEA AND / OR UBX). IT IS SPLIT INTO EPOCHS AT EACH RMC SENTENCE OR NAV-PVT FRAME,
+# ONE EPOCH IS RELEASED PER VIRTUAL SECOND (--EPOCH-RATE FOR MORE, TO LOAD THE PARSER LIKE A HIGH RATE RECEIVER) AT THE
+# UART BAUD RATE, AND BYTES BEYOND THE RECEIVE BUFFER ARE DROPPED AS ON THE DEVICE. CFG COMMANDS WRITTEN BY CODE.PY ARE
+# ANSWERED WITH ACK-ACK, AND WHILE CFG-MSG HAS GSV OR NAV-SAT SWITCHED ON, GENERATED ONES FOLLOW THE EPOCHS AT THAT
+# RATE. A UART REOPENED AT A NEW BAUD RATE CARRIES ON FROM THE SAME POINT IN THE CAPTURE
+# THE MAGNETOMETER TRACE IS ONE X,Y,Z LINE PER SAMPLE, USED IN A LOOP. WITHOUT ONE THE HEADING TURNS SLOWLY
+#
+# REPORTED: VIRTUAL SECONDS REPLAYED PER WALL SECOND, GPS MESSAGES PER CPU SECOND, AND PER TASK RUNS, CPU TIME AND
+# BYTES ALLOCATED (A SECOND PASS UNDER TRACEMALLOC, SO IT DOES NOT SKEW THE TIMINGS)
+# LABEL TEXT IS SNAPSHOT EVERY --SNAPSHOT-EVERY VIRTUAL SECONDS, --SAVE WRITES THE SNAPSHOTS AND --CHECK COMPARES
+# AGAINST A SAVED FILE, EXITING 1 ON ANY DIFFERENCE
+#
+# --SET NAME=VALUE OVERRIDES A USER ADJUSTABLE VARIABLE IN CODE.PY, --UBX SETS GPS_UBX_MODE
+# THE USB TELEMETRY PORT IS READ BY A HOST AT --USB-HOST-RATE BYTES PER SECOND (0 = NO PROGRAM HAS THE PORT OPEN),
+# --USB-OUT SAVES WHAT IT RECEIVED FOR TOOLS/TELEM_READ.PY
+# --CLOCK-PPM RUNS THE DEVICE CLOCK FAST OR SLOW, THE TIME SYNC REPORT SHOWS HOW WELL THE DRIFT AND THE SECOND WERE FOUND
+# (NOT AT AN --EPOCH-RATE ABOVE 1, THE CAPTURE'S SECONDS THEN ARRIVE FASTER THAN REAL ONES AND IT NEVER LOCKS)
+# --CONSOLE SECS:TEXT TYPES TEXT ON THE USB SERIAL CONSOLE AT A VIRTUAL TIME, SUCH AS 60:D FOR THE DEBUG PAGE OR 60:S
+# FOR THE SATELLITE PAGE
+# --FIX-GAP START:COUNT TAKES THE FIX AWAY FOR COUNT SYNTHETIC EPOCHS FROM START, THE TIME IS STILL SENT
+#
+# USAGE: python3 tools/replay.py [CAPTURE_FILE] [--mag TRACE] [--epochs N] [--epoch-rate HZ] [--ubx] [--clock-ppm PPM] [--set NAME=VALUE] [--console SECS:TEXT] [--fix-gap START:COUNT] [--save FILE | --check FILE]
+
+import argparse
+import calendar
+import gc
+import heapq
+import io
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time as host_time
+import tracemalloc
+import types
+
+from contextlib import redirect_stdout
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gps_gen import gps_track, nmea_epoch, nmea_gsv, sky_track, ubx_epoch, ubx_nav_sat
+
+# RTC TIME AT POWER UP ON THE DEVICE
+rtc_power_up = 946684800
+
+# HEAP SIZE REPORTED TO CODE.PY FOR GC.MEM_FREE() / GC.MEM_ALLOC()
+fake_heap_free = 120000
+fake_heap_used = 60000
+
+# VIRTUAL SECONDS WITHOUT NEW UART DATA BEFORE THE REPLAY ENDS, AND A HARD LIMIT IN CASE THERE IS NEVER A FIX
+replay_grace = 2
+replay_limit = 86400 * 7
+
+class stop_replay(Exception):
+    pass
+
+# VIRTUAL CLOCK, SHARED BY THE TIME, ASYNCIO AND UART STAND INS
+# THE DEVICE'S MONOTONIC CLOCK RUNS PPM FAST (OR SLOW) AGAINST IT LIKE THE RP2040 CRYSTAL AGAINST GPS TIME
+class virtual_clock:
+    def __init__(self):
+        self.ns = 0
+        self.end_ns = None
+        self.ppm = 0
+
+    def local_ns(self):
+        return self.ns + self.ns * self.ppm // 1000000
+
+    def advance(self, ns):
+        self.ns += ns
+
+        if self.end_ns is not None and self.ns >= self.end_ns:
+            raise stop_replay()
+
+        if self.ns >= replay_limit * 1000000000:
+            raise stop_replay()
+
+clock = virtual_clock()
+
+# UART STAND IN, RELEASES THE CAPTURE EPOCH_HZ EPOCHS PER SECOND AT THE BAUD RATE
+class fake_uart:
+    capture = b''
+    epoch_hz = 1
+    active = None
+
+    # UART1 RATE SET BY CFG-MSG FOR EACH GENERATED MESSAGE, (CLASS, ID): RATE
+    msg_rates = {}
+
+    def __init__(self, tx=None, rx=None, baudrate=9600, timeout=1, receiver_buffer_size=64):
+        self.baudrate = baudrate
+        self.bytes_per_sec = baudrate // 10
+        self.buffer_size = receiver_buffer_size
+        self.rx = bytearray()
+        last = fake_uart.active
+
+        # A REOPENED UART PICKS UP THE STREAM WHERE THE LAST ONE LEFT IT, BYTES IT HAD BUFFERED ARE LOST
+        if last:
+            self.overflow = last.overflow
+            self.start_ns = last.start_ns
+            self.pos = last.pos
+            self.epochs = last.epochs
+            self.epoch = last.epoch
+            self.extra = last.extra
+            self.extra_pos = last.extra_pos
+            self.extra_ns = last.extra_ns
+        else:
+            self.overflow = 0
+            self.start_ns = clock.ns
+            self.pos = 0
+            self.epochs = split_epochs(self.capture)
+            self.epoch = 0
+            self.extra = b''
+            self.extra_pos = 0
+            self.extra_ns = 0
+
+        fake_uart.active = self
+
+    # MOVE BYTES THAT HAVE ARRIVED BY NOW INTO THE RECEIVE BUFFER
+    def arrive(self):
+        data = self.capture
+        elapsed = clock.ns - self.start_ns
+
+        while self.epoch < len(self.epochs):
+            # GENERATED MESSAGES FOLLOWING THE LAST EPOCH, ALSO AT THE BAUD RATE
+            if self.extra_pos < len(self.extra):
+                arrived = min(len(self.extra), (elapsed - self.extra_ns) * self.bytes_per_sec // 1000000000)
+
+                if arrived > self.extra_pos:
+                    self.receive(self.extra[self.extra_pos:arrived])
+                    self.extra_pos = arrived
+
+                if self.extra_pos < len(self.extra):
+                    break
+
+            start, end = self.epochs[self.epoch]
+            epoch_ns = self.epoch * 1000000000 // self.epoch_hz
+
+            if elapsed < epoch_ns:
+                break
+
+            arrived = min(end, start + (elapsed - epoch_ns) * self.bytes_per_sec // 1000000000)
+
+            if arrived > self.pos:
+                self.receive(data[self.pos:arrived])
+                self.pos = arrived
+
+            if self.pos < end:
+                break
+
+            self.extra = self.sky_messages(self.epoch)
+            self.extra_pos = 0
+            self.extra_ns = epoch_ns + (end - start) * 1000000000 // self.bytes_per_sec
+            self.epoch += 1
+
+        if self.epoch >= len(self.epochs) and not self.rx and clock.end_ns is None:
+            clock.end_ns = clock.ns + replay_grace * 1000000000
+
+    # BYTES THAT DO NOT FIT IN THE RECEIVE BUFFER ARE LOST
+    def receive(self, chunk):
+        room = self.buffer_size - len(self.rx)
+        self.rx += chunk[:room]
+        self.overflow += max(len(chunk) - room, 0)
+
+    # GSV / NAV-SAT AFTER AN EPOCH, IF SWITCHED ON AND DUE
+    def sky_messages(self, epoch):
+        secs = 43200 + epoch // self.epoch_hz
+        out = b''
+        rate = self.msg_rates.get((0xF0, 0x03), 0)
+
+        if rate and epoch % rate == 0:
+            out += nmea_gsv(sky_track(secs))
+
+        rate = self.msg_rates.get((0x01, 0x35), 0)
+
+        if rate and epoch % rate == 0:
+            out += ubx_nav_sat(secs, sky_track(secs))
+
+        return out
+
+    @property
+    def in_waiting(self):
+        self.arrive()
+        return len(self.rx)
+
+    def readinto(self, buf, nbytes=None):
+        self.arrive()
+        count = min(len(buf) if nbytes is None else nbytes, len(self.rx))
+        buf[:count] = self.rx[:count]
+        del self.rx[:count]
+        return count
+
+    def reset_input_buffer(self):
+        self.arrive()
+        self.rx = bytearray()
+
+    def deinit(self):
+        self.arrive()
+
+    # ANSWER UBX CFG COMMANDS WITH ACK-ACK, NOTING THE UART1 RATE OF EACH CFG-MSG
+    def write(self, frame):
+        if len(frame) >= 8 and frame[0] == 0xB5 and frame[1] == 0x62 and frame[2] == 0x06:
+            if frame[3] == 0x01 and len(frame) >= 16:
+                self.msg_rates[(frame[6], frame[7])] = frame[9]
+
+            ack = bytearray([0xB5, 0x62, 0x05, 0x01, 0x02, 0x00, frame[2], frame[3], 0, 0])
+            cs_a = 0
+            cs_b = 0
+
+            for c in ack[2:8]:
+                cs_a = (cs_a + c) & 0xFF
+                cs_b = (cs_b + cs_a) & 0xFF
+
+            ack[8] = cs_a
+            ack[9] = cs_b
+            self.rx += ack
+
+        return len(frame)
+
+# SPLIT A CAPTURE INTO (START, END) EPOCHS AT EACH RMC SENTENCE OR NAV-PVT FRAME
+def split_epochs(data):
+    starts = []
+
+    for marker in (b'RMC,', b'\xb5\x62\x01\x07'):
+        pos = data.find(marker)
+
+        while pos >= 0:
+            start = data.rfind(b'$', 0, pos) if marker == b'RMC,' else pos
+            starts.append(max(start, 0))
+            pos = data.find(marker, pos + 1)
+
+    # WITH BOTH PROTOCOLS IN ONE EPOCH ONLY THE FIRST MARKER OF EACH PAIR STARTS IT
+    starts = sorted(set(starts))
+
+    if starts and len(starts) > 1 and b'RMC,' in data and b'\xb5\x62\x01\x07' in data:
+        starts = starts[::2]
+
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+
+    return [(start, end) for start, end in zip(starts, starts[1:] + [len(data)])]
+
+# MAGNETOMETER STAND IN
+class fake_mag:
+    trace = None
+
+    def __init__(self, i2c):
+        self.index = 0
+
+    @property
+    def magnetic(self):
+        if self.trace:
+            sample = self.trace[self.index % len(self.trace)]
+            self.index += 1
+            return sample
+
+        angle = clock.ns / 1000000000 * math.pi / 30
+        return (30 * math.cos(angle), 30 * math.sin(angle), -40.0)
+
+class fake_rtc:
+    offset = rtc_power_up
+    source = None
+
+    @property
+    def datetime(self):
+        return host_time.gmtime(fake_time_time())
+
+    @datetime.setter
+    def datetime(self, value):
+        fake_rtc.offset = calendar.timegm(tuple(value)) - clock.ns // 1000000000
+
+def set_time_source(source):
+    fake_rtc.source = source
+
+# TIME STAND IN, UTC LIKE CIRCUITPYTHON
+def fake_time_time():
+    source = fake_rtc.source
+
+    if source is not None and source.datetime is not None:
+        return calendar.timegm(tuple(source.datetime))
+
+    return fake_rtc.offset + clock.ns // 1000000000
+
+def fake_sleep(secs):
+    clock.advance(int(secs * 1000000000))
+
+def fake_localtime(secs=None):
+    return host_time.gmtime(fake_time_time() if secs is None else secs)
+
+def fake_mktime(value):
+    return calendar.timegm(tuple(value))
+
+# ASYNCIO STAND IN, A DISCRETE EVENT LOOP ON THE VIRTUAL CLOCK
+class fake_sleep_await:
+    def __init__(self, secs):
+        self.secs = secs
+
+    def __await__(self):
+        yield ('sleep', self.secs)
+
+class fake_gather_await:
+    def __init__(self, coros):
+        self.coros = coros
+
+    def __await__(self):
+        yield ('gather', self.coros)
+
+def fake_async_run(coro):
+    queue = []
+    seq = 0
+    heapq.heappush(queue, (clock.ns, seq, coro))
+
+    while queue:
+        wake_ns, _, task = heapq.heappop(queue)
+
+        if wake_ns > clock.ns:
+            clock.advance(wake_ns - clock.ns)
+
+        try:
+            request = task.send(None)
+        except StopIteration:
+            continue
+
+        kind, value = request
+
+        if kind == 'gather':
+            for child in value:
+                seq += 1
+                heapq.heappush(queue, (clock.ns, seq, child))
+        else:
+            seq += 1
+            heapq.heappush(queue, (clock.ns + int(value * 1000000000), seq, task))
+
+# DISPLAY STAND INS
+class fake_group(list):
+    def __init__(self, x=0, y=0, **kwargs):
+        super().__init__()
+        self.x = x
+        self.y = y
+
+class fake_tile_grid(list):
+    def __init__(self, bitmap, pixel_shader=None, width=1, height=1, tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        super().__init__([default_tile] * (width * height))
+
+class fake_palette(list):
+    def __init__(self, count):
+        super().__init__([0] * count)
+
+    def make_transparent(self, index):
+        pass
+
+class fake_bitmap:
+    def __init__(self, *args):
+        self.pixel_shader = None
+
+# PIXEL BITMAP, COUNTS THE PIXELS SET SO A DRAWING CAN BE CHECKED
+class fake_pixels:
+    def __init__(self, width, height, colors):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height)
+
+    def __setitem__(self, xy, value):
+        x, y = xy
+        assert 0 <= x < self.width and 0 <= y < self.height, (x, y)
+        self.pixels[y * self.width + x] = value
+
+    def fill(self, value):
+        self.pixels[:] = bytes([value]) * len(self.pixels)
+
+    @property
+    def set_count(self):
+        return len(self.pixels) - self.pixels.count(0)
+
+def fill_region(bitmap, x1, y1, x2, y2, value):
+    for y in range(y1, y2):
+        for x in range(x1, x2):
+            bitmap[x, y] = value
+
+class fake_glyph:
+    def __init__(self, code):
+        self.tile_index = code
+
+# TILE INDEX IS THE CHARACTER CODE, SO NUM_FIELD CELLS READ BACK AS TEXT
+class fake_font:
+    bitmap = None
+
+    def get_bounding_box(self):
+        return (6, 12)
+
+    def get_glyph(self, code):
+        return fake_glyph(code)
+
+class fake_display:
+    def __init__(self, bus, width=128, height=128):
+        self.auto_refresh = True
+        self.refreshes = 0
+
+    def show(self, group):
+        self.group = group
+
+    def refresh(self, **kwargs):
+        self.refreshes += 1
+        return True
+
+class fake_label:
+    def __init__(self, font, text='', color=0, x=0, y=0, **kwargs):
+        self.text = text
+        self.color = color
+        self.x = x
+        self.y = y
+
+class fake_progress_bar:
+    def __init__(self, position, size, value=0, **kwargs):
+        self.value = value
+        self.bar_color = 0
+
+# DISPLAY BUS, KEEPS THE LAST COMMAND SENT DIRECTLY TO THE PANEL
+class fake_bus:
+    def __init__(self, *args, **kwargs):
+        self.commands = 0
+        self.last_command = None
+
+    def send(self, command, data):
+        self.commands += 1
+        self.last_command = (command, bytes(data))
+
+# USB DATA PORT, THE HOST EMPTIES A TX_SIZE BYTE BUFFER AT HOST_RATE BYTES PER SECOND
+class fake_usb_data:
+    host_rate = 100000
+    tx_size = 256
+
+    def __init__(self):
+        self.connected = self.host_rate > 0
+        self.write_timeout = None
+        self.pending = 0
+        self.last_ns = 0
+        self.received = bytearray()
+
+    # NEVER WAITS, TAKES WHAT FITS IN THE BUFFER
+    def write(self, data):
+        self.pending = max(self.pending - (clock.ns - self.last_ns) * self.host_rate // 1000000000, 0)
+        self.last_ns = clock.ns
+        count = min(len(data), self.tx_size - self.pending)
+        self.pending += count
+        self.received += data[:count]
+        return count
+
+# USB SERIAL CONSOLE, STANDS IN FOR SUPERVISOR.RUNTIME AND SYS.STDIN. TEXT IS TYPED AT ITS VIRTUAL TIME
+class fake_console:
+    typed = []
+
+    def __init__(self):
+        self.pending = sorted(self.typed)
+        self.buffer = ''
+
+    def arrive(self):
+        while self.pending and self.pending[0][0] <= clock.ns:
+            self.buffer += self.pending.pop(0)[1]
+
+    @property
+    def serial_bytes_available(self):
+        self.arrive()
+        return len(self.buffer)
+
+    def read(self, count):
+        self.arrive()
+        text = self.buffer[:count]
+        self.buffer = self.buffer[count:]
+        return text
+
+class fake_any:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return name
+
+def module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+def install_stubs():
+    module('board', **{pin: pin for pin in ('A0', 'SCK', 'MOSI', 'RX', 'TX', 'SDA', 'SCL', 'D25', 'D24', 'D4')})
+    module('busio', UART=fake_uart, SPI=fake_any, I2C=fake_any)
+    module('displayio', Group=fake_group, TileGrid=fake_tile_grid, Palette=fake_palette, Bitmap=fake_pixels, OnDiskBitmap=fake_bitmap, FourWire=fake_bus, release_displays=lambda: None)
+    module('bitmaptools', fill_region=fill_region)
+    module('terminalio', FONT=fake_font())
+    module('analogio', AnalogIn=fake_any)
+    module('rtc', RTC=fake_rtc, set_time_source=set_time_source)
+    module('microcontroller', nvm=bytearray(b'\xff' * 4096))
+    module('supervisor', runtime=fake_console())
+    module('usb_cdc', data=fake_usb_data())
+    module('adafruit_ssd1351', SSD1351=fake_display)
+    module('adafruit_lsm303dlh_mag', LSM303DLH_Mag=fake_mag)
+    module('adafruit_display_text')
+    module('adafruit_display_text.bitmap_label', Label=fake_label)
+    sys.modules['adafruit_display_text'].bitmap_label = sys.modules['adafruit_display_text.bitmap_label']
+    module('adafruit_progressbar')
+    module('adafruit_progressbar.horizontalprogressbar', HorizontalProgressBar=fake_progress_bar, HorizontalFillDirection=fake_any())
+    module('asyncio', run=fake_async_run, sleep=fake_sleep_await, gather=lambda *coros: fake_gather_await(coros), create_task=lambda coro: coro)
+    gc.mem_free = lambda: fake_heap_free
+    gc.mem_alloc = lambda: fake_heap_used
+    module('time', monotonic=lambda: clock.local_ns() / 1000000000, monotonic_ns=clock.local_ns, sleep=fake_sleep, time=fake_time_time, localtime=fake_localtime, mktime=fake_mktime, struct_time=host_time.struct_time)
+
+# RESET ALL STATE SO EACH PASS STARTS FROM POWER UP
+def reset(battery):
+    clock.ns = 0
+    clock.end_ns = None
+    fake_rtc.offset = rtc_power_up
+    fake_rtc.source = None
+    fake_uart.active = None
+    fake_uart.msg_rates = {}
+    sys.modules['microcontroller'].nvm = bytearray(b'\xff' * 4096)
+    sys.modules['supervisor'].runtime = fake_console()
+    sys.modules['usb_cdc'].data = fake_usb_data()
+    sys.modules['analogio'].AnalogIn = lambda pin: types.SimpleNamespace(value=battery)
+
+# TASK WRAPPER COLLECTING CPU TIME AND ALLOCATIONS
+class stage:
+    def __init__(self, func, trace_alloc):
+        self.func = func
+        self.trace_alloc = trace_alloc
+        self.runs = 0
+        self.cpu_ns = 0
+        self.max_ns = 0
+        self.alloc = 0
+
+    def __call__(self):
+        if self.trace_alloc:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        start = host_time.perf_counter_ns()
+        result = self.func()
+        elapsed = host_time.perf_counter_ns() - start
+
+        if self.trace_alloc:
+            self.alloc += tracemalloc.get_traced_memory()[1] - before
+
+        self.runs += 1
+        self.cpu_ns += elapsed
+        self.max_ns = max(self.max_ns, elapsed)
+
+        return result
+
+# TEXT OF EVERY LABEL ON THE DASHBOARD, BY CODE.PY VARIABLE NAME
+def snapshot(env):
+    names = {id(value): name for name, value in env.items()}
+    labels = {}
+
+    def walk(group):
+        for item in group:
+            name = names.get(id(item), '?')
+
+            if isinstance(item, fake_label):
+                labels[name] = item.text
+            elif isinstance(item, fake_progress_bar):
+                labels[name] = '{} {:06X}'.format(item.value, item.bar_color)
+            elif hasattr(item, 'grid'):
+                labels[name] = ''.join(chr(c) for c in item.grid)
+            elif isinstance(item, list):
+                walk(item)
+
+    walk(env['disp_group'])
+
+    return labels
+
+# CODE.PY WITH USER ADJUSTABLE VARIABLES REPLACED, EACH OVERRIDE IS NAME=VALUE WITH A PYTHON EXPRESSION AS THE VALUE
+def code_source(path, overrides):
+    with open(path) as f:
+        source = f.read()
+
+    for override in overrides:
+        name, value = override.split('=', 1)
+        source, count = re.subn(r'^{} = .*$'.format(re.escape(name.strip())), '{} = {}'.format(name.strip(), value), source, count=1, flags=re.M)
+
+        if not count:
+            sys.exit('NO USER VARIABLE NAMED {}'.format(name))
+
+    return source
+
+def run_pass(args, trace_alloc, track_dir):
+    reset(args.battery)
+    out = io.StringIO()
+
+    # KEEP THE TRACK LOG OFF THE HOST ROOT DIRECTORY
+    import track_log
+    track_log.open = lambda path, mode: open(os.path.join(track_dir, path.lstrip('/')), mode)
+
+    if trace_alloc:
+        tracemalloc.start()
+
+    wall_start = host_time.perf_counter()
+    stages = {}
+    snapshots = []
+    env = {}
+    stdin = sys.stdin
+    sys.stdin = sys.modules['supervisor'].runtime
+
+    try:
+        with redirect_stdout(out if not args.verbose else sys.stdout):
+            path = os.path.join(root, 'code.py')
+            env = {'__name__': 'replay', '__file__': path}
+            exec(compile(code_source(path, args.set), path, 'exec'), env)
+
+            for task in env['tasks']:
+                task.func = stages.setdefault(task.name, stage(task.func, trace_alloc))
+
+            # SNAPSHOT TASK, RUN BY THE SAME SCHEDULER ON THE VIRTUAL CLOCK
+            if args.snapshot_every:
+                env['tasks'] += (env['sched_task']('SNAPSHOT', lambda: snapshots.append((clock.ns // 1000000000, snapshot(env))), args.snapshot_every),)
+
+            env['main']()
+    except stop_replay:
+        pass
+    finally:
+        sys.stdin = stdin
+
+    wall = host_time.perf_counter() - wall_start
+
+    if trace_alloc:
+        tracemalloc.stop()
+
+    stages.pop('SNAPSHOT', None)
+
+    return env, stages, snapshots, wall, out.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a GPS capture through code.py')
+    parser.add_argument('capture', nargs='?', help='raw UART capture, NMEA and / or UBX')
+    parser.add_argument('--epochs', type=int, default=3600, help='synthetic epochs when no capture is given')
+    parser.add_argument('--ubx', action='store_true', help='synthetic capture as UBX NAV-PVT instead of NMEA')
+    parser.add_argument('--epoch-rate', type=int, default=1, help='capture epochs released per virtual second')
+    parser.add_argument('--parked', action='store_true', help='synthetic capture standing still instead of driving')
+    parser.add_argument('--fix-gap', metavar='START:COUNT', help='synthetic epochs without a fix')
+    parser.add_argument('--mag', help='magnetometer trace, one x,y,z line per sample')
+    parser.add_argument('--battery', type=int, default=48000, help='battery ADC value, keep it above bat_cutoff as code.py halts below it')
+    parser.add_argument('--snapshot-every', type=int, default=60, help='virtual seconds between label snapshots, 0 for none')
+    parser.add_argument('--save', help='write label snapshots to this file')
+    parser.add_argument('--check', help='compare label snapshots with this file')
+    parser.add_argument('--no-alloc', action='store_true', help='skip the allocation pass')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help='override a code.py user variable')
+    parser.add_argument('--console', action='append', default=[], metavar='SECS:TEXT', help='type on the USB serial console at a virtual time')
+    parser.add_argument('--usb-host-rate', type=int, default=100000, help='bytes per second the host reads from the telemetry port, 0 for not open')
+    parser.add_argument('--usb-out', help='save the telemetry the host received to this file')
+    parser.add_argument('--clock-ppm', type=int, default=0, help='error of the device clock against GPS time, parts per million')
+    parser.add_argument('--verbose', action='store_true', help='show code.py output')
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as f:
+            fake_uart.capture = f.read()
+    else:
+        epoch = ubx_epoch if args.ubx else nmea_epoch
+        no_fix = range(0)
+
+        if args.fix_gap:
+            start, count = (int(v) for v in args.fix_gap.split(':'))
+            no_fix = range(start, start + count)
+
+        if args.parked:
+            fake_uart.capture = gps_track(args.epochs, radius=0, epoch=lambda secs, lat, lon, alt, speed, track, fix: epoch(secs, lat, lon, 200, 0.0, 0.0, fix=fix), no_fix=no_fix)
+        else:
+            fake_uart.capture = gps_track(args.epochs, epoch=epoch, no_fix=no_fix)
+
+    fake_uart.epoch_hz = args.epoch_rate
+    clock.ppm = args.clock_ppm
+    fake_usb_data.host_rate = args.usb_host_rate
+
+    for typed in args.console:
+        secs, text = typed.split(':', 1)
+        fake_console.typed.append((int(float(secs) * 1000000000), text))
+
+    if args.ubx:
+        args.set.insert(0, 'gps_ubx_mode=True')
+
+    if args.mag:
+        with open(args.mag) as f:
+            fake_mag.trace = [tuple(float(v) for v in line.split(',')) for line in f if line.strip()]
+
+    install_stubs()
+    track_dir = tempfile.mkdtemp()
+
+    env, stages, snapshots, wall, output = run_pass(args, False, track_dir)
+
+    if 'gps_rx' not in env or not stages:
+        print(output)
+        print('REPLAY ENDED BEFORE THE DASHBOARD STARTED (NO FIX OR TIME IN THE CAPTURE?)')
+        sys.exit(1)
+
+    virtual = clock.ns / 1000000000
+    cpu_ns = sum(s.cpu_ns for s in stages.values())
+    gps_rx = env['gps_rx']
+    messages = gps_rx.nmea_count + gps_rx.ubx_count
+
+    print('VIRTUAL TIME   {:10.1f} S'.format(virtual))
+    print('WALL TIME      {:10.2f} S ({:.0f}X REAL TIME)'.format(wall, virtual / wall))
+    print('GPS MESSAGES   {:10d} ({} ERRORS, {} UART BYTES DROPPED)'.format(messages, gps_rx.nmea_errors + gps_rx.ubx_errors, env['serial'].overflow))
+    print('TASK CPU       {:10.3f} S ({:.0f} GPS MESSAGES / CPU S)'.format(cpu_ns / 1e9, messages * 1e9 / max(cpu_ns, 1)))
+    print('DISPLAY FRAMES {:10d}'.format(env['disp'].refreshes))
+
+    if 'power' in env:
+        print(env['power'].report())
+
+    if env.get('gps_high_rate'):
+        print(env['rate'].report())
+
+    if env.get('telem_mode'):
+        print(env['telem'].report())
+
+    # EPOCHS START ON THE WIRE EXACTLY ON THE VIRTUAL SECOND, SO THE FITTED START OF THE NEWEST SECOND, TAKEN BACK
+    # FROM THE DEVICE CLOCK TO VIRTUAL TIME, IS CHECKED AGAINST THE NEAREST ONE
+    sync = env['sync']
+    print(sync.report())
+    print(env['sky'].report())
+
+    if sync.locked:
+        start_ns = sync.base_ns * 1000000 / (1000000 + clock.ppm) - env['serial'].start_ns
+        period_ns = 1000000000 / fake_uart.epoch_hz
+        epoch = round(start_ns / period_ns)
+        print('TIME SYNC ERROR {:+9.1f} US AGAINST THE CAPTURE EPOCH, DRIFT ERROR {:+.2f} PPM'.format((start_ns - epoch * period_ns) / 1000, sync.drift_ppm - clock.ppm))
+
+    if args.usb_out:
+        with open(args.usb_out, 'wb') as f:
+            f.write(sys.modules['usb_cdc'].data.received)
+
+    allocs = {}
+
+    if not args.no_alloc:
+        _, alloc_stages, _, _, _ = run_pass(args, True, tempfile.mkdtemp())
+        allocs = {name: s.alloc / max(s.runs, 1) for name, s in alloc_stages.items()}
+
+    print()
+    print('{:10s} {:>8s} {:>10s} {:>10s} {:>10s} {:>12s}'.format('STAGE', 'RUNS', 'CPU MS', 'US/RUN', 'MAX US', 'BYTES/RUN'))
+
+    for name, s in stages.items():
+        alloc = '{:12.1f}'.format(allocs[name]) if name in allocs else '{:>12s}'.format('-')
+        print('{:10s} {:8d} {:10.2f} {:10.2f} {:10.2f} {}'.format(name, s.runs, s.cpu_ns / 1e6, s.cpu_ns / max(s.runs, 1) / 1000, s.max_ns / 1000, alloc))
+
+    if snapshots:
+        print()
+        print('LAST SNAPSHOT AT {} S'.format(snapshots[-1][0]))
+
+        for name, text in sorted(snapshots[-1][1].items()):
+            print('  {:16s} {!r}'.format(name, text))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(snapshots, f, indent=1)
+
+    if args.check:
+        with open(args.check) as f:
+            expected = json.load(f)
+
+        actual = json.loads(json.dumps(snapshots))
+
+        if actual != expected:
+            for (secs, labels), (_, old) in zip(actual, expected):
+                for name in sorted(set(labels) | set(old)):
+                    if labels.get(name) != old.get(name):
+                        print('DIFF AT {} S {}: {!r} != {!r}'.format(secs, name, labels.get(name), old.get(name)))
+
+            if len(actual) != len(expected):
+                print('SNAPSHOT COUNT {} != {}'.format(len(actual), len(expected)))
+
+            sys.exit(1)
+
+        print('SNAPSHOTS MATCH')
+
+if __name__ == '__main__':
+    main()
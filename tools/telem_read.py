@@ -0,0 +1,221 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE TOOL - READS THE USB TELEMETRY STREAM (TELEMETRY.PY) FROM THE DEVICE'S DATA SERIAL PORT OR A SAVED FILE
+#
+# BOTH FORMATS ARE RECOGNISED IN THE SAME STREAM: BINARY FRAMES BY THEIR SYNC BYTES AND CHECKSUM, NMEA SENTENCES BY
+# THEIR CHECKSUM. EACH RECORD IS PRINTED AS ONE LINE OF UTC TIME, POSITION, SPEED, TRACK, SATELLITES AND LOCATOR
+#
+# --BENCH SECS READS FOR THAT LONG (A FILE IS READ TO THE END) AND REPORTS THE SUSTAINED THROUGHPUT IN BYTES AND
+# RECORDS PER SECOND, CHECKSUM ERRORS, AND BINARY RECORDS MISSING FROM THE SEQUENCE (DROPPED BY THE DEVICE'S RING
+# WHILE THE HOST WAS NOT KEEPING UP). TO LOAD THE LINK SET TELEM_RATE LOW IN CODE.PY, SUCH AS 0.01
+#
+# A SERIAL PORT NEEDS PYSERIAL (pip install pyserial)
+#
+# USAGE: python3 tools/telem_read.py PORT_OR_FILE [--bench SECS] [--quiet]
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from telemetry import telem_body_len, telem_format, telem_frame_len, telem_pos_valid, telem_sync, telem_version
+from ubx import ubx_checksum
+
+# LONGEST NMEA SENTENCE KEPT WHILE LOOKING FOR ITS END
+nmea_max_len = 82
+
+class telem_parser:
+    def __init__(self):
+        self.buf = bytearray()
+        self.records = 0
+        self.errors = 0
+        self.missing = 0
+        self.last_seq = None
+
+        # RMC / GGA FIELDS WAITING FOR THE $PGRID THAT ENDS THE RECORD
+        self.fix = None
+
+    # ADD BYTES, RETURNS THE RECORDS COMPLETED BY THEM
+    def feed(self, data):
+        self.buf += data
+        buf = self.buf
+        out = []
+        pos = 0
+
+        while pos < len(buf):
+            c = buf[pos]
+
+            if c == telem_sync[0]:
+                if len(buf) - pos < telem_frame_len:
+                    break
+
+                if buf[pos + 1] == telem_sync[1] and buf[pos + 2] == telem_version:
+                    record = self.binary(buf, pos)
+
+                    if record:
+                        out.append(record)
+                        pos += telem_frame_len
+                        continue
+
+                    self.errors += 1
+
+                pos += 1
+            elif c == 0x24:
+                end = buf.find(b'\n', pos)
+
+                if end < 0:
+                    if len(buf) - pos > nmea_max_len:
+                        self.errors += 1
+                        pos += 1
+                        continue
+
+                    break
+
+                record = self.nmea(bytes(buf[pos:end + 1]))
+
+                if record:
+                    out.append(record)
+
+                pos = end + 1
+            else:
+                pos += 1
+
+        del buf[:pos]
+        self.records += len(out)
+
+        return out
+
+    def binary(self, buf, pos):
+        checksum = ubx_checksum(buf, pos + 2, pos + telem_body_len)
+
+        if checksum != buf[pos + telem_body_len] | (buf[pos + telem_body_len + 1] << 8):
+            return None
+
+        _, _, seq, flags, secs, lat, lon, alt, speed, track, sats, grid = struct.unpack_from(telem_format, buf, pos)
+
+        if self.last_seq is not None:
+            self.missing += (seq - self.last_seq - 1) & 0xFFFF
+
+        self.last_seq = seq
+        valid = flags & telem_pos_valid
+
+        return {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(secs)),
+            'lat': lat / 1e7 if valid else None,
+            'lon': lon / 1e7 if valid else None,
+            'alt': alt,
+            'speed': speed / 10,
+            'track': track / 10,
+            'sats': sats,
+            'grid': grid.rstrip(b'\x00').decode('ascii', 'replace'),
+        }
+
+    # RMC AND GGA CARRY THE FIX, $PGRID CLOSES THE RECORD
+    def nmea(self, line):
+        text = line.decode('ascii', 'replace').strip()
+
+        if len(text) < 4 or text[-3] != '*':
+            self.errors += 1
+            return None
+
+        checksum = 0
+
+        for c in text[1:-3]:
+            checksum ^= ord(c)
+
+        if '{:02X}'.format(checksum) != text[-2:].upper():
+            self.errors += 1
+            return None
+
+        fields = text[1:-3].split(',')
+
+        if fields[0].endswith('RMC'):
+            self.fix = {'time': fields[1], 'date': fields[9], 'lat': nmea_degrees(fields[3], fields[4]), 'lon': nmea_degrees(fields[5], fields[6]), 'speed': float(fields[7] or 0), 'track': float(fields[8] or 0)}
+        elif fields[0].endswith('GGA') and self.fix is not None:
+            self.fix['sats'] = int(fields[7] or 0)
+            self.fix['alt'] = int(float(fields[9] or 0))
+        elif fields[0] == 'PGRID' and self.fix is not None:
+            fix = self.fix
+            hhmmss = fix['time']
+            date = fix['date']
+            stamp = '20{}-{}-{} {}:{}:{}'.format(date[4:6], date[2:4], date[0:2], hhmmss[0:2], hhmmss[2:4], hhmmss[4:6]) if hhmmss and date else ''
+            return {'time': stamp, 'lat': fix['lat'], 'lon': fix['lon'], 'alt': fix.get('alt', 0), 'speed': fix['speed'], 'track': fix['track'], 'sats': fix.get('sats', 0), 'grid': fields[1]}
+
+        return None
+
+# DDMM.MMMMM AND HEMISPHERE TO DEGREES, NONE IF EMPTY
+def nmea_degrees(value, hemi):
+    if not value:
+        return None
+
+    dot = value.index('.')
+    degrees = int(value[:dot - 2]) + float(value[dot - 2:]) / 60
+
+    return -degrees if hemi in ('S', 'W') else degrees
+
+def format_record(record):
+    position = '{:10.6f} {:11.6f}'.format(record['lat'], record['lon']) if record['lat'] is not None else '{:>22s}'.format('NO FIX')
+    return '{:19s} {} {:5d}M {:5.1f}KN {:5.1f} {:2d} SATS {}'.format(record['time'], position, record['alt'], record['speed'], record['track'], record['sats'], record['grid'])
+
+def open_source(name):
+    if os.path.exists(name) and not name.startswith('/dev/') and not name.upper().startswith('COM'):
+        return open(name, 'rb'), False
+
+    try:
+        import serial
+    except ImportError:
+        sys.exit('READING A SERIAL PORT NEEDS PYSERIAL: pip install pyserial')
+
+    return serial.Serial(name, timeout=0.1), True
+
+def main():
+    parser = argparse.ArgumentParser(description='USB telemetry reader')
+    parser.add_argument('source', help='data serial port of the device, or a saved stream')
+    parser.add_argument('--bench', type=float, default=0, help='read for this many seconds and report the throughput')
+    parser.add_argument('--quiet', action='store_true', help='do not print records')
+    args = parser.parse_args()
+
+    source, is_port = open_source(args.source)
+    telem = telem_parser()
+    total = 0
+    start = time.perf_counter()
+
+    try:
+        while True:
+            data = source.read(4096)
+
+            if not data:
+                if not is_port:
+                    break
+
+                if args.bench and time.perf_counter() - start >= args.bench:
+                    break
+
+                continue
+
+            total += len(data)
+
+            for record in telem.feed(data):
+                if not args.quiet and not args.bench:
+                    print(format_record(record))
+
+            if args.bench and is_port and time.perf_counter() - start >= args.bench:
+                break
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    if args.bench:
+        print('BYTES          {:10d} ({:.0f} B/S)'.format(total, total / elapsed))
+        print('RECORDS        {:10d} ({:.1f} /S)'.format(telem.records, telem.records / elapsed))
+        print('ERRORS         {:10d}'.format(telem.errors))
+        print('MISSING        {:10d} (BINARY SEQUENCE GAPS)'.format(telem.missing))
+        print('ELAPSED        {:10.2f} S'.format(elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# HOST SIDE TOOL - DECODES A TRACK_LOG.PY RING FILE COPIED FROM THE DEVICE TO CSV OR GPX
+#
+# BLOCKS ARE SORTED BY SEQUENCE NUMBER, SO THE OUTPUT IS IN TIME ORDER EVEN AFTER THE RING HAS WRAPPED
+#
+# WITH --GRID THE CSV GETS A MAIDENHEAD LOCATOR COLUMN OF THAT MANY CHARACTERS, CONVERTED FROM THE LOGGED INTEGER
+# POSITIONS SO CELL EDGES ARE EXACT
+#
+# USAGE: python3 tools/track_decode.py TRACK_FILE [--gpx] [--grid CHARS] [--block-size BYTES] [-o OUTPUT]
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grid import grid_batch
+from track_log import track_fields, track_header, track_header_len, track_key, track_key_len, track_magic, track_version
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+
+    while True:
+        c = data[pos]
+        pos += 1
+        value |= (c & 0x7F) << shift
+        shift += 7
+
+        if not c & 0x80:
+            break
+
+    value = value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+    return value, pos
+
+# DECODE ONE BLOCK TO A LIST OF FIELD LISTS
+def decode_block(block):
+    _, _, count, _ = struct.unpack_from(track_header, block)
+    fix = list(struct.unpack_from(track_key, block, track_header_len))
+    fixes = [list(fix)]
+    pos = track_header_len + track_key_len
+
+    for _ in range(count - 1):
+        for i in range(track_fields):
+            delta, pos = read_varint(block, pos)
+            fix[i] += delta
+
+        fixes.append(list(fix))
+
+    return fixes
+
+# DECODE A WHOLE RING FILE, OLDEST FIX FIRST
+def decode_track(data, block_size=512):
+    blocks = []
+
+    for start in range(0, len(data) - block_size + 1, block_size):
+        block = data[start:start + block_size]
+        magic, version, count, seq = struct.unpack_from(track_header, block)
+
+        if magic == track_magic and version == track_version and count:
+            blocks.append((seq, block))
+
+    fixes = []
+
+    for _, block in sorted(blocks):
+        fixes.extend(decode_block(block))
+
+    return fixes
+
+def fix_values(fix):
+    secs, lat, lon, alt, speed, track, sats = fix
+    return secs, lat / 100000, lon / 100000, alt, speed / 10, track / 10, sats
+
+def utc_text(secs):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(secs))
+
+def write_csv(fixes, out, grid_chars=0):
+    if grid_chars:
+        locators = grid_batch([fix[1] for fix in fixes], [fix[2] for fix in fixes], grid_chars, 100000)
+
+    out.write('utc,latitude,longitude,altitude_m,speed_knots,track_deg,satellites' + (',locator\n' if grid_chars else '\n'))
+
+    for i, fix in enumerate(fixes):
+        secs, lat, lon, alt, speed, track, sats = fix_values(fix)
+        out.write('{},{:.5f},{:.5f},{},{:.1f},{:.1f},{}'.format(utc_text(secs), lat, lon, alt, speed, track, sats) + (',' + locators[i] + '\n' if grid_chars else '\n'))
+
+def write_gpx(fixes, out):
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<gpx version="1.1" creator="RP2040-GPS" xmlns="http://www.topografix.com/GPX/1/1">\n')
+    out.write('<trk><name>RP2040-GPS</name><trkseg>\n')
+
+    for fix in fixes:
+        secs, lat, lon, alt, speed, track, sats = fix_values(fix)
+        out.write('<trkpt lat="{:.5f}" lon="{:.5f}"><ele>{}</ele><time>{}</time><sat>{}</sat></trkpt>\n'.format(lat, lon, alt, utc_text(secs), sats))
+
+    out.write('</trkseg></trk>\n</gpx>\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Track log decoder')
+    parser.add_argument('track', help='track log file from the device')
+    parser.add_argument('--gpx', action='store_true', help='write GPX instead of CSV')
+    parser.add_argument('--grid', type=int, default=0, choices=(0, 2, 4, 6, 8, 10), help='add a locator column with this many characters')
+    parser.add_argument('--block-size', type=int, default=512, help='block size the log was written with')
+    parser.add_argument('-o', '--output', help='output file, default stdout')
+    args = parser.parse_args()
+
+    with open(args.track, 'rb') as f:
+        fixes = decode_track(f.read(), args.block_size)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+
+    if args.gpx:
+        write_gpx(fixes, out)
+    else:
+        write_csv(fixes, out, args.grid)
+
+    if args.output:
+        out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# GPS TRACK LOGGER
+#
+# FIXES ARE PACKED INTO FIXED SIZE BLOCKS IN RAM AND WRITTEN TO A PREALLOCATED FILE USED AS A RING OF BLOCKS, SO THE
+# FILE NEVER GROWS AND WRITES ARE SPREAD OVER THE WHOLE FILE INSTEAD OF REWRITING THE SAME FLASH SECTORS
+#
+# BLOCK: HEADER (MAGIC, VERSION, RECORD COUNT, SEQUENCE NUMBER), A KEY RECORD HOLDING THE FIRST FIX AS A FIXED SIZE
+# STRUCT, THEN ONE DELTA RECORD PER FIX, EACH FIELD AS THE ZIGZAG VARINT DIFFERENCE FROM THE PREVIOUS FIX. A STATIONARY
+# OR SLOW FIX TAKES 7 TO 10 BYTES. EVERY BLOCK STARTS WITH A KEY RECORD SO EACH CAN BE DECODED ON ITS OWN, AND THE
+# SEQUENCE NUMBER GIVES THE ORDER ONCE THE RING HAS WRAPPED. THE REST OF A BLOCK IS ZERO FILLED
+#
+# FIX FIELDS: UTC SECONDS, LAT / LON IN 1E-5 DEGREES (ABOUT 1M), ALTITUDE IN METERS, SPEED IN 0.1 KNOTS,
+# TRACK IN 0.1 DEGREES, SATELLITES
+#
+# ADD() ONLY ENCODES INTO RAM. A FULL BLOCK IS SWAPPED FOR THE SPARE BUFFER AND LEFT FOR FLUSH(), WHICH IS RUN FROM ITS
+# OWN TASK, SO FILE WRITES NEVER HAPPEN ON THE GPS PATH. FLUSH() ALSO WRITES THE PARTLY FILLED BLOCK WHEN ASKED TO, IT
+# IS REWRITTEN IN PLACE UNTIL IT IS FULL
+#
+# THE FILESYSTEM IS ONLY WRITABLE BY CODE.PY WHEN BOOT.PY HAS REMOUNTED IT, IF IT IS NOT THE LOGGER STAYS DISABLED
+
+import struct
+
+track_magic = b'TL'
+track_version = 1
+
+track_header = '<2sBHI'
+track_header_len = struct.calcsize(track_header)
+track_key = '<IiihHHB'
+track_key_len = struct.calcsize(track_key)
+track_fields = 7
+
+# LARGEST DELTA RECORD, 5 BYTES PER FIELD
+track_max_delta = track_fields * 5
+
+# APPEND VALUE AS A ZIGZAG VARINT TO BUF AT POS, RETURNS THE NEW POSITION
+def track_varint(buf, pos, value):
+    value = value << 1 if value >= 0 else ((-value) << 1) - 1
+
+    while value >= 0x80:
+        buf[pos] = (value & 0x7F) | 0x80
+        value >>= 7
+        pos += 1
+
+    buf[pos] = value
+
+    return pos + 1
+
+class track_log:
+    def __init__(self, path, blocks=256, block_size=512):
+        self.path = path
+        self.blocks = blocks
+        self.block_size = block_size
+
+        # BLOCK BEING FILLED AND THE SPARE, SWAPPED WHEN FULL
+        self.buf = bytearray(block_size)
+        self.spare = bytearray(block_size)
+        self.pos = 0
+        self.count = 0
+
+        # FULL BLOCK WAITING TO BE WRITTEN
+        self.pending = False
+        self.pending_slot = 0
+        self.pending_seq = 0
+
+        # PREVIOUS FIX, DELTAS ARE TAKEN FROM IT
+        self.prev = [0] * track_fields
+        self.curr = [0] * track_fields
+
+        self.slot = 0
+        self.seq = 0
+        self.file = None
+
+        # STATISTICS
+        self.records = 0
+        self.drops = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    # OPEN OR CREATE THE LOG FILE AND CONTINUE AFTER THE NEWEST BLOCK, RETURNS FALSE IF THE FILESYSTEM IS READ ONLY
+    def open(self):
+        try:
+            self.file = open(self.path, 'r+b')
+        except OSError:
+            try:
+                self.file = open(self.path, 'w+b')
+            except OSError:
+                return False
+
+        # PREALLOCATE THE RING SO LATER WRITES NEVER CHANGE THE FILE SIZE
+        self.file.seek(0, 2)
+        size = self.file.tell()
+
+        if size < self.blocks * self.block_size:
+            zero = bytes(self.block_size)
+
+            for _ in range(size // self.block_size, self.blocks):
+                self.file.write(zero)
+
+            self.file.flush()
+
+        # FIND THE NEWEST BLOCK, THE HEADERS ARE READ ONE AT A TIME
+        header = bytearray(track_header_len)
+        newest = -1
+
+        for slot in range(self.blocks):
+            self.file.seek(slot * self.block_size)
+            self.file.readinto(header)
+            magic, version, count, seq = struct.unpack_from(track_header, header)
+
+            if magic == track_magic and version == track_version and (newest < 0 or seq > self.seq):
+                newest = slot
+                self.seq = seq
+
+        if newest >= 0:
+            self.slot = (newest + 1) % self.blocks
+            self.seq += 1
+
+        return True
+
+    # START A NEW BLOCK WITH A KEY RECORD FOR THE CURRENT FIX
+    def start_block(self):
+        self.count = 1
+        struct.pack_into(track_key, self.buf, track_header_len, *self.curr)
+        self.pos = track_header_len + track_key_len
+
+    # ADD A FIX, ONLY TOUCHES THE RAM BUFFERS
+    def add(self, secs, latitude, longitude, altitude_m, speed_knots, track_deg, satellites):
+        if self.file is None:
+            return
+
+        curr = self.curr
+        curr[0] = int(secs)
+        curr[1] = int(latitude * 100000)
+        curr[2] = int(longitude * 100000)
+        curr[3] = int(altitude_m)
+        curr[4] = int(speed_knots * 10)
+        curr[5] = int(track_deg * 10)
+        curr[6] = satellites
+
+        self.records += 1
+
+        if self.count == 0:
+            self.start_block()
+        elif self.pos + track_max_delta > self.block_size:
+            # BLOCK FULL, HAND IT TO FLUSH() AND START THE NEXT ONE IN THE SPARE BUFFER
+            # IF THE LAST FULL BLOCK HAS NOT BEEN WRITTEN YET THIS ONE IS DROPPED
+            if self.pending:
+                self.drops += self.count
+            else:
+                self.seal()
+                self.buf, self.spare = self.spare, self.buf
+                self.pending = True
+                self.pending_slot = self.slot
+                self.pending_seq = self.seq
+                self.slot = (self.slot + 1) % self.blocks
+                self.seq += 1
+
+            self.start_block()
+        else:
+            buf = self.buf
+            prev = self.prev
+            pos = self.pos
+
+            for i in range(track_fields):
+                pos = track_varint(buf, pos, curr[i] - prev[i])
+
+            self.pos = pos
+            self.count += 1
+
+        self.prev, self.curr = self.curr, self.prev
+
+    # FILL IN THE HEADER AND CLEAR THE UNUSED END OF THE CURRENT BLOCK
+    def seal(self):
+        buf = self.buf
+        struct.pack_into(track_header, buf, 0, track_magic, track_version, self.count, self.seq)
+
+        for i in range(self.pos, self.block_size):
+            buf[i] = 0
+
+    def write(self, slot, buf):
+        self.file.seek(slot * self.block_size)
+        self.file.write(buf)
+        self.file.flush()
+        self.writes += 1
+        self.bytes_written += self.block_size
+
+    # WRITE A FULL BLOCK IF ONE IS WAITING, AND THE PARTLY FILLED BLOCK IF PARTIAL IS SET
+    def flush(self, partial=False):
+        if self.file is None:
+            return
+
+        if self.pending:
+            self.write(self.pending_slot, self.spare)
+            self.pending = False
+
+        if partial and self.count:
+            self.seal()
+            self.write(self.slot, self.buf)
+
+    def report(self):
+        return 'TRACK  {:6d} RECORDS {:6d} DROPS {:5d} WRITES {:8d} BYTES'.format(self.records, self.drops, self.writes, self.bytes_written)
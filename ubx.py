@@ -0,0 +1,334 @@
+# HAM RADIO GPS
+# 2022 DOUGLAS GRAHAM, AB9XA
+#
+# U-BLOX UBX PROTOCOL SUPPORT
+#
+# FRAME CODEC:
+# UBX_TEMPLATE() PREBUILDS A FRAME WITH THE SYNC CHARACTERS, CLASS, ID AND LENGTH FILLED IN. THE PAYLOAD IS WRITTEN
+# IN PLACE AND UBX_SEAL() WRITES THE CHECKSUM INTO THE LAST TWO BYTES. UBX_CHECKSUM() WALKS A MEMORYVIEW AND
+# RETURNS A SMALL INT, SO CHECKING OR SEALING A FRAME ALLOCATES NOTHING
+#
+# UBX_CONFIG SENDS A BATCH OF CONFIGURATION COMMANDS BACK TO BACK AND MATCHES THE ACK/NAK REPLIES AS THEY ARRIVE,
+# WITH A DEADLINE PER COMMAND AND A BOUNDED NUMBER OF RETRIES WITH EXPONENTIAL BACKOFF
+#
+# UBX_GPS DECODES UBX-NAV-PVT AND PROVIDES THE SAME ATTRIBUTES AS NMEA.NMEA_GPS SO EITHER CAN BE USED BY CODE.PY
+# ONE 100 BYTE NAV-PVT FRAME PER EPOCH REPLACES THE RMC + GGA SENTENCES AND CARRIES TIME VALIDITY FLAGS
+# IT IS DECODED WITH STRUCT.UNPACK_FROM DIRECTLY FROM THE DEMUX PAYLOAD BUFFER
+#
+# UBX_MGA_INI_POS() / UBX_MGA_INI_TIME() BUILD ASSISTANCE FRAMES THAT GIVE THE RECEIVER AN APPROXIMATE POSITION AND
+# TIME AT BOOT SO IT CAN START A WARM SEARCH, THE RECEIVER DOES NOT ACK THEM UNLESS AIDING ACKS ARE ENABLED
+#
+# FRAMES ARE RECEIVED THROUGH GPS_STREAM.GPS_DEMUX, WHICH CALLS DECODE_UBX() ON EACH REGISTERED DECODER
+
+import struct
+import time
+
+# UBX SYNC CHARACTERS
+ubx_sync_1 = 0xB5
+ubx_sync_2 = 0x62
+
+# SYNC, CLASS, ID AND LENGTH BEFORE THE PAYLOAD, CHECKSUM AFTER
+ubx_header_len = 6
+ubx_overhead = 8
+
+# ACK CLASS / IDS
+ack_class = 0x05
+ack_nak_id = 0x00
+ack_ack_id = 0x01
+
+# CFG-MSG, SETS THE OUTPUT RATE OF ONE MESSAGE ON EACH OF THE SIX PORTS
+cfg_msg_type = bytes([0x06, 0x01])
+cfg_msg_len = 8
+cfg_msg_uart1 = 1
+
+# NAV-PVT CLASS / ID AND PAYLOAD LENGTH
+nav_class = 0x01
+nav_pvt_id = 0x07
+nav_pvt_len = 92
+
+# NAV-PVT FIELDS USED, IN ORDER:
+# YEAR, MONTH, DAY, HOUR, MIN, SEC, VALID, TACC, NANO, FIXTYPE, FLAGS, NUMSV, LON, LAT, HMSL, HACC, VACC, GSPEED, HEADMOT
+nav_pvt_format = '<4xH6BIiBBxBii4xiII12xii'
+
+# NAV-PVT VALID FLAGS
+valid_date = 0x01
+valid_time = 0x02
+fully_resolved = 0x04
+
+# NAV-PVT FLAGS
+gnss_fix_ok = 0x01
+
+# MGA-INI, INITIAL POSITION (LLH) AND TIME (UTC) ASSISTANCE
+# POS_LLH: TYPE, VERSION, LAT AND LON IN 1E-7 DEGREES, ALTITUDE IN CM, ACCURACY IN CM
+# TIME_UTC: TYPE, VERSION, REF, LEAP SECONDS, YEAR, MONTH, DAY, HOUR, MIN, SEC, NS, ACCURACY IN S AND NS
+mga_ini_type = bytes([0x13, 0x40])
+mga_ini_pos_llh = 0x01
+mga_ini_time_utc = 0x10
+mga_ini_pos_format = '<BB2xiiiI'
+mga_ini_time_format = '<BBBbH5BxIH2xI'
+
+# LEAP SECONDS NOT KNOWN, LET THE RECEIVER USE ITS OWN VALUE
+mga_leap_unknown = -128
+
+# MM/S TO KNOTS
+mms_to_knots = 0.00194384
+
+# CONFIGURATION COMMAND STATES
+cmd_pending = 0
+cmd_ack = 1
+cmd_nak = 2
+cmd_timeout = 3
+
+# CALCULATE THE UBX CHECKSUM OF BUF[START:END], RETURNED AS CK_A IN THE LOW BYTE AND CK_B IN THE HIGH BYTE
+def ubx_checksum(buf, start, end):
+    cs_a = 0
+    cs_b = 0
+
+    for i in range(start, end):
+        cs_a = (cs_a + buf[i]) & 0xFF
+        cs_b = (cs_b + cs_a) & 0xFF
+
+    return cs_a | (cs_b << 8)
+
+# PREBUILD AN EMPTY FRAME FOR A MESSAGE TYPE (CLASS AND ID BYTES) AND PAYLOAD LENGTH
+def ubx_template(msg_type, payload_len):
+    frame = bytearray(payload_len + ubx_overhead)
+    frame[0] = ubx_sync_1
+    frame[1] = ubx_sync_2
+    frame[2] = msg_type[0]
+    frame[3] = msg_type[1]
+    frame[4] = payload_len & 0xFF
+    frame[5] = payload_len >> 8
+    return frame
+
+# WRITE THE CHECKSUM INTO THE LAST TWO BYTES OF A FRAME AFTER THE PAYLOAD HAS BEEN FILLED IN
+def ubx_seal(frame):
+    end = len(frame) - 2
+    checksum = ubx_checksum(frame, 2, end)
+    frame[end] = checksum & 0xFF
+    frame[end + 1] = checksum >> 8
+    return frame
+
+# BUILD A COMPLETE UBX FRAME, MSG_TYPE IS THE CLASS AND ID BYTES
+def ubx_frame(msg_type, msg_payload):
+    frame = ubx_template(msg_type, len(msg_payload))
+    frame[ubx_header_len:ubx_header_len + len(msg_payload)] = msg_payload
+    return ubx_seal(frame)
+
+# PREBUILT CFG-MSG FRAME, REFILLED IN PLACE TO CHANGE A MESSAGE RATE WITHOUT ALLOCATING
+cfg_msg_frame = ubx_template(cfg_msg_type, cfg_msg_len)
+
+# SET THE UART1 OUTPUT RATE OF A MESSAGE (0 = OFF, N = EVERY N EPOCHS) IN THE PREBUILT CFG-MSG FRAME
+def ubx_cfg_msg(msg_class_id, rate):
+    frame = cfg_msg_frame
+    frame[6] = msg_class_id[0]
+    frame[7] = msg_class_id[1]
+
+    for i in range(6):
+        frame[8 + i] = rate if i == cfg_msg_uart1 else 0
+
+    return ubx_seal(frame)
+
+# MGA-INI-POS_LLH FRAME, POSITION IN DEGREES AND METERS
+def ubx_mga_ini_pos(latitude, longitude, altitude_m, accuracy_m):
+    return ubx_frame(mga_ini_type, struct.pack(mga_ini_pos_format, mga_ini_pos_llh, 0, int(latitude * 10000000), int(longitude * 10000000), int(altitude_m * 100), int(accuracy_m * 100)))
+
+# MGA-INI-TIME_UTC FRAME FROM A UTC STRUCT_TIME, APPLIED WHEN THE FRAME IS RECEIVED
+def ubx_mga_ini_time(utc, accuracy_s):
+    return ubx_frame(mga_ini_type, struct.pack(mga_ini_time_format, mga_ini_time_utc, 0, 0, mga_leap_unknown, utc.tm_year, utc.tm_mon, utc.tm_mday, utc.tm_hour, utc.tm_min, utc.tm_sec, 0, accuracy_s, 0))
+
+# ONE QUEUED CONFIGURATION COMMAND
+class ubx_cmd:
+    def __init__(self, name, msg_type, msg_payload):
+        self.name = name
+        self.msg_class = msg_type[0]
+        self.msg_id = msg_type[1]
+        self.frame = ubx_frame(msg_type, msg_payload)
+        self.state = cmd_pending
+        self.attempts = 0
+        self.deadline = 0
+
+# PIPELINED CONFIGURATION ENGINE
+# ALL QUEUED COMMANDS ARE WRITTEN BACK TO BACK, THEN THE INCOMING STREAM IS SCANNED FOR ACK/NAK FRAMES
+# THE RECEIVER ANSWERS IN ORDER, SO A REPLY IS MATCHED TO THE OLDEST OUTSTANDING COMMAND OF THE SAME CLASS / ID
+# A COMMAND WITH NO REPLY BY ITS DEADLINE IS RESENT, THE TIMEOUT DOUBLING EACH ATTEMPT, UP TO RETRIES TIMES
+# A NAK IS FINAL AND IS NOT RETRIED
+class ubx_config:
+    def __init__(self, demux, timeout=0.25, retries=3):
+        self.demux = demux
+        self.timeout_ns = int(timeout * 1000000000)
+        self.retries = retries
+        self.cmds = []
+
+        demux.add_ubx(self)
+
+    def add(self, name, msg_type, msg_payload):
+        cmd = ubx_cmd(name, msg_type, msg_payload)
+        self.cmds.append(cmd)
+        return cmd
+
+    def send(self, cmd, now):
+        self.demux.uart.write(cmd.frame)
+        cmd.deadline = now + (self.timeout_ns << cmd.attempts)
+        cmd.attempts += 1
+
+    # SEND EVERY QUEUED COMMAND THAT HAS NOT BEEN SENT YET
+    def start(self):
+        now = time.monotonic_ns()
+
+        for cmd in self.cmds:
+            if cmd.attempts == 0:
+                self.send(cmd, now)
+
+    # RESEND OR GIVE UP ON COMMANDS PAST THEIR DEADLINE, RETURNS THE NUMBER STILL WAITING FOR A REPLY
+    def poll(self):
+        now = time.monotonic_ns()
+        outstanding = 0
+
+        for cmd in self.cmds:
+            if cmd.state != cmd_pending:
+                continue
+
+            if now >= cmd.deadline:
+                if cmd.attempts > self.retries:
+                    cmd.state = cmd_timeout
+                    continue
+
+                self.send(cmd, now)
+
+            outstanding += 1
+
+        return outstanding
+
+    # RETURNS THE LIST OF COMMANDS THAT WERE NAKED OR TIMED OUT AND CLEARS THE QUEUE
+    def finish(self):
+        failed = [cmd for cmd in self.cmds if cmd.state != cmd_ack]
+        self.cmds = []
+        return failed
+
+    # SEND EVERY QUEUED COMMAND AND WAIT FOR ALL OF THEM TO BE ANSWERED OR GIVE UP
+    def run(self):
+        self.start()
+
+        while self.poll():
+            if not self.demux.update():
+                time.sleep(0.005)
+
+        return self.finish()
+
+    # MATCH ACK-ACK / ACK-NAK TO THE OLDEST OUTSTANDING COMMAND OF THE SAME CLASS / ID
+    # ALWAYS RETURNS FALSE AS AN ACK CARRIES NO NAVIGATION DATA
+    def decode_ubx(self, msg_class, msg_id, payload, length):
+        if msg_class != ack_class or length != 2:
+            return False
+
+        if msg_id == ack_ack_id:
+            state = cmd_ack
+        elif msg_id == ack_nak_id:
+            state = cmd_nak
+        else:
+            return False
+
+        for cmd in self.cmds:
+            if cmd.state == cmd_pending and cmd.msg_class == payload[0] and cmd.msg_id == payload[1]:
+                cmd.state = state
+                break
+
+        return False
+
+# UBX-NAV-PVT DECODER
+class ubx_gps:
+    def __init__(self):
+        # DECODED DATA, NONE UNTIL RECEIVED
+        self.latitude = None
+        self.longitude = None
+        self.altitude_m = None
+        self.speed_knots = None
+        self.track_angle_deg = None
+        self.satellites = None
+        self.fix_quality = 0
+        self.fix_type = 0
+
+        # ACCURACY ESTIMATES, HORIZONTAL / VERTICAL IN METERS, TIME IN NANOSECONDS
+        self.h_acc = None
+        self.v_acc = None
+        self.t_acc = None
+
+        # UTC TIMESTAMP, TIME_VALID IS ONLY SET WHEN THE RECEIVER FLAGS BOTH DATE AND TIME AS VALID
+        self.time_valid = False
+        self.time_resolved = False
+        self.year = 0
+        self.month = 0
+        self.day = 0
+        self.hour = 0
+        self.minute = 0
+        self.second = 0
+        self.nano = 0
+        self.time_struct = None
+
+        # STATISTICS
+        self.frames = 0
+
+    @property
+    def has_fix(self):
+        return self.fix_quality >= 1
+
+    # STRUCT_TIME IS BUILT ONCE PER NEW TIME, NONE UNTIL THE RECEIVER REPORTS A VALID DATE AND TIME
+    @property
+    def timestamp_utc(self):
+        if not self.time_valid:
+            return None
+
+        if self.time_struct is None:
+            self.time_struct = time.struct_time((self.year, self.month, self.day, self.hour, self.minute, self.second, 0, 0, -1))
+
+        return self.time_struct
+
+    # FOR RTC.SET_TIME_SOURCE()
+    @property
+    def datetime(self):
+        return self.timestamp_utc
+
+    # DECODE A CHECKSUM VALIDATED FRAME FROM THE DEMUX, RETURNS TRUE IF IT WAS NAV-PVT
+    def decode_ubx(self, msg_class, msg_id, payload, length):
+        if msg_class != nav_class or msg_id != nav_pvt_id or length != nav_pvt_len:
+            return False
+
+        self.frames += 1
+
+        (year, month, day, hour, minute, second, valid, t_acc, nano, fix_type, flags, num_sv,
+         lon, lat, h_msl, h_acc, v_acc, g_speed, head_mot) = struct.unpack_from(nav_pvt_format, payload, 0)
+
+        # FIX TYPE 2 = 2D, 3 = 3D, 4 = GNSS + DEAD RECKONING. ONLY TRUSTED WHEN GNSSFIXOK IS SET
+        self.fix_type = fix_type
+
+        if (flags & gnss_fix_ok) and 2 <= fix_type <= 4:
+            self.fix_quality = 1
+            self.latitude = lat / 10000000
+            self.longitude = lon / 10000000
+            self.altitude_m = h_msl / 1000
+            self.speed_knots = g_speed * mms_to_knots
+            self.track_angle_deg = head_mot / 100000
+        else:
+            self.fix_quality = 0
+
+        self.satellites = num_sv
+        self.h_acc = h_acc / 1000
+        self.v_acc = v_acc / 1000
+        self.t_acc = t_acc
+
+        self.time_valid = (valid & (valid_date | valid_time)) == (valid_date | valid_time)
+        self.time_resolved = self.time_valid and (valid & fully_resolved) != 0
+
+        if second != self.second or minute != self.minute or hour != self.hour or day != self.day or month != self.month or year != self.year:
+            self.time_struct = None
+
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.minute = minute
+        self.second = second
+        self.nano = nano
+
+        return True